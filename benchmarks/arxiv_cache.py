@@ -0,0 +1,93 @@
+"""
+arXiv cache benchmark: latency of search_arxiv for a first query (network),
+the same query again (query cache), a reworded query (query cache) and a
+related narrower query (local full-text index).
+
+The arXiv client is replaced by a fake that returns canned papers after a
+delay like the real client's page pacing, and the index lives in a temporary
+file, so no network is used and the real cache is untouched.
+
+Usage:
+    python benchmarks/arxiv_cache.py [--api-delay 3.0]
+"""
+
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arxiv import Result
+
+from utils.arxiv_index import ArxivIndex
+
+# The module itself; `tools.search_arxiv` the attribute is the tool
+module = importlib.import_module("tools.search_arxiv")
+
+
+def fake_results(count: int) -> list[Result]:
+    return [
+        Result(
+            entry_id=f"http://arxiv.org/abs/2401.{i:05d}v1",
+            published=datetime(2024, 1, 1 + i % 28, tzinfo=timezone.utc),
+            title=f"Galactic center filaments survey part {i}",
+            authors=[Result.Author("F. Yusef-Zadeh"), Result.Author("R. Arendt")],
+            summary="MeerKAT observations of radio filaments near the galactic center.",
+            links=[Result.Link(f"http://arxiv.org/pdf/2401.{i:05d}v1", title="pdf")],
+        )
+        for i in range(count)
+    ]
+
+
+class FakeClient:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.requests = 0
+
+    def results(self, search):
+        self.requests += 1
+        time.sleep(self.delay)
+        return iter(fake_results(search.max_results))
+
+
+def measure(query: str, repeat: int = 1) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        module.search_arxiv.invoke({"query": query})
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--api-delay", type=float, default=3.0)
+    args = parser.parse_args()
+
+    fake_client = FakeClient(args.api_delay)
+    module.client = fake_client
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = ArxivIndex(os.path.join(temp_dir, "arxiv.sqlite"))
+        module.get_arxiv_index = lambda: index
+
+        cases = [
+            ("first query", "galactic center filaments", 1),
+            ("same query", "galactic center filaments", 20),
+            ("reworded query", "Filaments, Galactic Center", 20),
+            ("related query", "MeerKAT radio filaments", 20),
+        ]
+        for label, query, repeat in cases:
+            print(f"{label:<16} {measure(query, repeat) * 1000:9.2f}ms  ({query!r})")
+
+        print(f"arXiv API requests: {fake_client.requests}")
+        assert fake_client.requests == 1
+
+
+if __name__ == "__main__":
+    main()
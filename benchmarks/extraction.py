@@ -0,0 +1,70 @@
+"""
+Web page extraction benchmark: time and output size of each extraction strategy
+over the HTML fixtures in benchmarks/fixtures/html (or --fixtures DIR).
+
+Output size is reported in estimated tokens (4 characters per token, as in
+main.estimate_tokens), which is what query_resource pays for on every call.
+
+Usage:
+    python benchmarks/extraction.py [--fixtures DIR] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web_scraper.extract_text import extract_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+
+STRATEGIES = {
+    "full_page": {"strategy": "full_page"},
+    "main_content": {"strategy": "main_content", "include_tables": True},
+    "main_no_tables": {"strategy": "main_content", "include_tables": False},
+}
+
+
+def measure(html: str, options: dict, repeat: int) -> tuple[float, int]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract_text(html, **options)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), len(text) // 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = sorted(f for f in os.listdir(args.fixtures) if f.endswith(".html"))
+    totals = {strategy: [0.0, 0] for strategy in STRATEGIES}
+
+    print(
+        f"{'fixture':<26}{'html tokens':>12}" + "".join(f"{s:>22}" for s in STRATEGIES)
+    )
+    for name in names:
+        with open(os.path.join(args.fixtures, name), encoding="utf-8") as f:
+            html = f.read()
+        row = f"{name:<26}{len(html) // 4:>12}"
+        for strategy, options in STRATEGIES.items():
+            seconds, tokens = measure(html, options, args.repeat)
+            totals[strategy][0] += seconds
+            totals[strategy][1] += tokens
+            row += f"{tokens:>10} tok {seconds * 1000:>6.1f}ms"
+        print(row)
+
+    row = f"{'total':<26}{'':>12}"
+    for seconds, tokens in totals.values():
+        row += f"{tokens:>10} tok {seconds * 1000:>6.1f}ms"
+    print(row)
+
+
+if __name__ == "__main__":
+    main()
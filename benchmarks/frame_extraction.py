@@ -0,0 +1,92 @@
+"""
+Frame extraction benchmark: time to sample frames from a long video in a single
+ffmpeg pass and split into keyframe-aligned parts decoded concurrently, and
+whether both yield the same frames.
+
+The video is a synthetic test pattern made with ffmpeg in a temporary
+directory, and stands in for a download, so no network is used.
+
+Usage:
+    python benchmarks/frame_extraction.py [--duration 300] [--fps 1] [--segments 4]
+"""
+
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.YouTubeVideo import YouTubeVideo
+
+# The module itself; `utils.YouTubeVideo` the attribute is the class
+module = sys.modules["utils.YouTubeVideo"]
+
+
+def make_video(path: str, duration: float) -> None:
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size=1280x720:rate=30:duration={duration}",
+            "-c:v",
+            "libx264",
+            "-g",
+            "300",
+            path,
+            "-y",
+            "-loglevel",
+            "error",
+        ],
+        check=True,
+    )
+
+
+def measure(video: YouTubeVideo, fps: float, segments: int):
+    module.FFMPEG_SEGMENTS = segments
+    start = time.perf_counter()
+    frames = list(video.generate_frames(fps))
+    elapsed = time.perf_counter() - start
+    digests = [
+        (timestamp, hashlib.md5(open(path, "rb").read()).hexdigest())
+        for path, timestamp, _ in frames
+    ]
+    return elapsed, digests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=300)
+    parser.add_argument("--fps", type=float, default=1)
+    parser.add_argument("--segments", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as source_dir:
+        source = os.path.join(source_dir, "video.mp4")
+        make_video(source, args.duration)
+
+        def fake_download(self, uri, destination_dir, download=True):
+            video_path = os.path.join(destination_dir, "video.mp4")
+            os.symlink(source, video_path)
+            return video_path, {"title": "Test", "duration": args.duration}
+
+        YouTubeVideo._download_youtube = fake_download
+
+        with YouTubeVideo("benchmark") as video:
+            video.keyframes()  # Probed once per video, not part of the timing
+            single, single_frames = measure(video, args.fps, 1)
+            split, split_frames = measure(video, args.fps, args.segments)
+
+    print(f"single pass  {single:8.2f}s  ({len(single_frames)} frames)")
+    print(f"{args.segments} segments  {split:8.2f}s  ({len(split_frames)} frames)")
+    print(f"speedup      {single / split:8.2f}x on {os.cpu_count()} cores")
+    assert split_frames == single_frames
+
+
+if __name__ == "__main__":
+    main()
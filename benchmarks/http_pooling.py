@@ -0,0 +1,67 @@
+"""
+HTTP pooling benchmark: per-request latency of a fresh connection per request
+(the old module-level `requests.get` pattern) versus the shared pooled client.
+
+By default it targets a local stub server; pass --url to measure a real host,
+where the saved TCP+TLS handshake makes the difference much larger.
+
+Usage:
+    python benchmarks/http_pooling.py [--requests 50] [--url https://example.com]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from utils import http
+from tests.stub_server import StubServer
+
+
+def measure(fn, url: str, count: int) -> list[float]:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn(url).raise_for_status()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def fresh_connection(url: str) -> httpx.Response:
+    with httpx.Client(timeout=30) as client:
+        return client.get(url)
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<18} median {statistics.median(samples) * 1000:7.2f}ms"
+        f"  mean {statistics.mean(samples) * 1000:7.2f}ms"
+    )
+
+
+def run(url: str, count: int) -> None:
+    http.get(url).raise_for_status()  # open the pooled connection
+    report("fresh connection", measure(fresh_connection, url, count))
+    report("pooled client", measure(http.get, url, count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--url")
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url, args.requests)
+    else:
+        with StubServer(body=b"x" * 2048) as server:
+            run(server.url, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+LLM client overhead benchmark: per-call latency of building a chat model and
+binding its tools on every call (a new OpenAI client and connection pool each
+time) versus the shared, pre-bound models from `utils.llm`.
+
+The model endpoint is a local stub returning a canned completion, so the
+numbers are pure client-side overhead plus connection setup; against the real
+API the saved TLS handshake adds tens of milliseconds more per call.
+
+Usage:
+    python benchmarks/llm_client_overhead.py [--calls 50]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.stub_server import StubServer
+
+COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4.1-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": "call_stub",
+                        "type": "function",
+                        "function": {
+                            "name": "final_answer",
+                            "arguments": '{"answer": "42"}',
+                        },
+                    }
+                ],
+            },
+            "finish_reason": "tool_calls",
+        }
+    ],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+}
+
+
+def measure(fn, count: int) -> list[float]:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<22} median {statistics.median(samples) * 1000:7.2f}ms"
+        f"  mean {statistics.mean(samples) * 1000:7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    with StubServer(body=json.dumps(COMPLETION).encode()) as server:
+        os.environ["OPENAI_BASE_URL"] = server.url.rstrip("/")
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+        from langchain_openai import ChatOpenAI
+
+        from main import tools
+        from utils.llm import bind_tools, chat_model
+
+        messages = [("user", "What is the answer?")]
+
+        def per_call():
+            model = ChatOpenAI(model="gpt-4.1-mini", max_retries=0)
+            model.bind_tools(tools, tool_choice="any").invoke(messages)
+
+        def shared():
+            model = chat_model("gpt-4.1-mini")
+            bind_tools(model, tools, tool_choice="any").invoke(messages)
+
+        per_call()
+        shared()  # warm up imports and the pooled connection
+
+        report("model built per call", measure(per_call, args.calls))
+        report("shared bound model", measure(shared, args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Startup-time benchmark: measures how long a cold `import main` takes.
+
+Each sample runs in a fresh interpreter from the repository root. The slowest
+modules of the last sample are listed using `python -X importtime`.
+
+Usage:
+    python benchmarks/startup_time.py [--runs 5] [--top 15] [--module main]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIDE_EFFECT_FILES = ["graph.md", "youtube_analyst.md", "audio_agent_graph.md"]
+
+
+def time_import(module: str) -> tuple[float, str]:
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, process.stderr
+
+
+def slowest_modules(importtime_log: str, top: int) -> list[tuple[int, str]]:
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--module", default="main")
+    args = parser.parse_args()
+
+    mtimes = {
+        path: os.path.getmtime(os.path.join(REPO_ROOT, path))
+        for path in SIDE_EFFECT_FILES
+        if os.path.exists(os.path.join(REPO_ROOT, path))
+    }
+
+    samples = []
+    log = ""
+    for _ in range(args.runs):
+        elapsed, log = time_import(args.module)
+        samples.append(elapsed)
+
+    print(f"import {args.module} over {args.runs} runs:")
+    print(f"  min    {min(samples):.3f}s")
+    print(f"  median {statistics.median(samples):.3f}s")
+    print(f"  max    {max(samples):.3f}s")
+
+    print(f"\nSlowest modules (cumulative):")
+    for cumulative, name in slowest_modules(log, args.top):
+        print(f"  {cumulative / 1e6:7.3f}s {name}")
+
+    touched = [
+        path
+        for path, mtime in mtimes.items()
+        if os.path.getmtime(os.path.join(REPO_ROOT, path)) != mtime
+    ]
+    if touched:
+        print(f"\nWarning: importing rewrote {', '.join(touched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,13 @@ Configuration settings for the Hugging Face Agents Course Final Assignment.
 import os
 from dotenv import load_dotenv
 
+
+def _optional_number(name: str, default: str) -> float | None:
+    """Read a numeric environment variable where 0 means "no limit"."""
+    value = float(os.getenv(name, default))
+    return value if value > 0 else None
+
+
 # Environment variables
 load_dotenv()
 USERNAME = os.getenv("HF_USERNAME")
@@ -24,3 +31,127 @@ CACHE_DIR = "cache"
 PREVIOUS_ANSWERS_JSON_PATH = os.path.join(CACHE_DIR, "previous_answers.json")
 QUESTIONS_JSON_PATH = os.path.join(CACHE_DIR, "questions.json")
 ATTACHMENTS_DIR = os.path.join(CACHE_DIR, "attachments")
+
+# Answers of earlier runs, reused while a question's inputs are unchanged
+RUN_MEMO_PATH = os.path.join(CACHE_DIR, "run_memo.json")
+
+# arXiv query cache and full-text index of seen papers. Queries not in the cache
+# can be answered from the index once it holds this many matching papers, but
+# the index never learns of newer papers that way (0 = never)
+ARXIV_INDEX_PATH = os.path.join(CACHE_DIR, "arxiv.sqlite")
+ARXIV_CACHE_TTL_SECONDS = _optional_number("ARXIV_CACHE_TTL_SECONDS", "604800")
+ARXIV_LOCAL_MIN_HITS = int(os.getenv("ARXIV_LOCAL_MIN_HITS", "0"))
+
+# Converted text of arXiv papers per id and version (HTML, LaTeX source or PDF)
+ARXIV_PAPERS_PATH = os.path.join(CACHE_DIR, "arxiv_papers.sqlite")
+
+# Metrics export: ".json" writes a JSON summary, anything else Prometheus text
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join(CACHE_DIR, "metrics.prom"))
+
+# Regenerate graph.md, youtube_analyst.md and audio_agent_graph.md on each run
+EXPORT_GRAPH_DIAGRAMS = os.getenv("EXPORT_GRAPH_DIAGRAMS") == "1"
+
+# Start the planning call concurrently with triage ("0" to disable)
+SPECULATIVE_PLANNING = os.getenv("SPECULATIVE_PLANNING", "1") == "1"
+
+# Evaluation cadence of the research loop: summarize every N tool steps, or
+# earlier once the messages since the last summary exceed the token threshold
+EVALUATION_INTERVAL = int(os.getenv("EVALUATION_INTERVAL", "2"))
+EVALUATION_TOKEN_THRESHOLD = int(os.getenv("EVALUATION_TOKEN_THRESHOLD", "6000"))
+
+# Per-question budgets across the main graph and its subgraphs (0 = no limit)
+QUESTION_TIME_BUDGET_SECONDS = _optional_number("QUESTION_TIME_BUDGET_SECONDS", "600")
+QUESTION_TOKEN_BUDGET = _optional_number("QUESTION_TOKEN_BUDGET", "400000")
+QUESTION_LLM_CALL_BUDGET = _optional_number("QUESTION_LLM_CALL_BUDGET", "80")
+
+# Resilience: timeouts and retries for outbound calls, and hedged duplicate
+# requests once a call is slower than this percentile of earlier ones (0 = off)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_HEDGING = os.getenv("LLM_HEDGING") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# Shared HTTP connection pool; HTTP/2 needs the optional `h2` package
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP2 = os.getenv("HTTP2") == "1"
+
+# Web page text extraction: "main_content" (trafilatura, falling back to the full
+# page when its output is shorter than EXTRACTION_MIN_CHARS) or "full_page"
+EXTRACTION_STRATEGY = os.getenv("EXTRACTION_STRATEGY", "main_content")
+EXTRACTION_MIN_CHARS = int(os.getenv("EXTRACTION_MIN_CHARS", "500"))
+EXTRACTION_INCLUDE_TABLES = os.getenv("EXTRACTION_INCLUDE_TABLES", "1") == "1"
+
+# Tiered page fetching: a static GET first, the headless browser when the page
+# has fewer visible characters than STATIC_MIN_TEXT_CHARS or is a bot wall.
+# A domain goes straight to the browser after FETCH_TIER_BROWSER_AFTER static
+# fetches in a row were JavaScript shells or bot walls.
+FETCH_TIERS_PATH = os.path.join(CACHE_DIR, "fetch_tiers.json")
+FETCH_TIER_TTL_SECONDS = _optional_number("FETCH_TIER_TTL_SECONDS", "604800")
+FETCH_TIER_BROWSER_AFTER = int(os.getenv("FETCH_TIER_BROWSER_AFTER", "2"))
+STATIC_FETCH_TIMEOUT = float(os.getenv("STATIC_FETCH_TIMEOUT", "15"))
+STATIC_MIN_TEXT_CHARS = int(os.getenv("STATIC_MIN_TEXT_CHARS", "200"))
+
+# Speculative prefetch of the top PREFETCH_TOP_K search result pages (0 = off)
+# into an in-memory document cache of at most PREFETCH_CACHE_BYTES
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "0"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+PREFETCH_CACHE_BYTES = int(os.getenv("PREFETCH_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Answers of query_resource per document content and normalized query. Below 1,
+# QUERY_CACHE_SIMILARITY also reuses them for near-duplicate queries with at
+# least that TF-IDF cosine similarity and the same numbers and names. 1 reuses
+# exact repeats only; QUERY_CACHE=0 disables the cache. Answers expire after
+# QUERY_CACHE_TTL_SECONDS (0 = never), and --force runs don't reuse them.
+QUERY_CACHE = os.getenv("QUERY_CACHE", "1") == "1"
+QUERY_CACHE_PATH = os.path.join(CACHE_DIR, "query_cache.sqlite")
+QUERY_CACHE_SIMILARITY = float(os.getenv("QUERY_CACHE_SIMILARITY", "1"))
+QUERY_CACHE_TTL_SECONDS = _optional_number("QUERY_CACHE_TTL_SECONDS", "604800")
+
+# Tool outputs of at least BLOB_MIN_BYTES are kept out of the graph state in a
+# content-addressed store, with the latest BLOB_MEMORY_BYTES of them in memory.
+# Blobs not stored again within BLOB_TTL_SECONDS are deleted (0 = never).
+BLOB_STORE_DIR = os.path.join(CACHE_DIR, "blobs")
+BLOB_MIN_BYTES = int(os.getenv("BLOB_MIN_BYTES", "2048"))
+BLOB_MEMORY_BYTES = int(os.getenv("BLOB_MEMORY_BYTES", str(64 * 1024 * 1024)))
+BLOB_TTL_SECONDS = _optional_number("BLOB_TTL_SECONDS", "86400")
+
+# YouTube frame sampling within YOUTUBE_FRAME_BUDGET frames per video: a sweep of
+# about YOUTUBE_SWEEP_FRAMES frames over the whole video, frames where the scene
+# changes (scene score above YOUTUBE_SCENE_THRESHOLD, 0 = off), and the rest for
+# YOUTUBE_ZOOM_FPS bursts around timestamps the model zooms in on
+YOUTUBE_FRAME_BUDGET = int(os.getenv("YOUTUBE_FRAME_BUDGET", "60"))
+YOUTUBE_SWEEP_FRAMES = int(os.getenv("YOUTUBE_SWEEP_FRAMES", "24"))
+YOUTUBE_SCENE_THRESHOLD = float(os.getenv("YOUTUBE_SCENE_THRESHOLD", "0.3"))
+YOUTUBE_ZOOM_FPS = float(os.getenv("YOUTUBE_ZOOM_FPS", "2"))
+YOUTUBE_ZOOM_WINDOW_SECONDS = float(os.getenv("YOUTUBE_ZOOM_WINDOW_SECONDS", "6"))
+
+# Frame extraction decodes up to FFMPEG_SEGMENTS keyframe-aligned parts of a
+# video concurrently, each at least FFMPEG_SEGMENT_SECONDS long (1 = one pass)
+FFMPEG_SEGMENTS = int(os.getenv("FFMPEG_SEGMENTS", str(os.cpu_count() or 1)))
+FFMPEG_SEGMENT_SECONDS = float(os.getenv("FFMPEG_SEGMENT_SECONDS", "30"))
+
+# Captions-first YouTube analysis: only the metadata and captions are fetched,
+# and the video is downloaded and sampled only if they don't answer the question
+YOUTUBE_CAPTIONS_FIRST = os.getenv("YOUTUBE_CAPTIONS_FIRST", "1") == "1"
+
+# Optional OCR of YouTube frames with the tesseract CLI, OCR_WORKERS processes at
+# a time: only frames showing the question's keywords are looked at, and a
+# text-only pass over the on-screen text may answer without vision calls
+YOUTUBE_OCR = os.getenv("YOUTUBE_OCR") == "1"
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+
+# Async runs: questions answered concurrently on one event loop, and pages the
+# shared headless browser keeps open at once
+QUESTION_CONCURRENCY = int(os.getenv("QUESTION_CONCURRENCY", "1"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "8"))
+
+# Sharded runs (main.py --coordinator / --worker): a worker's claim on a question
+# expires after the lease, and a question is given up after this many claims
+WORK_QUEUE_PATH = os.path.join(CACHE_DIR, "work_queue.sqlite")
+WORK_QUEUE_LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "1200"))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+WORK_QUEUE_POLL_SECONDS = float(os.getenv("WORK_QUEUE_POLL_SECONDS", "5"))
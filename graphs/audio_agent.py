@@ -1,3 +1,4 @@
+from functools import cache
 from typing import TypedDict, Optional
 
 import re
@@ -6,15 +7,21 @@ from langchain_core.messages import (
     SystemMessage,
     HumanMessage,
 )
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
 
 from utils import load_prompt
+from utils.llm import (
+    AUDIO_TRANSCRIPTION_MODEL,
+    async_openai_client,
+    chat_model,
+    openai_client,
+)
+from utils.metrics import instrument, timed
+from utils.graph import hybrid_node
 
 ANALYZE_AUDIO_SYSTEM_PROMPT = load_prompt("analyze_audio_system_prompt.md")
 
-analyze_model = ChatOpenAI(model="gpt-4o-mini")
+analyze_model = chat_model("gpt-4o-mini")
 
 
 class AgentState(TypedDict):
@@ -25,24 +32,38 @@ class AgentState(TypedDict):
     answer: Optional[str]
 
 
+@instrument("audio_agent", "Transcribe")
 def transcribe_audio(state: AgentState):
-    client = OpenAI()
+    client = openai_client()
 
     audio_file = open(state["file_path"], "rb")
 
-    transcription = client.audio.transcriptions.create(
-        model="gpt-4o-transcribe", file=audio_file
-    )
+    with timed("agent_llm_duration_seconds", model=AUDIO_TRANSCRIPTION_MODEL):
+        transcription = client.audio.transcriptions.create(
+            model=AUDIO_TRANSCRIPTION_MODEL, file=audio_file
+        )
 
     return {**state, "transcript": transcription.text}
 
 
-def analyze(state: AgentState):
-    response = analyze_model.invoke(
-        [
-            SystemMessage(content=ANALYZE_AUDIO_SYSTEM_PROMPT),
-            HumanMessage(
-                content=f"""
+@instrument("audio_agent", "Transcribe")
+async def atranscribe_audio(state: AgentState):
+    client = async_openai_client()
+
+    with open(state["file_path"], "rb") as audio_file:
+        with timed("agent_llm_duration_seconds", model=AUDIO_TRANSCRIPTION_MODEL):
+            transcription = await client.audio.transcriptions.create(
+                model=AUDIO_TRANSCRIPTION_MODEL, file=audio_file
+            )
+
+    return {**state, "transcript": transcription.text}
+
+
+def analyze_messages(state: AgentState) -> list:
+    return [
+        SystemMessage(content=ANALYZE_AUDIO_SYSTEM_PROMPT),
+        HumanMessage(
+            content=f"""
 <transcript>
 {state["transcript"]}
 </transcript>
@@ -51,30 +72,39 @@ def analyze(state: AgentState):
 {state["question"]}
 </query>                
 """,
-            ),
-        ],
-    )
+        ),
+    ]
+
 
+def parse_answer(content: str) -> str:
     final_answer_pattern = r"FINAL_ANSWER:\s*(.*?)\s*$"
-    match = re.search(final_answer_pattern, response.content, re.DOTALL)
-    answer = match.group(1).strip() if match else response.content
-    return {**state, "answer": answer}
+    match = re.search(final_answer_pattern, content, re.DOTALL)
+    return match.group(1).strip() if match else content
+
+
+@instrument("audio_agent", "Analyze")
+def analyze(state: AgentState):
+    response = analyze_model.invoke(analyze_messages(state))
+    return {**state, "answer": parse_answer(response.content)}
+
 
+@instrument("audio_agent", "Analyze")
+async def aanalyze(state: AgentState):
+    response = await analyze_model.ainvoke(analyze_messages(state))
+    return {**state, "answer": parse_answer(response.content)}
 
-workflow = StateGraph(AgentState)
 
-workflow.add_node("Transcribe", transcribe_audio)
-workflow.add_node("Analyze", analyze)
+@cache
+def get_audio_agent():
+    """Compile the audio agent graph on first use."""
+    workflow = StateGraph(AgentState)
 
-workflow.add_edge(START, "Transcribe")
-workflow.add_edge("Transcribe", "Analyze")
+    workflow.add_node("Transcribe", hybrid_node(transcribe_audio, atranscribe_audio))
+    workflow.add_node("Analyze", hybrid_node(analyze, aanalyze))
 
-workflow.add_edge("Analyze", END)
+    workflow.add_edge(START, "Transcribe")
+    workflow.add_edge("Transcribe", "Analyze")
 
-audio_agent = workflow.compile()
+    workflow.add_edge("Analyze", END)
 
-graph_mermaid = audio_agent.get_graph().draw_mermaid()
-with open("audio_agent_graph.md", "w") as f:
-    f.write("```mermaid\n")
-    f.write(graph_mermaid)
-    f.write("```")
+    return workflow.compile()
@@ -7,11 +7,14 @@ This module handles all interactions with the evaluation API including:
 - Submitting answers and scores
 """
 
-import requests
 import json
 import os
 from typing import List, Dict, Any, Union, TypedDict, Optional
 
+from utils import http
+from utils.http import HTTPError
+from utils.metrics import record_cache
+
 
 class APIQuestion(TypedDict):
     """Type definition for API question response."""
@@ -62,17 +65,19 @@ class HFClient:
             List[Question]: List of questions with question text and file_path
 
         Raises:
-            requests.RequestException: If the API request fails
+            HTTPError: If the API request fails
         """
         # Check if cached questions.json exists
         if os.path.exists(self.questions_json_path):
+            record_cache("questions", hit=True)
             print(f"Loading questions from cache: {self.questions_json_path}")
             with open(self.questions_json_path, "r", encoding="utf-8") as f:
                 return json.load(f)
 
         # Otherwise, fetch from API, process files, and cache
+        record_cache("questions", hit=False)
         try:
-            response = requests.get(f"{self.base_url}/questions")
+            response = http.get(f"{self.base_url}/questions", hedge=True)
             response.raise_for_status()
             api_questions = response.json()
             print(f"Fetched {len(api_questions)} questions from API")
@@ -107,7 +112,7 @@ class HFClient:
             print(f"Cached processed questions to {self.questions_json_path}")
 
             return processed_questions
-        except requests.exceptions.RequestException as e:
+        except HTTPError as e:
             print(f"Error fetching questions: {e}")
             raise
 
@@ -119,10 +124,10 @@ class HFClient:
             Question: A single random question with question text and file_path
 
         Raises:
-            requests.RequestException: If the API request fails
+            HTTPError: If the API request fails
         """
         try:
-            response = requests.get(f"{self.base_url}/random-question")
+            response = http.get(f"{self.base_url}/random-question")
             response.raise_for_status()
             api_question = response.json()
 
@@ -143,7 +148,7 @@ class HFClient:
             # Return simplified Question object
             return Question(question=question_text, file_path=file_path)
 
-        except requests.exceptions.RequestException as e:
+        except HTTPError as e:
             print(f"Error fetching random question: {e}")
             raise
 
@@ -159,7 +164,7 @@ class HFClient:
             str: The local file path where the file is stored
 
         Raises:
-            requests.RequestException: If the API request fails
+            HTTPError: If the API request fails
         """
         os.makedirs(self.attachments_dir, exist_ok=True)
         file_path = os.path.join(self.attachments_dir, file_name)
@@ -167,19 +172,21 @@ class HFClient:
 
         # Check if file already exists
         if os.path.exists(file_path):
+            record_cache("attachments", hit=True)
             print(f"File already cached: {absolute_path}")
             return absolute_path
 
         # Otherwise, fetch from API and cache
+        record_cache("attachments", hit=False)
         try:
-            response = requests.get(f"{self.base_url}/files/{task_id}")
+            response = http.get(f"{self.base_url}/files/{task_id}", hedge=True)
             response.raise_for_status()
             file_content = response.content
             with open(file_path, "wb") as f:
                 f.write(file_content)
             print(f"Fetched and cached file to {absolute_path}")
             return absolute_path
-        except requests.exceptions.RequestException as e:
+        except HTTPError as e:
             print(f"Error downloading file for task {task_id}: {e}")
             raise
 
@@ -201,7 +208,7 @@ class HFClient:
             Dict: Score response containing username, score, correct_count, total_attempted, message, timestamp
 
         Raises:
-            requests.RequestException: If the API request fails
+            HTTPError: If the API request fails
         """
         submission_data = {
             "username": username,
@@ -210,9 +217,9 @@ class HFClient:
         }
 
         try:
-            response = requests.post(f"{self.base_url}/submit", json=submission_data)
+            response = http.post(f"{self.base_url}/submit", json=submission_data)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except HTTPError as e:
             print(f"Error submitting answers: {e}")
             raise
@@ -2,10 +2,18 @@
 Main application entry point for the Hugging Face Agents Course Final Assignment.
 """
 
+from functools import cache
 from typing import TypedDict, Optional
 
+import argparse
+import asyncio
 import json
 import base64
+import os
+import re
+import socket
+import time
+import uuid
 from hf_client import HFClient
 
 from langchain_core.messages import (
@@ -15,30 +23,56 @@ from langchain_core.messages import (
     HumanMessage,
 )
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
+from langgraph.errors import GraphRecursionError
 from langgraph.graph import StateGraph, START, END
-from langfuse.callback import CallbackHandler
 
 from utils import load_prompt
-from tools import query_resource, search_web, search_arxiv, analyze_youtube
+from tools import query_resource, search_web, search_web_batch, search_arxiv
+from tools.query_resource import bypass_query_cache
 from config import (
     BASE_URL,
     QUESTIONS_JSON_PATH,
     PREVIOUS_ANSWERS_JSON_PATH,
     ATTACHMENTS_DIR,
-    LANGFUSE_SECRET_KEY,
-    LANGFUSE_PUBLIC_KEY,
-    LANGFUSE_HOST,
+    RUN_MEMO_PATH,
     USERNAME,
     AGENT_CODE,
+    METRICS_PATH,
+    EXPORT_GRAPH_DIAGRAMS,
+    SPECULATIVE_PLANNING,
+    EVALUATION_INTERVAL,
+    EVALUATION_TOKEN_THRESHOLD,
+    QUESTION_TIME_BUDGET_SECONDS,
+    QUESTION_TOKEN_BUDGET,
+    QUESTION_LLM_CALL_BUDGET,
+    QUESTION_CONCURRENCY,
+    WORK_QUEUE_PATH,
+    WORK_QUEUE_LEASE_SECONDS,
+    WORK_QUEUE_MAX_ATTEMPTS,
+    WORK_QUEUE_POLL_SECONDS,
 )
-from graphs.audio_agent import audio_agent
+from utils.metrics import (
+    MetricsCallbackHandler,
+    instrument,
+    increment,
+    export_metrics,
+)
+from utils.tracing import get_langfuse_handler, save_mermaid
+from utils.answer_normalizer import normalize_answer, tidy_answer
+from utils.blob_store import (
+    aresolve_messages,
+    offload,
+    reference_size,
+)
+from utils.budget import QuestionBudget, BudgetExceeded
+from utils.llm import bind_tools, chat_model, model_settings
+from utils.run_memo import RunMemo, question_key
+from utils.work_queue import WorkQueue
+from web_scraper import close_browser_pool
 
 recursion_limit = 30
 
-langfuse_handler = CallbackHandler(
-    secret_key=LANGFUSE_SECRET_KEY, public_key=LANGFUSE_PUBLIC_KEY, host=LANGFUSE_HOST
-)
+metrics_handler = MetricsCallbackHandler()
 
 TRIAGE_SYSTEM_PROMPT = load_prompt("triage_system_prompt.md")
 PLANNING_SYSTEM_PROMPT = load_prompt("planning_system_prompt.md")
@@ -85,19 +119,30 @@ def delegate_to_youtube_agent(youtube_url: str):
     pass
 
 
+triage_tools = [
+    final_answer,
+    delegate_to_research_agent,
+    delegate_to_audio_agent,
+    delegate_to_youtube_agent,
+]
+
 tools = [
     query_resource,
     search_web,
+    search_web_batch,
     search_arxiv,
     final_answer,
 ]
 tools_by_name = {tool.name: tool for tool in tools}
 
-triage_model = ChatOpenAI(model="gpt-4.1")
-planning_model = ChatOpenAI(model="gpt-4.1")
-tool_calling_model = ChatOpenAI(model="gpt-4.1-mini")
-task_summarization_model = ChatOpenAI(model="gpt-4.1")
-format_answer_model = ChatOpenAI(model="gpt-4.1-mini")
+# Tool results starting with these are failures the agent should reflect on
+TOOL_ERROR_PREFIXES = ("Error", "Timeout error", "File too large")
+
+triage_model = chat_model("gpt-4.1")
+planning_model = chat_model("gpt-4.1")
+tool_calling_model = chat_model("gpt-4.1-mini")
+task_summarization_model = chat_model("gpt-4.1")
+format_answer_model = chat_model("gpt-4.1-mini")
 
 
 class AgentState(TypedDict):
@@ -107,74 +152,176 @@ class AgentState(TypedDict):
     final_answer: Optional[str]
     question: str
     file_path: Optional[str]
+    triage_path: Optional[str]
+    planned: Optional[bool]
+    steps_since_evaluation: int
+    messages_at_evaluation: int
+    uncertain: bool
+
+
+YOUTUBE_URL_PATTERN = re.compile(
+    r"https?://(?:www\.|m\.)?(?:youtube\.com/(?:watch\?\S*?v=|shorts/|embed/)|youtu\.be/)[\w-]{11}"
+)
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac", ".ogg")
+
+
+def pre_route(question: str, file_path: Optional[str]) -> Optional[tuple[str, str]]:
+    """
+    Route questions whose delegate is obvious without asking the triage model.
+
+    Returns ("audio", file_path) for an audio attachment, ("youtube", url) for a
+    single YouTube link without an attachment, or None when the rules are unsure.
+    """
+    youtube_urls = set(YOUTUBE_URL_PATTERN.findall(question))
+
+    if file_path and file_path.lower().endswith(AUDIO_EXTENSIONS):
+        return None if youtube_urls else ("audio", file_path)
+
+    if len(youtube_urls) == 1 and not file_path:
+        return "youtube", youtube_urls.pop()
+
+    return None
 
 
-def triage_node(state: AgentState):
-    triage_tools = [
-        final_answer,
-        delegate_to_research_agent,
-        delegate_to_audio_agent,
-        delegate_to_youtube_agent,
+async def arun_audio_agent(state: AgentState):
+    from graphs.audio_agent import get_audio_agent
+
+    response = await get_audio_agent().ainvoke(
+        {"file_path": state.get("file_path"), "question": state["question"]}
+    )
+    return response["answer"]
+
+
+async def arun_youtube_agent(state: AgentState, youtube_url: str):
+    from tools.analyze_youtube import (
+        get_youtube_analyst,
+        release_video,
+        youtube_recursion_limit,
+    )
+
+    video_id = uuid.uuid4().hex
+    try:
+        response = await get_youtube_analyst().ainvoke(
+            {
+                "url": youtube_url,
+                "question": state["question"],
+                "video_id": video_id,
+                "memory": [],
+            },
+            config={"recursion_limit": youtube_recursion_limit},
+        )
+    finally:
+        # The Cleanup node doesn't run if a timeout or the budget cuts it short
+        release_video(video_id)
+    return response["answer"]
+
+
+def rule_route(state: AgentState) -> Optional[tuple[str, str]]:
+    route = pre_route(state["question"], state.get("file_path"))
+    if route is not None:
+        print(f"🔀 Triage (rule): delegating to {route[0]} agent")
+        increment("agent_triage_total", path="rule", route=route[0])
+    return route
+
+
+def triage_messages(question: str) -> list[AnyMessage]:
+    return [
+        SystemMessage(content=TRIAGE_SYSTEM_PROMPT),
+        HumanMessage(content=question),
     ]
-    response = triage_model.bind_tools(triage_tools, tool_choice="any").invoke(
-        [
-            SystemMessage(content=TRIAGE_SYSTEM_PROMPT),
-            HumanMessage(content=state["question"]),
-        ]
+
+
+def triage_tool_name(response: AnyMessage) -> Optional[str]:
+    tool_name = response.tool_calls[0]["name"] if response.tool_calls else None
+    print(f"🔀 Triage (llm): {tool_name}")
+    increment("agent_triage_total", path="llm", route=tool_name or "none")
+    return tool_name
+
+
+@instrument("main", "Triage")
+async def atriage_node(state: AgentState):
+    route = rule_route(state)
+    if route is not None:
+        agent_name, target = route
+        if agent_name == "audio":
+            answer = await arun_audio_agent(state)
+        else:
+            answer = await arun_youtube_agent(state, target)
+        return {**state, "proposed_answer": answer, "triage_path": "rule"}
+
+    # Most questions continue to research, so start planning alongside triage
+    # and discard the plan if triage answers or delegates.
+    plan_task = (
+        asyncio.create_task(amake_plan(state["question"]))
+        if SPECULATIVE_PLANNING
+        else None
     )
 
-    if response.tool_calls and response.tool_calls[0]["name"] == "final_answer":
+    try:
+        response = await bind_tools(
+            triage_model, triage_tools, tool_choice="any"
+        ).ainvoke(triage_messages(state["question"]))
+    except BaseException:
+        if plan_task is not None:
+            plan_task.cancel()
+        raise
+    tool_name = triage_tool_name(response)
+
+    if plan_task is not None and tool_name != "delegate_to_research_agent":
+        plan_task.cancel()
+        increment("agent_speculative_plan_total", outcome="discarded")
+
+    if tool_name == "final_answer":
         return {
             "messages": state["messages"],
             "question": state["question"],
             "proposed_answer": response.tool_calls[0]["args"]["answer"],
+            "triage_path": "llm",
         }
 
-    if (
-        response.tool_calls
-        and response.tool_calls[0]["name"] == "delegate_to_audio_agent"
-    ):
-        response = audio_agent.invoke(
-            {"file_path": state.get("file_path"), "question": state["question"]}
-        )
-        return {**state, "proposed_answer": response["answer"]}
+    if tool_name == "delegate_to_audio_agent":
+        answer = await arun_audio_agent(state)
+        return {**state, "proposed_answer": answer, "triage_path": "llm"}
 
-    if (
-        response.tool_calls
-        and response.tool_calls[0]["name"] == "delegate_to_youtube_agent"
-    ):
-        response = analyze_youtube.invoke(
-            {
-                "url": response.tool_calls[0]["args"]["youtube_url"],
-                "question": state["question"],
-                "memory": [],
-            },
-            config={"recursion_limit": 50},
+    if tool_name == "delegate_to_youtube_agent":
+        answer = await arun_youtube_agent(
+            state, response.tool_calls[0]["args"]["youtube_url"]
         )
-        return {**state, "proposed_answer": response["answer"]}
+        return {**state, "proposed_answer": answer, "triage_path": "llm"}
 
-    return state
+    # Any other outcome, such as no tool call, cancelled the plan above and
+    # falls through to the Plan node
+    if plan_task is not None and tool_name == "delegate_to_research_agent":
+        increment("agent_speculative_plan_total", outcome="used")
+        return {
+            **state,
+            "messages": await plan_task,
+            "triage_path": "llm",
+            "planned": True,
+        }
 
+    return {**state, "triage_path": "llm"}
 
-def plan(state: AgentState):
-    response = planning_model.invoke(
-        [
-            SystemMessage(content=PLANNING_SYSTEM_PROMPT),
-            HumanMessage(content=state["question"]),
-        ]
-    )
-    return {**state, "messages": [HumanMessage(content=state["question"])] + [response]}
 
+def planning_messages(question: str) -> list[AnyMessage]:
+    return [
+        SystemMessage(content=PLANNING_SYSTEM_PROMPT),
+        HumanMessage(content=question),
+    ]
 
-def tool_node(state: AgentState):
 
-    response = tool_calling_model.bind_tools(tools, tool_choice="any").invoke(
-        state["messages"] + [SystemMessage(EXECUTION_SYSTEM_PROMPT)],
-    )
+async def amake_plan(question: str) -> list[AnyMessage]:
+    response = await planning_model.ainvoke(planning_messages(question))
+    return [HumanMessage(content=question)] + [response]
 
-    tool_calls = response.tool_calls
 
-    outputs = [response]
+@instrument("main", "Set Action Plan")
+async def aplan(state: AgentState):
+    return {**state, "messages": await amake_plan(state["question"])}
+
+
+def proposed_answer_update(state: AgentState, tool_calls: list) -> Optional[dict]:
+    """State update for a tool step whose calls include final_answer, if any."""
     for tool_call in tool_calls:
         if tool_call["name"] == "final_answer":
             return {
@@ -182,155 +329,366 @@ def tool_node(state: AgentState):
                 "question": state["question"],
                 "proposed_answer": tool_call["args"]["answer"],
             }
+    return None
 
-        tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-        outputs.append(
-            ToolMessage(
-                content=json.dumps(tool_result),
-                name=tool_call["name"],
-                tool_call_id=tool_call["id"],
-            )
+
+def tool_step_update(
+    state: AgentState, response: AnyMessage, tool_results: list
+) -> dict:
+    tool_messages = [
+        ToolMessage(
+            content=json.dumps(tool_result),
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
         )
+        for tool_call, tool_result in zip(response.tool_calls, tool_results)
+    ]
+    return {
+        **state,
+        # Large results are kept in the blob store, resolved for each prompt
+        "messages": state["messages"]
+        + [response]
+        + [offload(message) for message in tool_messages],
+        "steps_since_evaluation": state.get("steps_since_evaluation", 0) + 1,
+        "uncertain": signals_uncertainty(state["messages"], response, tool_messages),
+    }
+
+
+@instrument("main", "Call tool")
+async def atool_node(state: AgentState):
+
+    response = await bind_tools(tool_calling_model, tools, tool_choice="any").ainvoke(
+        await aresolve_messages(state["messages"])
+        + [SystemMessage(EXECUTION_SYSTEM_PROMPT)],
+    )
 
-    return {**state, "messages": state["messages"] + outputs}
+    update = proposed_answer_update(state, response.tool_calls)
+    if update is not None:
+        return update
 
+    # Independent tool calls of one step run concurrently
+    tool_results = await asyncio.gather(
+        *(
+            tools_by_name[tool_call["name"]].ainvoke(tool_call["args"])
+            for tool_call in response.tool_calls
+        )
+    )
+    # Offloading writes the large results to disk
+    return await asyncio.to_thread(tool_step_update, state, response, tool_results)
 
-def evaluate(
-    state: AgentState,
-):
-    response = task_summarization_model.invoke(
-        state["messages"] + [SystemMessage(TASK_SUMMARIZATION_SYSTEM_PROMPT)]
+
+def signals_uncertainty(
+    history: list[AnyMessage], response: AnyMessage, tool_messages: list[ToolMessage]
+) -> bool:
+    """
+    Whether the last tool step suggests the agent is stuck: it repeated a call
+    it already made, or a tool returned an error.
+    """
+    previous_calls = [
+        (call["name"], json.dumps(call["args"], sort_keys=True))
+        for message in history
+        for call in getattr(message, "tool_calls", None) or []
+    ]
+    for call in response.tool_calls:
+        if (call["name"], json.dumps(call["args"], sort_keys=True)) in previous_calls:
+            return True
+
+    for message in tool_messages:
+        result = json.loads(message.content)
+        if isinstance(result, str) and result.startswith(TOOL_ERROR_PREFIXES):
+            return True
+    return False
+
+
+def estimate_tokens(messages: list[AnyMessage]) -> int:
+    """
+    Rough token count (4 characters per token) of message contents, taking
+    the size of blobs from their references.
+    """
+    sizes = (reference_size(m.content) or len(str(m.content)) for m in messages)
+    return sum(sizes) // 4
+
+
+def should_evaluate(state: AgentState) -> bool:
+    """
+    Evaluation policy: summarize every EVALUATION_INTERVAL tool steps, as soon as
+    the messages since the last summary exceed EVALUATION_TOKEN_THRESHOLD, or
+    when the last tool step signalled uncertainty.
+    """
+    if state.get("uncertain"):
+        return True
+    if state.get("steps_since_evaluation", 0) >= EVALUATION_INTERVAL:
+        return True
+    recent = state["messages"][state.get("messages_at_evaluation", 0) :]
+    return estimate_tokens(recent) > EVALUATION_TOKEN_THRESHOLD
+
+
+@instrument("main", "Evaluate Outcome")
+async def aevaluate(state: AgentState):
+    response = await task_summarization_model.ainvoke(
+        await aresolve_messages(state["messages"])
+        + [SystemMessage(TASK_SUMMARIZATION_SYSTEM_PROMPT)]
     )
 
-    return {**state, "messages": state["messages"] + [response]}
+    return evaluation_update(state, response)
+
+
+def evaluation_update(state: AgentState, response: AnyMessage) -> dict:
+    messages = state["messages"] + [response]
+    return {
+        **state,
+        "messages": messages,
+        "steps_since_evaluation": 0,
+        "messages_at_evaluation": len(messages),
+        "uncertain": False,
+    }
+
+
+def route_after_tool(state: AgentState):
+    if state.get("proposed_answer") is not None:
+        return "Answer Proposed"
+    if should_evaluate(state):
+        return "Evaluate"
+    increment("agent_evaluations_skipped_total")
+    return "Continue"
+
 
+@instrument("main", "Format Answer")
+async def aformat_answer(state: AgentState):
+    answer = normalize_answer(state["question"], state["proposed_answer"])
+    if answer is not None:
+        increment("agent_format_answer_total", path="local")
+        return {**state, "final_answer": answer}
 
-def format_answer(state: AgentState):
-    response = format_answer_model.invoke(
-        [
-            SystemMessage(content=FORMAT_ANSWER_SYSTEM_PROMPT),
-            HumanMessage(
-                content=f"USER_QUESTION: {state["question"]}\n\nLONG_FORM_ANSWER: {state["proposed_answer"]}"
-            ),
-        ]
+    increment("agent_format_answer_total", path="llm")
+    response = await format_answer_model.ainvoke(format_answer_messages(state))
+
+    return {**state, "final_answer": tidy_answer(response.content)}
+
+
+def format_answer_messages(state: AgentState) -> list[AnyMessage]:
+    return [
+        SystemMessage(content=FORMAT_ANSWER_SYSTEM_PROMPT),
+        HumanMessage(
+            content=f"USER_QUESTION: {state["question"]}\n\nLONG_FORM_ANSWER: {state["proposed_answer"]}"
+        ),
+    ]
+
+
+def route_after_triage(state: AgentState):
+    if state.get("proposed_answer") is not None:
+        return "Answer Proposed"
+    if state.get("planned"):
+        return "Planned"
+    return "Continue"
+
+
+@cache
+def build_agent():
+    """
+    Compile the main agent graph on first use. Its nodes are coroutines: every
+    run drives it on an event loop with `astream`.
+    """
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("Triage", atriage_node)
+    workflow.add_node("Set Action Plan", aplan)
+    workflow.add_node("Call tool", atool_node)
+    workflow.add_node("Evaluate Outcome", aevaluate)
+    workflow.add_node("Format Answer", aformat_answer)
+
+    workflow.add_edge(START, "Triage")
+    workflow.add_conditional_edges(
+        "Triage",
+        route_after_triage,
+        {
+            "Answer Proposed": "Format Answer",
+            "Planned": "Call tool",
+            "Continue": "Set Action Plan",
+        },
+    )
+    workflow.add_edge("Set Action Plan", "Call tool")
+    workflow.add_conditional_edges(
+        "Call tool",
+        route_after_tool,
+        {
+            "Answer Proposed": "Format Answer",
+            "Evaluate": "Evaluate Outcome",
+            "Continue": "Call tool",
+        },
     )
-    answer = response.content
+    workflow.add_edge("Evaluate Outcome", "Call tool")
+    workflow.add_edge("Format Answer", END)
 
-    if answer and not answer[-1].isalnum():
-        answer = answer[:-1]
+    return workflow.compile().with_config(
+        config={"callbacks": [get_langfuse_handler(), metrics_handler]}
+    )
 
-    if answer and len(answer) > 0 and answer[0].isalpha() and "," not in answer:
-        answer = answer[0].upper() + answer[1:]
 
-    return {**state, "final_answer": answer}
+def export_graph_diagrams():
+    """Refresh the mermaid diagrams of the main graph and its subgraphs."""
+    from graphs.audio_agent import get_audio_agent
+    from tools.analyze_youtube import get_youtube_analyst
 
+    save_mermaid(build_agent(), "graph.md")
+    save_mermaid(get_youtube_analyst(), "youtube_analyst.md")
+    save_mermaid(get_audio_agent(), "audio_agent_graph.md")
 
-workflow = StateGraph(AgentState)
 
-workflow.add_node("Triage", triage_node)
-workflow.add_node("Set Action Plan", plan)
-workflow.add_node("Call tool", tool_node)
-workflow.add_node("Evaluate Outcome", evaluate)
-workflow.add_node("Format Answer", format_answer)
+def best_effort_candidate(state: AgentState) -> Optional[str]:
+    """
+    The best answer available in a run that was cut short: the proposed answer
+    if there is one, otherwise the latest evaluation summary.
+    """
+    candidate = state.get("proposed_answer")
+    if candidate is None and state.get("messages_at_evaluation"):
+        candidate = state["messages"][state["messages_at_evaluation"] - 1].content
+    return candidate or None
 
-workflow.add_edge(START, "Triage")
-workflow.add_conditional_edges(
-    "Triage",
-    lambda state: (
-        "Answer Proposed" if state.get("proposed_answer") is not None else "Continue"
-    ),
-    {"Answer Proposed": "Format Answer", "Continue": "Set Action Plan"},
-)
-workflow.add_edge("Set Action Plan", "Call tool")
-workflow.add_conditional_edges(
-    "Call tool",
-    lambda state: (
-        "Answer Proposed" if state.get("proposed_answer") is not None else "Continue"
-    ),
-    {"Answer Proposed": "Format Answer", "Continue": "Evaluate Outcome"},
-)
-workflow.add_edge("Evaluate Outcome", "Call tool")
-workflow.add_edge("Format Answer", END)
 
-agent = workflow.compile().with_config(config={"callbacks": [langfuse_handler]})
+async def abest_effort_answer(state: AgentState) -> Optional[str]:
+    candidate = best_effort_candidate(state)
+    if candidate is None:
+        return None
+    formatted = await aformat_answer({**state, "proposed_answer": candidate})
+    return formatted["final_answer"]
 
-graph_mermaid = agent.get_graph().draw_mermaid()
-with open("graph.md", "w") as f:
-    f.write("```mermaid\n")
-    f.write(graph_mermaid)
-    f.write("```")
 
+def question_budget() -> QuestionBudget:
+    return QuestionBudget(
+        max_seconds=QUESTION_TIME_BUDGET_SECONDS,
+        max_tokens=QUESTION_TOKEN_BUDGET,
+        max_llm_calls=QUESTION_LLM_CALL_BUDGET,
+    )
 
-def main():
-    hf = HFClient(
+
+async def arun_agent(agent, inputs: AgentState) -> tuple[Optional[str], bool]:
+    """
+    Answer one question within its time, token and LLM-call budget. A run that
+    hits a budget or the recursion limit ends with the best answer so far, and
+    the time budget also cancels a node that is still running when it runs out.
+    Returns the answer and whether the run was cut short.
+    """
+    budget = question_budget()
+    deadline = asyncio.timeout(budget.max_seconds)
+    state = inputs
+    try:
+        async with deadline:
+            async for state in agent.astream(
+                inputs,
+                config={
+                    "recursion_limit": recursion_limit,
+                    "callbacks": [budget],
+                },
+                stream_mode="values",
+            ):
+                pass
+        return state["final_answer"], False
+    except (BudgetExceeded, GraphRecursionError, TimeoutError) as e:
+        if isinstance(e, TimeoutError):
+            if not deadline.expired():
+                raise
+            e = budget.timed_out()
+        print(f"⏳ {e}. Formatting the best answer so far...")
+        return await abest_effort_answer(state), True
+
+
+def agent_inputs(question: dict) -> AgentState:
+    content = [{"type": "text", "text": question["question"]}]
+    file_path = question["file_path"]
+
+    if file_path.endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".webp")):
+        print(f"Attaching image file: {file_path}")
+        with open(file_path, "rb") as image_file:
+            encoded_image = base64.b64encode(image_file.read()).decode("utf-8")
+            content.append(
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/png;base64,{encoded_image}"},
+                }
+            )
+
+    return {
+        "messages": [HumanMessage(content=content)],
+        "question": question["question"],
+        "proposed_answer": None,
+        "final_answer": None,
+        "file_path": file_path,
+    }
+
+
+def hf_client() -> HFClient:
+    return HFClient(
         base_url=BASE_URL,
         questions_json_path=QUESTIONS_JSON_PATH,
         attachments_dir=ATTACHMENTS_DIR,
     )
-    questions = hf.get_questions()
 
-    answers = list(
-        map(
-            lambda question: {
-                "task_id": question["task_id"],
-                "submitted_answer": "This is a default answer.",
-            },
-            questions,
-        )
-    )
 
+def select_questions(questions: list[dict]) -> list[dict]:
     # Check if any question has 'only': true
     only_questions = [q for q in questions if q.get("only", False)]
     if only_questions:
-        questions = [only_questions[0]]
+        return [only_questions[0]]
+    return [q for q in questions if not q.get("skip")]
+
+
+def default_answers(questions: list[dict]) -> list[dict]:
+    return [
+        {
+            "task_id": question["task_id"],
+            "submitted_answer": "This is a default answer.",
+        }
+        for question in questions
+    ]
+
+
+def set_answer(answers: list[dict], task_id: str, answer: Optional[str]):
+    # Without an answer, e.g. from a run cut short before it had one, the
+    # default answer stays
+    if answer is None:
+        return
+    # Update answer in existing list instead of appending a new entry
+    for ans in answers:
+        if ans["task_id"] == task_id:
+            ans["submitted_answer"] = answer
+            break
+
+
+def memoized_answer(memo: RunMemo, key: str, question: dict) -> Optional[str]:
+    """The last answer of an unchanged question, unless it is known to be wrong."""
+    previous_answer = memo.get(key)
+    expected_answer = question.get("answer")
+    if previous_answer is None or expected_answer not in (None, previous_answer):
+        return None
+    increment("agent_run_memo_total", outcome="reused")
+    print(f"♻️ {previous_answer} (unchanged: {question['question'][:60]})")
+    return previous_answer
+
+
+async def aanswer_question(agent, question: dict) -> tuple[Optional[str], bool]:
+    """
+    Run the agent on a question and report the answer, None if it failed, and
+    whether the run was cut short.
+    """
+    print("\n---\n")
+    expected_answer = question.get("answer")
+    print(f"❓ {question['question']} (Expected answer: {expected_answer})")
+    try:
+        print("🤖 Invoking agent...")
+        answer, cut_short = await arun_agent(agent, agent_inputs(question))
+    except Exception as e:
+        print(f"🚨 {e}")
+        return None, False
+    increment("agent_run_memo_total", outcome="answered")
+    if expected_answer:
+        print(f"{"✅" if answer == expected_answer else "❌"} {answer}")
     else:
-        questions = [q for q in questions if not q.get("skip")]
-
-    for question in questions:
-        print("\n---\n")
-        expected_answer = question.get("answer")
-        print(f"❓ {question['question']} (Expected answer: {expected_answer})")
-        content = [{"type": "text", "text": question["question"]}]
-        file_path = question["file_path"]
-
-        if file_path.endswith(
-            (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".webp")
-        ):
-            print(f"Attaching image file: {file_path}")
-            with open(file_path, "rb") as image_file:
-                encoded_image = base64.b64encode(image_file.read()).decode("utf-8")
-                content.append(
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{encoded_image}"},
-                    }
-                )
-        try:
-            print("🤖 Invoking agent...")
-            response = agent.invoke(
-                {
-                    "messages": [HumanMessage(content=content)],
-                    "question": question["question"],
-                    "proposed_answer": None,
-                    "final_answer": None,
-                    "file_path": file_path,
-                },
-                config={"recursion_limit": recursion_limit},
-            )
-            answer = response["final_answer"]
-            # Update answer in existing list instead of appending a new entry
-            for ans in answers:
-                if ans["task_id"] == question["task_id"]:
-                    ans["submitted_answer"] = answer
-                    break
-            if expected_answer:
-                print(f"{"✅" if answer == expected_answer else "❌"} {answer}")
-            else:
-                print(f"🙋🏻 {answer}")
+        print(f"🙋🏻 {answer}")
+    return answer, cut_short
 
-        except Exception as e:
-            print(f"🚨 {e}")
 
+def save_and_submit(hf: HFClient, answers: list[dict]):
     # Write the answers to a JSON file for reference
     print("\nSaving answers locally...")
     with open(PREVIOUS_ANSWERS_JSON_PATH, "w") as f:
@@ -342,6 +700,184 @@ def main():
     print("\nSubmission result:")
     print(submission_response)
 
+    export_metrics(METRICS_PATH)
+    print(f"\nMetrics written to {METRICS_PATH}")
+
+
+async def amain(concurrency: int = QUESTION_CONCURRENCY, force: bool = False):
+    agent = build_agent()
+    if force:
+        bypass_query_cache()
+    if EXPORT_GRAPH_DIAGRAMS:
+        export_graph_diagrams()
+
+    hf = hf_client()
+    questions = hf.get_questions()
+    answers = default_answers(questions)
+
+    memo = RunMemo(RUN_MEMO_PATH)
+    models = model_settings()
+
+    # All questions share one event loop; the semaphore caps how many are in
+    # flight at once.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer_question(question):
+        key = question_key(question, models)
+        answer = None if force else memoized_answer(memo, key, question)
+        if answer is None:
+            async with semaphore:
+                answer, cut_short = await aanswer_question(agent, question)
+            if answer is None:
+                return
+            # A best-effort answer is worth another run next time
+            if not cut_short:
+                memo.put(key, question["task_id"], answer)
+        set_answer(answers, question["task_id"], answer)
+
+    try:
+        await asyncio.gather(*(answer_question(q) for q in select_questions(questions)))
+    finally:
+        await close_browser_pool()
+        memo.save()
+
+    save_and_submit(hf, answers)
+
+
+def coordinate(queue_path: str = WORK_QUEUE_PATH, force: bool = False):
+    """
+    Sharded run: queue the questions that need an answer for `worker` processes,
+    wait for them, and merge their answers into a single submission.
+    """
+    hf = hf_client()
+    questions = hf.get_questions()
+    answers = default_answers(questions)
+
+    memo = RunMemo(RUN_MEMO_PATH)
+    models = model_settings()
+    keys = {}
+    for question in select_questions(questions):
+        key = question_key(question, models)
+        answer = None if force else memoized_answer(memo, key, question)
+        if answer is None:
+            keys[question["task_id"]] = key
+        else:
+            set_answer(answers, question["task_id"], answer)
+
+    queue = WorkQueue(
+        queue_path,
+        lease_seconds=WORK_QUEUE_LEASE_SECONDS,
+        max_attempts=WORK_QUEUE_MAX_ATTEMPTS,
+    )
+    run_id = queue.reset(list(keys))
+    print(f"📋 Queued {len(keys)} questions in {queue_path}")
+
+    counts = None
+    while queue.finished_run() != run_id:
+        time.sleep(WORK_QUEUE_POLL_SECONDS)
+        if queue.counts() != counts:
+            counts = queue.counts()
+            print(f"⏳ {counts}")
+
+    for task_id, answer in queue.answers().items():
+        set_answer(answers, task_id, answer)
+    for task_id, answer in queue.answers(cut_short=False).items():
+        memo.put(keys[task_id], task_id, answer)
+    memo.save()
+    print(f"📋 {queue.counts()}")
+
+    save_and_submit(hf, answers)
+
+
+async def aworker(
+    queue_path: str = WORK_QUEUE_PATH,
+    concurrency: int = QUESTION_CONCURRENCY,
+    force: bool = False,
+):
+    """
+    Sharded run: answer questions claimed from the work queue, `concurrency` at
+    a time, until the coordinator's queue is finished.
+    """
+    agent = build_agent()
+    if force:
+        bypass_query_cache()
+    questions = {q["task_id"]: q for q in hf_client().get_questions()}
+    queue = WorkQueue(
+        queue_path,
+        lease_seconds=WORK_QUEUE_LEASE_SECONDS,
+        max_attempts=WORK_QUEUE_MAX_ATTEMPTS,
+    )
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    # A run finished before the worker started is a previous one; the worker
+    # waits for the coordinator to queue the next
+    previous_run = queue.finished_run()
+
+    async def work():
+        while True:
+            task_id = await asyncio.to_thread(queue.claim, worker_id)
+            if task_id is None:
+                finished_run = await asyncio.to_thread(queue.finished_run)
+                if finished_run not in (None, previous_run):
+                    return
+                await asyncio.sleep(WORK_QUEUE_POLL_SECONDS)
+                continue
+            answer, cut_short = await aanswer_question(agent, questions[task_id])
+            if answer is None:
+                error = "no answer within budget" if cut_short else "agent error"
+                await asyncio.to_thread(queue.fail, task_id, error)
+            else:
+                await asyncio.to_thread(queue.complete, task_id, answer, cut_short)
+
+    try:
+        await asyncio.gather(*(work() for _ in range(concurrency)))
+    finally:
+        await close_browser_pool()
+
+    # One metrics file per worker, next to the coordinator's
+    root, extension = os.path.splitext(METRICS_PATH)
+    metrics_path = f"{root}.{worker_id}{extension}"
+    export_metrics(metrics_path)
+    print(f"\nMetrics written to {metrics_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer and submit the questions.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=QUESTION_CONCURRENCY,
+        help="Number of questions answered concurrently.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Answer every question again, even if its inputs are unchanged, "
+        "without reusing cached answers about documents.",
+    )
+    role = parser.add_mutually_exclusive_group()
+    role.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="Queue the questions for workers, then merge and submit their answers.",
+    )
+    role.add_argument(
+        "--worker",
+        action="store_true",
+        help="Answer questions from the coordinator's work queue.",
+    )
+    parser.add_argument(
+        "--queue",
+        default=WORK_QUEUE_PATH,
+        help="Work queue of a sharded run, on a directory shared by all workers.",
+    )
+    args = parser.parse_args()
+    if args.coordinator:
+        coordinate(args.queue, force=args.force)
+    elif args.worker:
+        asyncio.run(aworker(args.queue, args.concurrency, force=args.force))
+    else:
+        asyncio.run(amain(args.concurrency, force=args.force))
+
 
 if __name__ == "__main__":
     main()
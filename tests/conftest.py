@@ -0,0 +1,4 @@
+import os
+
+# Importing the tools builds chat models, which need a key but no network
+os.environ.setdefault("OPENAI_API_KEY", "test")
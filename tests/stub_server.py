@@ -0,0 +1,94 @@
+"""
+Local fault-injecting HTTP server for exercising timeouts, retries and hedging.
+
+Usage:
+    with StubServer(fail_first=2, status=503) as server:
+        http.get(server.url)
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class StubServer:
+    """
+    Serves `body` on every path of a local port, after injecting faults:
+
+    - the first `fail_first` requests get `status` (e.g. 503)
+    - requests whose 1-based number is in `slow_requests` sleep `delay` seconds
+    - with `drop_first`, the first requests close the connection without reply
+    """
+
+    def __init__(
+        self,
+        body: bytes = b"ok",
+        fail_first: int = 0,
+        status: int = 503,
+        delay: float = 0.0,
+        slow_requests: Optional[set[int]] = None,
+        drop_first: int = 0,
+    ):
+        self.body = body
+        self.fail_first = fail_first
+        self.status = status
+        self.delay = delay
+        self.slow_requests = slow_requests
+        self.drop_first = drop_first
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _next_request(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like real servers
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                number = stub._next_request()
+                # Drain the request body so it isn't read as the next request
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if number <= stub.drop_first:
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                if stub.slow_requests is None or number in stub.slow_requests:
+                    time.sleep(stub.delay)
+                if number <= stub.drop_first + stub.fail_first:
+                    self.send_response(stub.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(stub.body)))
+                    self.end_headers()
+                    self.wfile.write(stub.body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (timeout or hedged duplicate)
+
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, _exc_type, _exc_val, _exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,29 @@
+import json
+import os
+
+import pytest
+
+from utils.answer_normalizer import normalize_answer, tidy_answer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES_DIR, "answers.json"), "r", encoding="utf-8") as f:
+    CASES = json.load(f)
+
+
+@pytest.mark.parametrize(
+    "question, answer, expected",
+    [(case["question"], case["answer"], case["expected"]) for case in CASES],
+)
+def test_normalize_answer(question, answer, expected):
+    # None means the answer is left to the format_answer model
+    assert normalize_answer(question, answer) == expected
+
+
+def test_no_answer():
+    assert normalize_answer("Who won?", None) is None
+
+
+def test_tidy_answer():
+    assert tidy_answer("paris.") == "Paris"
+    assert tidy_answer("apple, banana") == "apple, banana"
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from utils.arxiv_index import ArxivIndex, ArxivPaper, query_key
+
+
+def paper(paper_id: str, title: str, summary: str = "") -> ArxivPaper:
+    return ArxivPaper(
+        id=paper_id,
+        title=title,
+        authors=["Ada Lovelace"],
+        published="2020-01-01T00:00:00Z",
+        summary=summary,
+        pdf_url=f"https://arxiv.org/pdf/{paper_id}",
+    )
+
+
+def test_query_key_keeps_token_order():
+    assert query_key("  ti:graph   au:smith ") == "ti:graph au:smith"
+    assert query_key("ti:a au:b") != query_key("ti:b au:a")
+
+
+def test_cached_results(tmp_path):
+    index = ArxivIndex(str(tmp_path / "arxiv.sqlite"))
+    assert index.cached_results("ti:graph") is None
+
+    papers = [paper("2001.1", "Graph networks"), paper("2001.2", "Graph kernels")]
+    index.store("ti:graph", papers)
+    assert index.cached_results(" ti:graph ") == papers
+    assert index.cached_results("ti:kernels") is None
+
+
+def test_empty_results_are_cached(tmp_path):
+    index = ArxivIndex(str(tmp_path / "arxiv.sqlite"))
+    index.store("ti:nothing", [])
+    assert index.cached_results("ti:nothing") == []
+
+
+def test_cached_results_expire(tmp_path, monkeypatch):
+    index = ArxivIndex(str(tmp_path / "arxiv.sqlite"), ttl_seconds=60)
+    index.store("ti:graph", [paper("2001.1", "Graph networks")])
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert index.cached_results("ti:graph") is None
+
+
+def test_search_ranks_title_matches_first(tmp_path):
+    index = ArxivIndex(str(tmp_path / "arxiv.sqlite"))
+    if not index.full_text:
+        pytest.skip("SQLite built without FTS5")
+    index.store(
+        "q1",
+        [
+            paper("2001.1", "Protein folding", "We use graph neural networks."),
+            paper("2001.2", "Graph neural networks", "A survey."),
+            paper("2001.3", "Image segmentation", "Convolutional networks."),
+        ],
+    )
+    assert [p["id"] for p in index.search("graph networks", 10)] == [
+        "2001.2",
+        "2001.1",
+    ]
+    assert index.search("graph networks", 1)[0]["id"] == "2001.2"
+    assert index.search("?", 10) == []
+
+
+def test_store_replaces_papers_in_index(tmp_path):
+    index = ArxivIndex(str(tmp_path / "arxiv.sqlite"))
+    if not index.full_text:
+        pytest.skip("SQLite built without FTS5")
+    index.store("q1", [paper("2001.1", "Old title")])
+    index.store("q2", [paper("2001.1", "New title")])
+    assert index.search("old", 10) == []
+    assert [p["title"] for p in index.search("new", 10)] == ["New title"]
+    assert index.cached_results("q1")[0]["title"] == "New title"
@@ -0,0 +1,56 @@
+import httpx
+import pytest
+
+from utils import http
+from web_scraper import arxiv_papers
+from web_scraper.arxiv_papers import (
+    PaperStore,
+    fetch_rendition,
+    paper_text,
+    parse_arxiv_url,
+    pdf_to_text,
+)
+
+PDF = httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF")
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://arxiv.org/abs/2401.01234", ("2401.01234", None)),
+        ("https://arxiv.org/pdf/2401.01234v2.pdf", ("2401.01234", 2)),
+        ("http://export.arxiv.org/abs/hep-th/9901001v1", ("hep-th/9901001", 1)),
+        ("https://arxiv.org/list/cs.AI/recent", None),
+    ],
+)
+def test_parse_arxiv_url(url, expected):
+    assert parse_arxiv_url(url) == expected
+
+
+@pytest.mark.parametrize("markdown", ["File too large", "", "  \n"])
+def test_pdf_without_text(monkeypatch, markdown):
+    monkeypatch.setattr(arxiv_papers, "pdf_to_markdown", lambda content: markdown)
+    assert pdf_to_text(PDF) is None
+
+
+def test_rendition_after_failed_request(monkeypatch):
+    def get(url, **kwargs):
+        if "/html/" in url:
+            raise http.HTTPError("connection reset")
+        if "/e-print/" in url:
+            return httpx.Response(404)
+        return PDF
+
+    monkeypatch.setattr(http, "get", get)
+    monkeypatch.setattr(arxiv_papers, "pdf_to_markdown", lambda content: "Text")
+    assert fetch_rendition("2401.01234", 1) == ("Text", "pdf")
+
+
+def test_oversized_pdf_is_not_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(http, "get", lambda url, **kwargs: PDF)
+    monkeypatch.setattr(
+        arxiv_papers, "pdf_to_markdown", lambda content: "File too large"
+    )
+    store = PaperStore(str(tmp_path / "papers.db"))
+    assert paper_text("https://arxiv.org/abs/2401.01234v1", store) is None
+    assert store.get("2401.01234", 1) is None
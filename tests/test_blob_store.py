@@ -0,0 +1,90 @@
+import os
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from utils import blob_store
+from utils.blob_store import BlobStore, offload, reference_size, resolve_messages
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / "blobs"), memory_bytes=100)
+    monkeypatch.setattr(blob_store, "get_blob_store", lambda: store)
+    monkeypatch.setattr(blob_store, "BLOB_MIN_BYTES", 10)
+    return store
+
+
+def test_put_and_get(store):
+    reference = store.put("é" * 20)
+    assert reference_size(reference) == 40
+    assert store.put("é" * 20) == reference
+    assert store.get(reference) == "é" * 20
+
+    # From disk once it no longer fits in memory
+    store.put("x" * 90)
+    assert store.get(reference) == "é" * 20
+
+
+def test_get_rejects_other_strings(store):
+    assert reference_size("plain text") is None
+    with pytest.raises(ValueError):
+        store.get("plain text")
+
+
+def test_offload_and_resolve(store):
+    small = ToolMessage("short", tool_call_id="1")
+    large = ToolMessage("a long tool output", tool_call_id="2")
+    messages = [HumanMessage("question"), offload(small), offload(large)]
+
+    assert messages[1] is small
+    assert reference_size(messages[2].content) == len("a long tool output")
+    assert messages[2].tool_call_id == "2"
+    assert [m.content for m in resolve_messages(messages)] == [
+        "question",
+        "short",
+        "a long tool output",
+    ]
+    # References in other messages are left alone
+    reference = HumanMessage(messages[2].content)
+    assert resolve_messages([reference]) == [reference]
+
+
+def age(store, reference, seconds):
+    path = store._path(reference.split(":")[1])
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_sweep_deletes_expired_blobs(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), memory_bytes=100, ttl_seconds=60)
+    old = age(store, store.put("old output"), 120)
+    recent = age(store, store.put("recent output"), 30)
+    stored_again = store.put("stored again")
+    age(store, stored_again, 120)
+    store.put("stored again")
+
+    assert store.sweep() == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(recent)
+    assert store.get(stored_again) == "stored again"
+
+
+def test_put_sweeps_once_per_ttl(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), memory_bytes=100, ttl_seconds=60)
+    old = age(store, store.put("old output"), 120)
+    store.put("new output")
+    assert os.path.exists(old)
+
+    store._swept_at -= 61
+    store.put("new output")
+    assert not os.path.exists(old)
+
+
+def test_no_sweep_without_ttl(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), memory_bytes=100)
+    old = age(store, store.put("old output"), 10**6)
+    assert store.sweep() == 0
+    assert os.path.exists(old)
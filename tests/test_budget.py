@@ -0,0 +1,24 @@
+import pytest
+
+from utils.budget import BudgetExceeded, QuestionBudget
+
+
+def test_llm_call_budget():
+    budget = QuestionBudget(max_llm_calls=2)
+    budget.on_llm_start({}, [], run_id=None)
+    budget.on_llm_start({}, [], run_id=None)
+    with pytest.raises(BudgetExceeded) as exceeded:
+        budget.on_llm_start({}, [], run_id=None)
+    assert exceeded.value.resource == "llm_calls"
+
+
+def test_time_budget():
+    budget = QuestionBudget(max_seconds=0)
+    with pytest.raises(BudgetExceeded):
+        budget.on_tool_start({}, "", run_id=None)
+
+
+def test_timed_out():
+    exceeded = QuestionBudget(max_seconds=5).timed_out()
+    assert exceeded.resource == "seconds"
+    assert exceeded.limit == 5
@@ -0,0 +1,48 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from main import should_evaluate, signals_uncertainty
+
+
+def tool_call(name: str, **args) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "1"}])
+
+
+def tool_result(result: str) -> ToolMessage:
+    return ToolMessage(content=json.dumps(result), name="search_web", tool_call_id="1")
+
+
+def test_new_call_with_result_is_certain():
+    history = [HumanMessage(content="q"), tool_call("search_web", query="a")]
+    response = tool_call("search_web", query="b")
+    assert not signals_uncertainty(history, response, [tool_result("Results")])
+
+
+def test_repeated_call_is_uncertain():
+    history = [HumanMessage(content="q"), tool_call("search_web", query="a")]
+    response = tool_call("search_web", query="a")
+    assert signals_uncertainty(history, response, [tool_result("Results")])
+
+
+def test_tool_error_is_uncertain():
+    response = tool_call("search_web", query="a")
+    assert signals_uncertainty([], response, [tool_result("Error: rate limited")])
+
+
+def state(**fields) -> dict:
+    return {"messages": [HumanMessage(content="q")], **fields}
+
+
+def test_should_evaluate():
+    assert not should_evaluate(state(steps_since_evaluation=1))
+    assert should_evaluate(state(steps_since_evaluation=2))
+    assert should_evaluate(state(steps_since_evaluation=0, uncertain=True))
+
+
+def test_should_evaluate_on_long_messages():
+    long = state(steps_since_evaluation=1)
+    long["messages"].append(ToolMessage(content="x" * 30000, tool_call_id="1"))
+    assert should_evaluate(long)
+    # Only the messages since the last evaluation count
+    assert not should_evaluate({**long, "messages_at_evaluation": 2})
@@ -0,0 +1,56 @@
+import pytest
+
+from utils import metrics
+from web_scraper.extract_text import extract_text
+
+ARTICLE = " ".join(
+    f"Sentence {i} of the article about the history of the lighthouse."
+    for i in range(30)
+)
+
+PAGE = f"""
+<html><body>
+<nav><a href="/">Home</a> <a href="/about">About us</a> <a href="/shop">Shop</a></nav>
+<article><h1>The lighthouse</h1><p>{ARTICLE}</p></article>
+<footer>Copyright footer text</footer>
+</body></html>
+"""
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def outcomes() -> dict:
+    series = metrics.summary()["counters"].get("agent_extraction_total", [])
+    return {entry["labels"]["outcome"]: entry["value"] for entry in series}
+
+
+def test_main_content_drops_boilerplate():
+    text = extract_text(PAGE, strategy="main_content", min_chars=100)
+    assert "Sentence 29 of the article" in text
+    assert "About us" not in text
+    assert "Copyright footer" not in text
+    assert outcomes() == {"main_content": 1}
+
+
+def test_full_page_keeps_everything():
+    text = extract_text(PAGE, strategy="full_page")
+    assert "Sentence 29 of the article" in text
+    assert "About us" in text
+    assert "Copyright footer" in text
+    assert outcomes() == {"full_page": 1}
+
+
+def test_short_main_content_falls_back_to_full_page():
+    text = extract_text(PAGE, strategy="main_content", min_chars=100_000)
+    assert "About us" in text
+    assert outcomes() == {"fallback": 1}
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        extract_text(PAGE, strategy="readability")
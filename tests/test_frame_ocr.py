@@ -0,0 +1,67 @@
+import sys
+
+from utils.frame_ocr import FrameTextIndex, keywords
+
+frame_ocr = sys.modules["utils.frame_ocr"]
+
+
+def test_keywords():
+    assert keywords("What score is shown on the screen at 1:05?") == {
+        "score",
+        "1",
+        "05",
+    }
+    assert keywords("What does the sign say in https://youtu.be/abc?t=3") == {"sign"}
+
+
+INDEX = FrameTextIndex(
+    [
+        ("f1.jpg", "00:00:01", "Welcome to the channel"),
+        ("f2.jpg", "00:00:02", ""),
+        ("f3.jpg", "00:00:03", "Final score Home 3 Away 2"),
+        ("f4.jpg", "00:00:04", "Score update"),
+        ("f5.jpg", "00:00:05", "Away team lineup"),
+    ]
+)
+
+
+def test_empty_text_is_not_indexed():
+    assert [entry[0] for entry in INDEX.entries] == [
+        "f1.jpg",
+        "f3.jpg",
+        "f4.jpg",
+        "f5.jpg",
+    ]
+
+
+def test_search_keeps_entries_close_to_the_best():
+    # f3 matches "final", "score" and "away"; f4 and f5 one keyword each
+    assert [e[0] for e in INDEX.search("What was the final score of Away?")] == [
+        "f3.jpg"
+    ]
+    # f3 matches both keywords, f4 and f5 one each: at least half as many
+    assert [e[0] for e in INDEX.search("Which score for the away team?")] == [
+        "f3.jpg",
+        "f4.jpg",
+        "f5.jpg",
+    ]
+
+
+def test_search_without_matches():
+    assert INDEX.search("What color is the car?") == []
+    assert INDEX.search("What is shown?") == []
+
+
+def test_format():
+    assert INDEX.format(INDEX.search("final score")) == (
+        "[00:00:03] Final score Home 3 Away 2\n[00:00:04] Score update"
+    )
+
+
+def test_build_keeps_frame_order(monkeypatch):
+    monkeypatch.setattr(frame_ocr, "ocr_frame", lambda path: f"text in {path}")
+    index = FrameTextIndex.build([("a.jpg", "00:00:01"), ("b.jpg", "00:00:02")], 2)
+    assert index.entries == [
+        ("a.jpg", "00:00:01", "text in a.jpg"),
+        ("b.jpg", "00:00:02", "text in b.jpg"),
+    ]
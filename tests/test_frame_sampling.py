@@ -0,0 +1,72 @@
+import pytest
+
+from utils.frame_sampling import (
+    format_timestamp,
+    pick_evenly,
+    segment_starts,
+    sweep_fps,
+    timestamp_seconds,
+    zoom_window,
+)
+
+
+def test_timestamps_round_trip():
+    assert format_timestamp(3725.5) == "01:02:05.500"
+    assert timestamp_seconds("01:02:05.500") == 3725.5
+    assert timestamp_seconds("02:05") == 125
+    assert timestamp_seconds("42") == 42
+
+
+def test_sweep_fps():
+    assert sweep_fps(None, 30) == 0.2
+    assert sweep_fps(600, 30) == 0.05
+    # Short videos are not swept faster than one frame per second
+    assert sweep_fps(10, 30) == 1.0
+
+
+def test_pick_evenly():
+    assert pick_evenly(range(10), 5) == [0, 2, 4, 6, 8]
+    assert pick_evenly([1, 2], 5) == [1, 2]
+    assert pick_evenly([1, 2], 0) == []
+
+
+def test_zoom_window():
+    assert zoom_window(30, 10, 2, 100) == (2, 25, 35)
+    # The rate drops to fit the frames left
+    assert zoom_window(30, 10, 2, 5) == (0.5, 25, 35)
+    # The window is clipped to the video
+    assert zoom_window(2, 10, 1, 100, duration=5) == (1, 0, 5)
+    assert zoom_window(30, 10, 2, 0) is None
+    assert zoom_window(10, 10, 2, 5, duration=5) is None
+
+
+def test_segment_starts_snap_to_keyframes_on_the_grid():
+    keyframes = [0, 10.2, 19.7, 30.4, 40.3, 50.1]
+    starts = segment_starts(keyframes, 0, 60, 1, 3, 10)
+    assert starts == [0, 20, 41]
+
+
+def test_segment_starts_keyframe_on_the_grid():
+    assert segment_starts([0, 30], 0, 60, 0.5, 2, 10) == [0, 30]
+
+
+def test_segment_starts_offset_grid():
+    # The grid of a zoom starting at 5.5 with 2 fps is 5.5, 6, 6.5, ...
+    assert segment_starts([0, 17.2], 5.5, 30.5, 2, 2, 10) == [5.5, 17.5]
+
+
+@pytest.mark.parametrize(
+    "keyframes, end, segments",
+    [
+        ([], 60, 4),  # no keyframes known
+        ([0, 30], 60, 1),  # a single part asked for
+        ([0, 5], 15, 4),  # too short to split
+    ],
+)
+def test_segment_starts_single_part(keyframes, end, segments):
+    assert segment_starts(keyframes, 0, end, 1, segments, 10) == [0]
+
+
+def test_segment_starts_skip_duplicate_keyframes():
+    # Every split point is nearest to the same keyframe
+    assert segment_starts([0, 31], 0, 60, 1, 4, 10) == [0, 31]
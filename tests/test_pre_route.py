@@ -0,0 +1,31 @@
+import pytest
+
+from main import pre_route
+
+VIDEO = "https://www.youtube.com/watch?v=L1vXCYZAYYM"
+
+
+@pytest.mark.parametrize(
+    "question, file_path, expected",
+    [
+        (f"What bird is shown in {VIDEO}?", None, ("youtube", VIDEO)),
+        (
+            "What is said at https://youtu.be/1htKBjuUWec?",
+            "",
+            ("youtube", "https://youtu.be/1htKBjuUWec"),
+        ),
+        (f"Compare {VIDEO} and {VIDEO}", None, ("youtube", VIDEO)),
+        (
+            "What does the speaker ask for?",
+            "files/recording.MP3",
+            ("audio", "files/recording.MP3"),
+        ),
+        # More than one candidate delegate is left to the triage model
+        (f"Is the song in {VIDEO} the one in the recording?", "files/song.mp3", None),
+        (f"Compare {VIDEO} and https://youtu.be/1htKBjuUWec", None, None),
+        (f"What does the table say about {VIDEO}?", "files/table.xlsx", None),
+        ("What is the capital of Peru?", None, None),
+    ],
+)
+def test_pre_route(question, file_path, expected):
+    assert pre_route(question, file_path) == expected
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+from web_scraper.prefetch import DocumentCache, Prefetcher
+
+
+def test_cache_evicts_least_recently_used():
+    cache = DocumentCache(max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"
+
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.size == 8
+
+
+def test_cache_counts_bytes_and_replacements():
+    cache = DocumentCache(max_bytes=10)
+    cache.put("a", "é" * 4)
+    assert cache.size == 8
+    cache.put("a", "ab")
+    assert cache.size == 2
+    cache.put("big", "x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == "ab"
+
+
+def test_get_waits_for_prefetch_in_flight():
+    release = threading.Event()
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        release.wait(5)
+        return f"text of {url}"
+
+    prefetcher = Prefetcher(DocumentCache(1000), concurrency=2)
+    prefetcher.prefetch(["u1", "u2"], fetch)
+    prefetcher.prefetch(["u1"], fetch)
+    release.set()
+
+    assert prefetcher.get("u1") == "text of u1"
+    assert prefetcher.get("u2") == "text of u2"
+    assert prefetcher.get("u3") is None
+    assert sorted(calls) == ["u1", "u2"]
+
+    prefetcher.prefetch(["u1"], fetch)
+    assert sorted(calls) == ["u1", "u2"]
+
+
+def test_failed_prefetch_is_a_miss():
+    def fetch(url):
+        raise RuntimeError("boom")
+
+    prefetcher = Prefetcher(DocumentCache(1000), concurrency=1)
+    prefetcher.prefetch(["u1"], fetch)
+    assert prefetcher.get("u1") is None
+
+
+def test_aget_waits_for_prefetch_task():
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return f"text of {url}"
+
+    async def run():
+        prefetcher = Prefetcher(DocumentCache(1000), concurrency=1)
+        prefetcher.aprefetch(["u1", "u2"], fetch)
+        prefetcher.aprefetch(["u2"], fetch)
+        return [await prefetcher.aget(url) for url in ("u2", "u1", "u3")]
+
+    assert asyncio.run(run()) == ["text of u2", "text of u1", None]
+    assert calls == ["u1", "u2"]
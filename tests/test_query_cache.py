@@ -0,0 +1,105 @@
+import sqlite3
+import time
+
+from utils.query_cache import QueryCache, key_terms, query_key, tfidf_similarities
+
+
+def test_query_key_ignores_case_and_punctuation():
+    assert query_key("  What is the Title? ") == "what is the title"
+
+
+def test_tfidf_similarities():
+    identical, unrelated = tfidf_similarities(
+        "who wrote the book", ["who wrote the book", "capital of peru"]
+    )
+    assert abs(identical - 1) < 1e-9
+    assert unrelated == 0
+
+
+def test_exact_match(tmp_path):
+    cache = QueryCache(str(tmp_path / "answers.db"), threshold=1)
+    assert cache.lookup("doc", "Who wrote it?") == (None, "miss")
+
+    cache.store("doc", "Who wrote it?", "Ann")
+    assert cache.lookup("doc", "who wrote it") == ("Ann", "exact")
+    assert cache.lookup("other", "Who wrote it?") == (None, "miss")
+    assert cache.lookup("doc", "Who wrote it first?") == (None, "miss")
+
+
+QUESTION = "Who was the Yankee player with the most walks in the 1977 regular season?"
+
+
+def test_key_terms():
+    assert key_terms(QUESTION) == {"yankee", "1977"}
+    assert key_terms("What happened? Nothing in May.") == {"may"}
+
+
+def test_near_duplicate_query(tmp_path):
+    cache = QueryCache(str(tmp_path / "answers.db"), threshold=0.9)
+    cache.store("doc", QUESTION, "Roy White")
+    rephrased = "Who was the Yankee player with most walks in the 1977 regular season?"
+    assert cache.lookup("doc", rephrased) == ("Roy White", "similar")
+
+
+def test_similar_query_about_another_year(tmp_path):
+    other_year = QUESTION.replace("1977", "1978")
+    [similarity] = tfidf_similarities(query_key(QUESTION), [query_key(other_year)])
+    assert similarity >= 0.9
+
+    cache = QueryCache(str(tmp_path / "answers.db"), threshold=0.9)
+    cache.store("doc", QUESTION, "Roy White")
+    assert cache.lookup("doc", other_year) == (None, "miss")
+
+
+def test_similar_query_about_another_name(tmp_path):
+    cache = QueryCache(str(tmp_path / "answers.db"), threshold=0.8)
+    cache.store("doc", QUESTION, "Roy White")
+    other_team = QUESTION.replace("Yankee", "Red Sox")
+    assert cache.lookup("doc", other_team) == (None, "miss")
+
+
+def test_cache_without_queries(tmp_path):
+    path = str(tmp_path / "answers.db")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE answers (document_key TEXT NOT NULL, query_key TEXT NOT NULL, "
+        "answer TEXT NOT NULL, created_at REAL NOT NULL, "
+        "PRIMARY KEY (document_key, query_key))"
+    )
+    connection.execute(
+        "INSERT INTO answers VALUES (?, ?, ?, 0)", ("doc", query_key(QUESTION), "Roy")
+    )
+    connection.commit()
+    connection.close()
+
+    cache = QueryCache(path, threshold=0.5)
+    assert cache.lookup("doc", QUESTION) == ("Roy", "exact")
+    # Earlier rows lack the query its names would be compared with
+    assert cache.lookup("doc", QUESTION.replace("the most", "most")) == (None, "miss")
+    cache.store("doc", "Who won?", "Ann")
+    assert cache.lookup("doc", "Who won?") == ("Ann", "exact")
+
+
+def test_expired_answers(tmp_path, monkeypatch):
+    path = str(tmp_path / "answers.db")
+    cache = QueryCache(path, threshold=1, ttl_seconds=60)
+    cache.store("doc", "Who won?", "Ann")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.lookup("doc", "Who won?") == (None, "miss")
+
+    QueryCache(path, threshold=1)
+    rows = sqlite3.connect(path).execute("SELECT * FROM answers").fetchall()
+    assert len(rows) == 1
+    QueryCache(path, threshold=1, ttl_seconds=60)
+    assert sqlite3.connect(path).execute("SELECT * FROM answers").fetchall() == []
+
+
+def test_bypass(tmp_path):
+    cache = QueryCache(str(tmp_path / "answers.db"), threshold=1)
+    cache.store("doc", "Who won?", "Ann")
+    cache.bypass = True
+    assert cache.lookup("doc", "Who won?") == (None, "bypassed")
+    cache.store("doc", "Who won?", "Bob")
+    cache.bypass = False
+    assert cache.lookup("doc", "Who won?") == ("Bob", "exact")
@@ -0,0 +1,50 @@
+import time
+
+from tests.stub_server import StubServer
+from utils import http
+from utils.resilience import hedged, record_latency
+
+
+def test_retries_unavailable():
+    with StubServer(fail_first=2, status=503) as server:
+        response = http.get(server.url)
+    assert response.status_code == 200
+    assert server.requests == 3
+
+
+def test_retries_dropped_connection():
+    with StubServer(drop_first=1) as server:
+        response = http.get(server.url)
+    assert response.status_code == 200
+
+
+def test_retries_timeout():
+    with StubServer(delay=1.0, slow_requests={1}) as server:
+        response = http.get(server.url, timeout=0.3)
+    assert response.status_code == 200
+    assert server.requests == 2
+
+
+def test_gives_up_after_retries():
+    with StubServer(fail_first=10, status=500) as server:
+        response = http.get(server.url, retries=2)
+    assert response.status_code == 500
+    assert server.requests == 3
+
+
+def test_post_is_not_retried():
+    with StubServer(fail_first=1, status=503) as server:
+        response = http.post(server.url, json={"answers": []})
+    assert response.status_code == 503
+    assert server.requests == 1
+
+
+def test_hedges_slow_request():
+    with StubServer(delay=1.0, slow_requests={1}) as server:
+        for _ in range(20):
+            record_latency("stub", 0.05)
+        start = time.perf_counter()
+        response = hedged(lambda: http.get(server.url, retries=0), key="stub")
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert elapsed < 1.0
@@ -0,0 +1,38 @@
+from utils.run_memo import RunMemo, question_key
+
+MODELS = [{"model": "gpt-4o", "temperature": 0}]
+
+
+def test_question_key_depends_on_inputs(tmp_path):
+    attachment = tmp_path / "data.csv"
+    attachment.write_text("a,b\n1,2\n")
+    question = {"question": "Sum of b?", "file_path": str(attachment)}
+    key = question_key(question, MODELS)
+
+    assert question_key(dict(question), MODELS) == key
+    assert question_key({**question, "question": "Sum of a?"}, MODELS) != key
+    assert question_key(question, [{"model": "gpt-4o-mini"}]) != key
+    attachment.write_text("a,b\n1,3\n")
+    assert question_key(question, MODELS) != key
+
+
+def test_missing_attachment_is_ignored():
+    question = {"question": "Sum of b?", "file_path": "missing.csv"}
+    assert question_key(question, MODELS) == question_key(
+        {"question": "Sum of b?"}, MODELS
+    )
+
+
+def test_memo_persists_latest_answer(tmp_path):
+    path = str(tmp_path / "memo" / "answers.json")
+    memo = RunMemo(path)
+    assert memo.get("key-1") is None
+
+    memo.put("key-1", "task", "3")
+    memo.put("key-2", "task", "4")
+    memo.save()
+
+    reloaded = RunMemo(path)
+    # Only the answer to the latest inputs of a task is kept
+    assert reloaded.get("key-1") is None
+    assert reloaded.get("key-2") == "4"
@@ -0,0 +1,113 @@
+import sys
+
+import httpx
+import pytest
+
+from tools.search_web import (
+    BRAVE_SEARCH_URL,
+    batch_queries,
+    fuse_results,
+    result_key,
+    split_outcomes,
+)
+from utils import http
+
+search_web = sys.modules["tools.search_web"]
+
+
+def response(*urls: str) -> dict:
+    results = [{"title": url, "description": "", "url": url} for url in urls]
+    return {"web": {"results": results}}
+
+
+def test_result_key_ignores_equivalent_parts():
+    assert result_key("https://www.Example.com/page/#top") == result_key(
+        "http://example.com/page"
+    )
+    assert result_key("https://example.com/?q=1") != result_key("https://example.com/")
+
+
+def test_fuse_results_ranks_by_reciprocal_rank():
+    fused = fuse_results(
+        {
+            "first": response("https://a.com", "https://b.com", "https://c.com"),
+            "second": response("https://www.c.com/", "https://d.com"),
+        }
+    )
+    assert [(result["url"], queries) for result, queries in fused] == [
+        # Found by both queries, so ahead of every result found by one
+        ("https://c.com", ["first", "second"]),
+        ("https://a.com", ["first"]),
+        ("https://b.com", ["first"]),
+        ("https://d.com", ["second"]),
+    ]
+
+
+def test_fuse_results_without_results():
+    assert fuse_results({"first": {}, "second": response()}) == []
+
+
+def test_batch_queries_deduplicates():
+    assert batch_queries([" a ", "a", "", "b", "c", "d", "e", "f"]) == [
+        "a",
+        "b",
+        "c",
+        "d",
+        "e",
+    ]
+
+
+def test_split_outcomes():
+    error = RuntimeError("rate limited")
+    responses, errors = split_outcomes(
+        ["a", "b", "c"], [{"web": {}}, error, {"type": "ErrorResponse"}]
+    )
+    assert responses == {"a": {"web": {}}}
+    assert errors["b"] == "rate limited"
+    assert errors["c"].startswith("No web results")
+
+
+def brave_response(status: int, payload: dict) -> httpx.Response:
+    return httpx.Response(
+        status, json=payload, request=httpx.Request("GET", BRAVE_SEARCH_URL)
+    )
+
+
+ERROR_PAYLOAD = {
+    "type": "ErrorResponse",
+    "error": {"status": 429, "code": "RATE_LIMITED", "detail": "Rate limit exceeded"},
+}
+
+
+@pytest.fixture
+def brave(monkeypatch):
+    monkeypatch.setattr(search_web.rate_limiter, "wait", lambda: None)
+    monkeypatch.setattr(search_web, "prefetch_resources", lambda urls: None)
+
+    def reply(status: int, payload: dict):
+        monkeypatch.setattr(
+            http, "get", lambda url, **kwargs: brave_response(status, payload)
+        )
+
+    return reply
+
+
+@pytest.mark.parametrize("status", [200, 429])
+def test_search_web_reports_error_responses(brave, status):
+    brave(status, ERROR_PAYLOAD)
+    assert search_web._search_web("query").startswith("Error: ")
+
+
+def test_search_web_without_results(brave):
+    brave(200, {"type": "search"})
+    assert search_web._search_web("query") == 'Search Results (page 1) for: "query"'
+
+
+def test_search_web(brave):
+    brave(200, response("https://a.com"))
+    assert "[https://a.com](https://a.com)" in search_web._search_web("query")
+
+
+def test_search_web_batch_reports_failed_batch(brave):
+    brave(200, {"type": "ErrorResponse"})
+    assert search_web._search_web_batch(["a", "b"]).startswith("Error: No web results")
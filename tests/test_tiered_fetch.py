@@ -0,0 +1,85 @@
+import httpx
+import pytest
+
+from utils import http
+from web_scraper import tiered_fetch
+from web_scraper.tiered_fetch import BROWSER, STATIC, DomainTiers, fetch_page
+
+SHELL = '<html><body><div id="root"></div></body></html>'
+ARTICLE = f"<html><body><p>{'word ' * 100}</p></body></html>"
+
+
+@pytest.fixture
+def fetch(tmp_path, monkeypatch):
+    """Static responses by URL, and the URLs loaded in the browser."""
+    tiers = DomainTiers(str(tmp_path / "tiers.json"))
+    responses, browser = {}, []
+
+    def get(url, **kwargs):
+        response = responses[url]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def fetch_html_with_patchright(url):
+        browser.append(url)
+        return ARTICLE if "js." in url else SHELL
+
+    monkeypatch.setattr(tiered_fetch, "get_domain_tiers", lambda: tiers)
+    monkeypatch.setattr(http, "get", get)
+    monkeypatch.setattr(
+        tiered_fetch, "fetch_html_with_patchright", fetch_html_with_patchright
+    )
+    return tiers, responses, browser
+
+
+def html_response(text: str, status: int = 200, content_type: str = "text/html"):
+    return httpx.Response(status, headers={"content-type": content_type}, text=text)
+
+
+def test_static_page(fetch):
+    tiers, responses, browser = fetch
+    responses["https://static.com/"] = html_response(ARTICLE)
+    assert fetch_page("https://static.com/") == ARTICLE
+    assert tiers.get("static.com") == STATIC
+    assert browser == []
+
+
+def test_repeated_js_shells_record_the_browser(fetch):
+    tiers, responses, browser = fetch
+    responses["https://js.com/"] = html_response(SHELL)
+
+    assert fetch_page("https://js.com/") == ARTICLE
+    assert tiers.get("js.com") is None
+    fetch_page("https://js.com/")
+    assert tiers.get("js.com") == BROWSER
+
+    del responses["https://js.com/"]  # not requested anymore
+    fetch_page("https://js.com/")
+    assert len(browser) == 3
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        html_response("%PDF-1.7", content_type="application/pdf"),
+        html_response("", status=503),
+        http.HTTPError("connection reset"),
+    ],
+)
+def test_errors_are_not_recorded(fetch, response):
+    tiers, responses, browser = fetch
+    responses["https://flaky.com/"] = response
+    for _ in range(3):
+        fetch_page("https://flaky.com/")
+    assert tiers.get("flaky.com") != BROWSER
+    assert len(browser) == 3
+
+
+def test_browser_without_gain_resets_the_domain(fetch):
+    tiers, responses, browser = fetch
+    # A page that looks like a shell but is rendered the same in the browser
+    responses["https://thin.com/"] = html_response(SHELL)
+    for _ in range(3):
+        assert fetch_page("https://thin.com/") == SHELL
+    assert tiers.get("thin.com") == STATIC
@@ -0,0 +1,90 @@
+from utils.work_queue import DONE, FAILED, PENDING, WorkQueue
+
+
+def test_claims_each_task_once(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    run_id = queue.reset(["a", "b"])
+
+    claimed = {queue.claim("worker-1"), queue.claim("worker-2")}
+    assert claimed == {"a", "b"}
+    assert queue.claim("worker-1") is None
+    assert queue.finished_run() is None
+
+    queue.complete("a", "1")
+    queue.complete("b", "2")
+    assert queue.finished_run() == run_id
+    assert queue.answers() == {"a": "1", "b": "2"}
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=0, max_attempts=2)
+    queue.reset(["a"])
+
+    assert queue.claim("worker-1") == "a"
+    assert queue.claim("worker-2") == "a"
+    # The second lease expired on the last attempt
+    assert queue.claim("worker-3") is None
+    assert queue.counts()[FAILED] == 1
+
+
+def test_first_answer_wins(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.reset(["a"])
+    queue.claim("worker-1")
+    queue.complete("a", "1")
+    queue.complete("a", "2")
+    assert queue.answers() == {"a": "1"}
+
+
+def test_reset_replaces_tasks(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.reset(["a"])
+    queue.claim("worker-1")
+    queue.complete("a", "1")
+    queue.reset(["b", "c"])
+    assert queue.counts() == {PENDING: 2, "claimed": 0, DONE: 0, FAILED: 0}
+
+
+def test_failed_task_is_retried(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    queue.reset(["a"])
+
+    assert queue.claim("worker-1") == "a"
+    queue.fail("a", "agent error")
+    assert queue.counts()[PENDING] == 1
+    assert queue.claim("worker-2") == "a"
+    queue.fail("a", "agent error")
+    assert queue.counts()[FAILED] == 1
+    assert queue.claim("worker-3") is None
+
+
+def test_empty_run_is_finished(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    assert queue.finished_run() is None
+    run_id = queue.reset([])
+    assert queue.finished_run() == run_id
+
+
+def test_runs_are_told_apart(tmp_path):
+    path = str(tmp_path / "queue.db")
+    coordinator = WorkQueue(path)
+    previous_run = coordinator.reset([])
+
+    # A worker started before the next run sees the previous one finished
+    worker = WorkQueue(path)
+    assert worker.finished_run() == previous_run
+
+    run_id = coordinator.reset(["a"])
+    assert run_id != previous_run
+    assert worker.finished_run() is None
+    worker.complete(worker.claim("worker-1"), "1")
+    assert worker.finished_run() == run_id
+
+
+def test_answers_cut_short(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.reset(["a", "b"])
+    queue.complete(queue.claim("worker-1"), "1")
+    queue.complete(queue.claim("worker-1"), "2", cut_short=True)
+    assert queue.answers() == {"a": "1", "b": "2"}
+    assert queue.answers(cut_short=False) == {"a": "1"}
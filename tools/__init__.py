@@ -1,11 +1,10 @@
 from .query_resource import query_resource
-from .search_web import search_web
+from .search_web import search_web, search_web_batch
 from .search_arxiv import search_arxiv
-from .analyze_youtube import analyze_youtube
 
 __all__ = [
     "query_resource",
     "search_web",
+    "search_web_batch",
     "search_arxiv",
-    "analyze_youtube",
 ]
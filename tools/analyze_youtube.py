@@ -1,4 +1,7 @@
+import asyncio
 import base64
+import uuid
+from functools import cache
 from typing import TypedDict, Optional, List
 
 from utils import YouTubeVideo
@@ -6,60 +9,177 @@ from langgraph.graph import StateGraph, START, END
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage
 
-from langfuse.callback import CallbackHandler
-from langchain_openai import ChatOpenAI
-from openai import OpenAI
 
 from config import (
-    LANGFUSE_SECRET_KEY,
-    LANGFUSE_PUBLIC_KEY,
-    LANGFUSE_HOST,
+    YOUTUBE_FRAME_BUDGET,
+    YOUTUBE_SWEEP_FRAMES,
+    YOUTUBE_SCENE_THRESHOLD,
+    YOUTUBE_ZOOM_FPS,
+    YOUTUBE_ZOOM_WINDOW_SECONDS,
+    YOUTUBE_CAPTIONS_FIRST,
+    YOUTUBE_OCR,
+    OCR_WORKERS,
 )
 from utils import load_prompt
+from utils.frame_ocr import FrameTextIndex, ocr_available
+from utils.frame_sampling import (
+    pick_evenly,
+    sweep_fps,
+    timestamp_seconds,
+    zoom_window,
+)
+from utils.tracing import get_langfuse_handler
+from utils.llm import (
+    CAPTION_TRANSCRIPTION_MODEL,
+    bind_tools,
+    chat_model,
+    openai_client,
+)
+from utils.metrics import MetricsCallbackHandler, increment, instrument, timed
+from utils.graph import hybrid_node
 
 ANALYZE_YOUTUBE_SYSTEM_PROMPT = load_prompt("analyze_youtube_system_prompt.md")
 
 
-langfuse_handler = CallbackHandler(
-    secret_key=LANGFUSE_SECRET_KEY, public_key=LANGFUSE_PUBLIC_KEY, host=LANGFUSE_HOST
-)
-
-
 class AgentState(TypedDict):
     url: str
     question: str
-    video: Optional[YouTubeVideo]
-    caption: Optional[str]
+    video_id: Optional[str]
     frames: List[tuple[str, str, int]]
+    frames_loaded: bool
     current_frame_index: int
+    frames_left: int
+    zoom_at: Optional[str]
+    frame_text: dict[str, str]
+    screen_text: Optional[str]
     memory: list[str]
     new_memory: Optional[str]
     answer: Optional[str]
 
 
-model = ChatOpenAI(model="gpt-4.1")
+model = chat_model("gpt-4.1")
+
+# Videos of running analyses by id: the state only refers to them, so it
+# carries no live object and stays cheap to copy and trace
+_videos: dict[str, YouTubeVideo] = {}
+
+# Every frame of the budget may take a Feed Frame, an Update Memory and a Zoom
+# In step; Initialize, Load Frames, Read Text (twice) and Cleanup run once each
+youtube_recursion_limit = 3 * YOUTUBE_FRAME_BUDGET + 10
 
 
 def generate_caption(audio_path: str) -> str:
     audio_file = open(audio_path, "rb")
-    client = OpenAI()
-    transcription = client.audio.transcriptions.create(
-        model="gpt-4o-mini-transcribe", file=audio_file
-    )
+    client = openai_client()
+    with timed("agent_llm_duration_seconds", model=CAPTION_TRANSCRIPTION_MODEL):
+        transcription = client.audio.transcriptions.create(
+            model=CAPTION_TRANSCRIPTION_MODEL, file=audio_file
+        )
     return transcription.text
 
 
+def video_of(state: AgentState) -> YouTubeVideo:
+    return _videos[state["video_id"]]
+
+
+def start_state(state: AgentState, video: YouTubeVideo) -> AgentState:
+    # Callers pass an id to release the video if the analysis is interrupted
+    state["video_id"] = state.get("video_id") or uuid.uuid4().hex
+    _videos[state["video_id"]] = video
+    state["frames"] = []
+    state["frames_loaded"] = False
+    state["current_frame_index"] = 0
+    state["frames_left"] = YOUTUBE_FRAME_BUDGET
+    state["zoom_at"] = None
+    state["frame_text"] = {}
+    state["screen_text"] = None
+    state["memory"] = []
+    return state
+
+
+def initial_frames(state: AgentState, sweep: list, scenes: list) -> AgentState:
+    """
+    Start with a sweep over the whole video plus up to half of the remaining
+    budget in scene-change frames; the rest is left for zooming in.
+    """
+    sweep = pick_evenly(sweep, YOUTUBE_FRAME_BUDGET)
+    sweep_times = [timestamp_seconds(f[1]) for f in sweep]
+    scenes = [
+        f
+        for f in scenes
+        if all(abs(timestamp_seconds(f[1]) - t) >= 1 for t in sweep_times)
+    ]
+    scenes = pick_evenly(scenes, (YOUTUBE_FRAME_BUDGET - len(sweep)) // 2)
+    state["frames"] = sorted(sweep + scenes, key=lambda f: timestamp_seconds(f[1]))
+    state["frames_loaded"] = True
+    state["frames_left"] = YOUTUBE_FRAME_BUDGET - len(state["frames"])
+    state["current_frame_index"] = 0
+    return state
+
+
+def apply_frame_text(state: AgentState, index: FrameTextIndex) -> AgentState:
+    """
+    Keep only the frames whose text matches the question, if any do, and
+    collect the on-screen text for a text-only pass.
+    """
+    matches = index.search(state["question"])
+    increment("agent_youtube_ocr_total", outcome="matched" if matches else "no_match")
+    state["frame_text"] = {path: text for path, _, text in index.entries}
+    if index.entries:
+        state["screen_text"] = index.format(matches or None)
+    if matches:
+        matched_paths = {path for path, _, _ in matches}
+        state["frames"] = [f for f in state["frames"] if f[0] in matched_paths]
+    return state
+
+
+@instrument("youtube_analyst", "Initialize")
 def initialize(state: AgentState) -> AgentState:
-    video = YouTubeVideo(state["url"])
+    # A lazy video is only downloaded if the captions don't answer the question
+    video = YouTubeVideo(state["url"], lazy=YOUTUBE_CAPTIONS_FIRST)
     video.__enter__()  # Manually enter the context
-    state["video"] = video
-    if video.caption is None:
-        state["caption"] = "No caption found"
+    return start_state(state, video)
+
+
+@instrument("youtube_analyst", "Initialize")
+async def ainitialize(state: AgentState) -> AgentState:
+    video = YouTubeVideo(state["url"], lazy=YOUTUBE_CAPTIONS_FIRST)
+    await video.__aenter__()  # Exited in the Cleanup node
+    return start_state(state, video)
+
+
+@instrument("youtube_analyst", "Load Frames")
+def load_frames(state: AgentState) -> AgentState:
+    # Downloads a lazy video first
+    video = video_of(state)
+    sweep = list(video.generate_frames(sweep_fps(video.duration, YOUTUBE_SWEEP_FRAMES)))
+    scenes = (
+        video.scene_frames(YOUTUBE_SCENE_THRESHOLD) if YOUTUBE_SCENE_THRESHOLD else []
+    )
+    state = initial_frames(state, sweep, scenes)
+    if YOUTUBE_OCR and ocr_available():
+        index = FrameTextIndex.build(state["frames"], OCR_WORKERS)
+        state = apply_frame_text(state, index)
+    return state
+
+
+@instrument("youtube_analyst", "Load Frames")
+async def aload_frames(state: AgentState) -> AgentState:
+    video = video_of(state)
+    # Downloaded once, before the two passes below
+    await video.adownload()
+    sweep = video.agenerate_frames(sweep_fps(video.duration, YOUTUBE_SWEEP_FRAMES))
+    if YOUTUBE_SCENE_THRESHOLD:
+        # Both passes decode the whole video, so they run side by side
+        sweep, scenes = await asyncio.gather(
+            sweep, video.ascene_frames(YOUTUBE_SCENE_THRESHOLD)
+        )
     else:
-        state["caption"] = video.caption
-    state["frames"] = list(video.generate_frames(0.2))
-    state["memory"] = []
-    state["current_frame_index"] = 0
+        sweep, scenes = await sweep, []
+    state = initial_frames(state, sweep, scenes)
+    if YOUTUBE_OCR and ocr_available():
+        index = await FrameTextIndex.abuild(state["frames"], OCR_WORKERS)
+        state = apply_frame_text(state, index)
     return state
 
 
@@ -93,7 +213,20 @@ def next_frame() -> str:
     pass
 
 
-def feed_frame(state: AgentState) -> AgentState:
+@tool
+def zoom_in(timestamp: str) -> str:
+    """
+    Look closer at the video around a timestamp: the next frames will be
+    sampled densely from a few seconds around it.
+
+    Args:
+        timestamp: The timestamp to look at, as HH:MM:SS.mmm.
+    """
+    pass
+
+
+def next_frame_input(state: AgentState):
+    """Advance to the next frame and return its tools and the frame as a data URL."""
     frame_path, timestamp, _ = state["frames"][state["current_frame_index"]]
     state["current_frame_index"] += 1
 
@@ -101,29 +234,28 @@ def feed_frame(state: AgentState) -> AgentState:
     if state["current_frame_index"] < len(state["frames"]):
         tools.append(next_frame)
         tools.append(update_memory)
+        if state["frames_left"] > 0:
+            tools.append(zoom_in)
 
     with open(frame_path, "rb") as f:
         b64_frame = base64.b64encode(f.read()).decode("utf-8")
 
     frame_url = f"data:image/png;base64,{b64_frame}"
+    return tools, frame_url, timestamp
+
 
-    response = model.bind_tools(tools, tool_choice="any").invoke(
-        [
-            SystemMessage(content=ANALYZE_YOUTUBE_SYSTEM_PROMPT),
-            HumanMessage(
-                content=[
-                    {
-                        "type": "text",
-                        "text": f"""<TITLE>
-{state["video"].title}
+def video_context(state: AgentState) -> str:
+    video = video_of(state)
+    return f"""<TITLE>
+{video.title}
 </TITLE>
 
 <DESCRIPTION>
-{state["video"].description}
+{video.description}
 </DESCRIPTION>
 
 <CAPTION>
-{state["caption"]}
+{video.caption or "No caption found"}
 </CAPTION>
 
 {f'''<MEMORY>
@@ -132,29 +264,164 @@ def feed_frame(state: AgentState) -> AgentState:
 
 <QUERY>
 {state["question"]}
-</QUERY>
-
-The attached frame is from the video at timestamp: {timestamp}""",
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": frame_url, "detail": "auto"},
-                    },
-                ]
-            ),
-        ]
-    )
+</QUERY>"""
+
+
+def frame_messages(state: AgentState, frame_url: str, timestamp: str) -> list:
+    frame_path = state["frames"][state["current_frame_index"] - 1][0]
+    frame_text = state["frame_text"].get(frame_path)
+    ocr_note = f"\nText read from this frame by OCR: {frame_text}" if frame_text else ""
+    return [
+        SystemMessage(content=ANALYZE_YOUTUBE_SYSTEM_PROMPT),
+        HumanMessage(
+            content=[
+                {
+                    "type": "text",
+                    "text": f"""{video_context(state)}
+
+The attached frame is from the video at timestamp: {timestamp}{ocr_note}""",
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {"url": frame_url, "detail": "auto"},
+                },
+            ]
+        ),
+    ]
+
+
+def text_messages(state: AgentState) -> list:
+    if state["screen_text"]:
+        text = f"""<ON-SCREEN TEXT>
+{state["screen_text"]}
+</ON-SCREEN TEXT>
+
+No frame is attached yet. The on-screen text above was read from frames of the video by OCR."""
+    else:
+        text = "No frame is attached yet. The video has not been looked at."
+    return [
+        SystemMessage(content=ANALYZE_YOUTUBE_SYSTEM_PROMPT),
+        HumanMessage(content=f"""{video_context(state)}
+
+{text}"""),
+    ]
 
+
+def apply_tool_calls(state: AgentState, response) -> AgentState:
     if response.tool_calls:
         for tool_call in response.tool_calls:
             if tool_call["name"] == "answer":
                 state["answer"] = tool_call["args"]["answer"]
             elif tool_call["name"] == "update_memory":
                 state["new_memory"] = tool_call["args"]["note"]
+            elif tool_call["name"] == "zoom_in":
+                state["zoom_at"] = tool_call["args"]["timestamp"]
+
+    return state
 
+
+@instrument("youtube_analyst", "Feed Frame")
+def feed_frame(state: AgentState) -> AgentState:
+    tools, frame_url, timestamp = next_frame_input(state)
+
+    response = bind_tools(model, tools, tool_choice="any").invoke(
+        frame_messages(state, frame_url, timestamp)
+    )
+
+    return apply_tool_calls(state, response)
+
+
+@instrument("youtube_analyst", "Feed Frame")
+async def afeed_frame(state: AgentState) -> AgentState:
+    tools, frame_url, timestamp = await asyncio.to_thread(next_frame_input, state)
+
+    response = await bind_tools(model, tools, tool_choice="any").ainvoke(
+        frame_messages(state, frame_url, timestamp)
+    )
+
+    return apply_tool_calls(state, response)
+
+
+def apply_text_response(state: AgentState, response) -> AgentState:
+    state = apply_tool_calls(state, response)
+    if not state["frames_loaded"]:
+        increment(
+            "agent_youtube_captions_total",
+            outcome="answered" if state.get("answer") else "video_needed",
+        )
+    return state
+
+
+@instrument("youtube_analyst", "Read Text")
+def read_text(state: AgentState) -> AgentState:
+    # A text-only call over the captions or the on-screen text: questions they
+    # answer need no download and no vision call
+    response = bind_tools(model, [answer, next_frame], tool_choice="any").invoke(
+        text_messages(state)
+    )
+
+    return apply_text_response(state, response)
+
+
+@instrument("youtube_analyst", "Read Text")
+async def aread_text(state: AgentState) -> AgentState:
+    response = await bind_tools(model, [answer, next_frame], tool_choice="any").ainvoke(
+        text_messages(state)
+    )
+
+    return apply_text_response(state, response)
+
+
+def zoom_request(state: AgentState) -> Optional[tuple[float, float, float]]:
+    """(fps, start, end) of the frames to extract for the requested zoom."""
+    zoom_at = state["zoom_at"]
+    state["zoom_at"] = None
+    try:
+        center = timestamp_seconds(zoom_at)
+    except ValueError:
+        # Fall back to the frame the model was looking at
+        center = timestamp_seconds(state["frames"][state["current_frame_index"] - 1][1])
+    return zoom_window(
+        center,
+        YOUTUBE_ZOOM_WINDOW_SECONDS,
+        YOUTUBE_ZOOM_FPS,
+        state["frames_left"],
+        video_of(state).duration,
+    )
+
+
+def insert_zoom_frames(state: AgentState, frames: list) -> AgentState:
+    # Shown next, before the rest of the sweep
+    frames = pick_evenly(frames, state["frames_left"])
+    index = state["current_frame_index"]
+    state["frames"] = state["frames"][:index] + frames + state["frames"][index:]
+    state["frames_left"] -= len(frames)
     return state
 
 
+@instrument("youtube_analyst", "Zoom In")
+def zoom(state: AgentState) -> AgentState:
+    request = zoom_request(state)
+    if request is None:
+        return state
+    fps, start, end = request
+    return insert_zoom_frames(
+        state, list(video_of(state).generate_frames(fps, start, end))
+    )
+
+
+@instrument("youtube_analyst", "Zoom In")
+async def azoom(state: AgentState) -> AgentState:
+    request = zoom_request(state)
+    if request is None:
+        return state
+    fps, start, end = request
+    return insert_zoom_frames(
+        state, await video_of(state).agenerate_frames(fps, start, end)
+    )
+
+
+@instrument("youtube_analyst", "Update Memory")
 def update_memory_in_state(state: AgentState) -> AgentState:
     if state.get("new_memory"):
         state["memory"].append(state["new_memory"])
@@ -163,10 +430,16 @@ def update_memory_in_state(state: AgentState) -> AgentState:
     return state
 
 
-def cleanup(state: AgentState) -> AgentState:
-    video = state.get("video")
+def release_video(video_id: Optional[str]) -> None:
+    """Exit and forget the video of an analysis, if it's still open."""
+    video = _videos.pop(video_id, None)
     if video:
         video.__exit__(None, None, None)
+
+
+@instrument("youtube_analyst", "Cleanup")
+def cleanup(state: AgentState) -> AgentState:
+    release_video(state.get("video_id"))
     return state
 
 
@@ -175,47 +448,91 @@ def should_continue(state: AgentState):
         return "Answer"
     if state.get("new_memory"):
         return "New Information"
+    if state.get("zoom_at"):
+        return "Zoom In"
     return "Feed Frame"
 
 
-workflow = StateGraph(AgentState)
+def after_initialize(state: AgentState):
+    # Captions first, when the video has any and isn't downloaded yet
+    video = video_of(state)
+    return "Read Text" if video.caption and not video.downloaded else "Load Frames"
 
-workflow.add_node("Initialize", initialize)
-workflow.add_node("Feed Frame", feed_frame)
-workflow.add_node("Update Memory", update_memory_in_state)
-workflow.add_node("Cleanup", cleanup)
 
-workflow.add_edge(START, "Initialize")
-workflow.add_edge("Initialize", "Feed Frame")
-workflow.add_conditional_edges(
-    "Feed Frame",
-    should_continue,
-    {
-        "Feed Frame": "Feed Frame",
-        "New Information": "Update Memory",
-        "Answer": "Cleanup",
-    },
-)
-workflow.add_edge("Update Memory", "Feed Frame")
-workflow.add_edge("Cleanup", END)
+def after_loading_frames(state: AgentState):
+    return "Read Text" if state.get("screen_text") else "Feed Frame"
+
+
+def after_reading_text(state: AgentState):
+    if state.get("answer"):
+        return "Answer"
+    return "Feed Frame" if state["frames_loaded"] else "Load Frames"
 
-youtube_analyst = workflow.compile()
 
-graph_mermaid = youtube_analyst.get_graph().draw_mermaid()
-with open("youtube_analyst.md", "wb") as f:
-    f.write("```mermaid\n".encode("utf-8"))
-    f.write(graph_mermaid.encode("utf-8"))
-    f.write("```".encode("utf-8"))
+def after_memory_update(state: AgentState):
+    return "Zoom In" if state.get("zoom_at") else "Feed Frame"
+
+
+@cache
+def get_youtube_analyst():
+    """Compile the YouTube analyst graph on first use."""
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("Initialize", hybrid_node(initialize, ainitialize))
+    workflow.add_node("Load Frames", hybrid_node(load_frames, aload_frames))
+    workflow.add_node("Read Text", hybrid_node(read_text, aread_text))
+    workflow.add_node("Feed Frame", hybrid_node(feed_frame, afeed_frame))
+    workflow.add_node("Zoom In", hybrid_node(zoom, azoom))
+    workflow.add_node("Update Memory", update_memory_in_state)
+    workflow.add_node("Cleanup", cleanup)
+
+    workflow.add_edge(START, "Initialize")
+    workflow.add_conditional_edges(
+        "Initialize",
+        after_initialize,
+        {"Read Text": "Read Text", "Load Frames": "Load Frames"},
+    )
+    workflow.add_conditional_edges(
+        "Load Frames",
+        after_loading_frames,
+        {"Read Text": "Read Text", "Feed Frame": "Feed Frame"},
+    )
+    workflow.add_conditional_edges(
+        "Read Text",
+        after_reading_text,
+        {"Answer": "Cleanup", "Load Frames": "Load Frames", "Feed Frame": "Feed Frame"},
+    )
+    workflow.add_conditional_edges(
+        "Feed Frame",
+        should_continue,
+        {
+            "Feed Frame": "Feed Frame",
+            "New Information": "Update Memory",
+            "Zoom In": "Zoom In",
+            "Answer": "Cleanup",
+        },
+    )
+    workflow.add_edge("Zoom In", "Feed Frame")
+    workflow.add_conditional_edges(
+        "Update Memory",
+        after_memory_update,
+        {"Feed Frame": "Feed Frame", "Zoom In": "Zoom In"},
+    )
+    workflow.add_edge("Cleanup", END)
+
+    return workflow.compile()
 
-analyze_youtube = youtube_analyst
 
 if __name__ == "__main__":
-    result = youtube_analyst.invoke(
+    result = get_youtube_analyst().invoke(
         {
             "url": "https://www.youtube.com/watch?v=L1vXCYZAYYM",
             "question": "In the video https://www.youtube.com/watch?v=L1vXCYZAYYM, what is the highest number of bird species to be on camera simultaneously?",
             "memory": [],
         },
-        config={"recursion_limit": 50, "callbacks": [langfuse_handler]},
+        config={
+            "recursion_limit": youtube_recursion_limit,
+            "callbacks": [get_langfuse_handler(), MetricsCallbackHandler()],
+        },
     )
     print(result.get("answer"))
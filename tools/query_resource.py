@@ -1,54 +1,156 @@
-import tempfile
+import asyncio
+import hashlib
 import os
-import requests
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import tool
-from web_scraper.fetch_html import fetch_html_with_patchright, TimeoutError
-from web_scraper.extract_text import (
-    extract_text_with_html2text,
+from functools import cache
+from typing import Optional
+
+from langchain_core.tools import StructuredTool
+from web_scraper.fetch_html import TimeoutError
+from web_scraper.tiered_fetch import afetch_page, fetch_page
+from web_scraper.arxiv_papers import apaper_text, paper_text
+from web_scraper.extract_text import extract_text, pdf_to_markdown
+from web_scraper.prefetch import get_prefetcher
+from config import (
+    PREFETCH_TOP_K,
+    QUERY_CACHE,
+    QUERY_CACHE_PATH,
+    QUERY_CACHE_SIMILARITY,
+    QUERY_CACHE_TTL_SECONDS,
 )
-from markitdown import MarkItDown
 from langchain_core.messages import SystemMessage, HumanMessage
 from utils import load_prompt
+from utils import http
+from utils.llm import chat_model
+from utils.metrics import increment, record_cache
+from utils.query_cache import QueryCache
 
 
-def extract_markdown(url: str) -> str:
+def is_pdf_url(url: str) -> bool:
+    return url.lower().endswith(".pdf") or "arxiv.org/pdf/" in url.lower()
+
+
+def fetch_markdown(url: str) -> str:
+    """Fetch `url` and convert it to text. Raises TimeoutError."""
+
+    text = paper_text(url)
+    if text is not None:
+        return text
+
+    if is_pdf_url(url):
+        pdf_response = http.get(url, timeout=10, hedge=True)
+        return pdf_to_markdown(pdf_response.content)
+
+    return extract_text(fetch_page(url))
+
 
-    maybe_pdf = url.lower().endswith(".pdf") or "arxiv.org/pdf/" in url.lower()
+async def afetch_markdown(url: str) -> str:
 
-    if maybe_pdf:
-        md = MarkItDown()
-        pdf_response = requests.get(url, timeout=10)
+    text = await apaper_text(url)
+    if text is not None:
+        return text
 
-        if len(pdf_response.content) > 10 * 1024 * 1024:
-            return "File too large"
+    if is_pdf_url(url):
+        pdf_response = await http.aget(url, timeout=10, hedge=True)
+        # PDF conversion is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(pdf_to_markdown, pdf_response.content)
 
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-            temp_file.write(pdf_response.content)
-            temp_path = temp_file.name
+    html = await afetch_page(url)
+    # Extraction parses the whole page, keep it off the event loop
+    return await asyncio.to_thread(extract_text, html)
 
-        result = md.convert(temp_path)
 
-        try:
-            os.unlink(temp_path)
-        except:
-            pass
+def extract_markdown(url: str) -> str:
+    if PREFETCH_TOP_K:
+        text = get_prefetcher().get(url)
+        if text is not None:
+            return text
 
-        return result
+    try:
+        return fetch_markdown(url)
+    except TimeoutError:
+        return f"Timeout error fetching HTML: {url}"
+
+
+async def aextract_markdown(url: str) -> str:
+    if PREFETCH_TOP_K:
+        text = await get_prefetcher().aget(url)
+        if text is not None:
+            return text
 
     try:
-        html = fetch_html_with_patchright(url)
+        return await afetch_markdown(url)
     except TimeoutError:
         return f"Timeout error fetching HTML: {url}"
 
-    return extract_text_with_html2text(html)
+
+def prefetch_resources(urls: list[str]) -> None:
+    """Warm the document cache with the first PREFETCH_TOP_K of `urls`."""
+    if PREFETCH_TOP_K:
+        get_prefetcher().prefetch(urls[:PREFETCH_TOP_K], fetch_markdown)
 
 
+def aprefetch_resources(urls: list[str]) -> None:
+    """Like `prefetch_resources`, as tasks on the running event loop."""
+    if PREFETCH_TOP_K:
+        get_prefetcher().aprefetch(urls[:PREFETCH_TOP_K], afetch_markdown)
+
+
+model = chat_model("gpt-4.1-mini")
+
 CONTENT_QUERY_SYSTEM_PROMPT = load_prompt("content_query_system_prompt.md")
 
 
-@tool(parse_docstring=True)
-def query_resource(uri: str, query: str) -> str:
+def query_messages(markdown: str, query: str) -> list:
+    return [
+        SystemMessage(content=CONTENT_QUERY_SYSTEM_PROMPT),
+        HumanMessage(
+            content=f"""
+<content>
+{markdown}
+</content>
+
+<query>
+{query}
+</query>                
+""",
+        ),
+    ]
+
+
+@cache
+def get_query_cache() -> QueryCache:
+    os.makedirs(os.path.dirname(QUERY_CACHE_PATH), exist_ok=True)
+    return QueryCache(QUERY_CACHE_PATH, QUERY_CACHE_SIMILARITY, QUERY_CACHE_TTL_SECONDS)
+
+
+def bypass_query_cache() -> None:
+    """Answer every query afresh in this process, refreshing the cached answers."""
+    if QUERY_CACHE:
+        get_query_cache().bypass = True
+
+
+def document_key(markdown: str) -> Optional[str]:
+    """
+    Cache key of the answers about a document: its content and the model and
+    prompt answering. None if answers about it aren't cached.
+    """
+    if not QUERY_CACHE or markdown.startswith("Timeout error"):
+        return None
+    digest = hashlib.sha256()
+    for part in (model.model_name, CONTENT_QUERY_SYSTEM_PROMPT, markdown):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cached_answer(key: str, query: str) -> Optional[str]:
+    answer, match = get_query_cache().lookup(key, query)
+    record_cache("query_resource", hit=answer is not None)
+    increment("agent_query_cache_total", match=match)
+    return answer
+
+
+def _query_resource(uri: str, query: str) -> str:
     """Delegate to an AI agent to answer a query based on the content of a resource, which can be a webpage or a PDF.
 
     Args:
@@ -61,28 +163,44 @@ def query_resource(uri: str, query: str) -> str:
 
     markdown = extract_markdown(uri)
 
-    model = ChatOpenAI(model="gpt-4.1-mini")
+    # Earlier questions may have asked the same about the same content
+    key = document_key(markdown)
+    if key is not None:
+        answer = cached_answer(key, query)
+        if answer is not None:
+            return answer
 
-    response = model.invoke(
-        [
-            SystemMessage(content=CONTENT_QUERY_SYSTEM_PROMPT),
-            HumanMessage(
-                content=f"""
-<content>
-{markdown}
-</content>
+    response = model.invoke(query_messages(markdown, query))
+
+    if key is not None:
+        get_query_cache().store(key, query, response.content)
+    return response.content
 
-<query>
-{query}
-</query>                
-""",
-            ),
-        ],
-    )
 
+async def _aquery_resource(uri: str, query: str) -> str:
+    markdown = await aextract_markdown(uri)
+
+    key = document_key(markdown)
+    if key is not None:
+        answer = await asyncio.to_thread(cached_answer, key, query)
+        if answer is not None:
+            return answer
+
+    response = await model.ainvoke(query_messages(markdown, query))
+
+    if key is not None:
+        await asyncio.to_thread(get_query_cache().store, key, query, response.content)
     return response.content
 
 
+query_resource = StructuredTool.from_function(
+    func=_query_resource,
+    coroutine=_aquery_resource,
+    name="query_resource",
+    parse_docstring=True,
+)
+
+
 if __name__ == "__main__":
     print(
         extract_markdown(
@@ -1,16 +1,42 @@
+import asyncio
+import os
+from datetime import datetime
+from functools import cache
+
 from arxiv import Client, SortCriterion, Search, Result
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+from config import (
+    ARXIV_INDEX_PATH,
+    ARXIV_CACHE_TTL_SECONDS,
+    ARXIV_LOCAL_MIN_HITS,
+)
+from utils.arxiv_index import ArxivIndex, ArxivPaper
+from utils.metrics import http_timer, increment, record_cache
+
+MAX_RESULTS = 10
+
+
+def paper_from_result(result: Result) -> ArxivPaper:
+    return {
+        "id": result.get_short_id(),
+        "title": result.title,
+        "authors": [a.name for a in result.authors],
+        "published": result.published.isoformat(),
+        "summary": result.summary,
+        "pdf_url": result.pdf_url,
+    }
 
 
-def format_arxiv_results(results: list[Result]) -> str:
+def format_arxiv_results(papers: list[ArxivPaper]) -> str:
     formatted = []
-    for r in results:
-        authors = ", ".join([a.name for a in r.authors])
+    for p in papers:
+        authors = ", ".join(p["authors"])
+        published = datetime.fromisoformat(p["published"])
         entry = (
-            f"## {r.title}\n\n"
-            f"**By {authors}**, published on {r.published.strftime('%B %d, %Y')} \n"
-            f"\n_Abstract_  \n{r.summary}\n --- \n"
-            f"{f'**PDF:** {r.pdf_url}  \n' if r.pdf_url else ''}"
+            f"## {p['title']}\n\n"
+            f"**By {authors}**, published on {published.strftime('%B %d, %Y')} \n"
+            f"\n_Abstract_  \n{p['summary']}\n --- \n"
+            f"{f'**PDF:** {p['pdf_url']}  \n' if p['pdf_url'] else ''}"
         )
         formatted.append(entry)
     return "\n".join(formatted)
@@ -18,9 +44,45 @@ def format_arxiv_results(results: list[Result]) -> str:
 
 client = Client()
 
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+
+
+@cache
+def get_arxiv_index() -> ArxivIndex:
+    os.makedirs(os.path.dirname(ARXIV_INDEX_PATH), exist_ok=True)
+    return ArxivIndex(ARXIV_INDEX_PATH, ttl_seconds=ARXIV_CACHE_TTL_SECONDS)
+
+
+def fetch_papers(query: str) -> list[ArxivPaper]:
+    """
+    Papers matching the query: from the query cache, then from the local index
+    if it has enough full matches, and only otherwise from the arXiv API.
+    """
+    index = get_arxiv_index()
+
+    papers = index.cached_results(query)
+    record_cache("arxiv_query", hit=papers is not None)
+    if papers is not None:
+        return papers
+
+    if ARXIV_LOCAL_MIN_HITS > 0:
+        papers = index.search(query, limit=MAX_RESULTS)
+        if len(papers) >= ARXIV_LOCAL_MIN_HITS:
+            increment("agent_arxiv_local_answers_total")
+            return papers
+
+    search = Search(
+        query=query,
+        max_results=MAX_RESULTS,
+        sort_by=SortCriterion.Relevance,
+    )
+    with http_timer(ARXIV_API_URL, client="arxiv"):
+        papers = [paper_from_result(r) for r in client.results(search)]
+    index.store(query, papers)
+    return papers
+
 
-@tool(parse_docstring=True)
-def search_arxiv(query: str) -> str:
+def _search_arxiv(query: str) -> str:
     """Search the arXiv for the most recent papers matching the query as a tool for the agent system.
 
     Args:
@@ -30,13 +92,20 @@ def search_arxiv(query: str) -> str:
         A formatted string containing the most recent arXiv papers matching the query, including title, authors, publication date, abstract, and PDF link if available.
     """
 
-    search = Search(
-        query=query,
-        max_results=10,
-        sort_by=SortCriterion.Relevance,
-    )
-    results = client.results(search)
-    return format_arxiv_results(results)
+    return format_arxiv_results(fetch_papers(query))
+
+
+async def _asearch_arxiv(query: str) -> str:
+    # The arxiv client is blocking and paces its own requests
+    return await asyncio.to_thread(_search_arxiv, query)
+
+
+search_arxiv = StructuredTool.from_function(
+    func=_search_arxiv,
+    coroutine=_asearch_arxiv,
+    name="search_arxiv",
+    parse_docstring=True,
+)
 
 
 if __name__ == "__main__":
@@ -46,4 +115,4 @@ if __name__ == "__main__":
         sort_by=SortCriterion.Relevance,
     )
     results = client.results(search)
-    print(format_arxiv_results(results))
+    print(format_arxiv_results([paper_from_result(r) for r in results]))
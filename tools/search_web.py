@@ -1,10 +1,12 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict
-import requests
+from urllib.parse import urlsplit, urlunsplit
 from config import BRAVE_SEARCH_API_KEY
-from langchain_core.tools import tool
-import threading
-import queue
-import time
+from utils import http
+from utils.resilience import RateLimiter
+from tools.query_resource import aprefetch_resources, prefetch_resources
+from langchain_core.tools import StructuredTool
 
 
 class SearchWebResult(TypedDict):
@@ -14,47 +16,67 @@ class SearchWebResult(TypedDict):
     url: str
 
 
-# Global queue and worker for throttling
-class SearchRequest(TypedDict):
-    query: str
-    page: int
-    result_queue: queue.Queue
+BRAVE_SEARCH_URL = "https://api.search.brave.com/res/v1/web/search"
 
+# Brave allows one request per second; shared by sync and async callers
+rate_limiter = RateLimiter(interval=1.0, name="brave")
 
-request_queue: queue.Queue = queue.Queue()
+# Batched searches: queries per call, results kept after merging, and the
+# constant of reciprocal rank fusion (higher values flatten the rank weights)
+MAX_BATCH_QUERIES = 5
+MAX_BATCH_RESULTS = 15
+RANK_FUSION_K = 60
 
 
-def brave_worker():
-    while True:
-        req: SearchRequest = request_queue.get()
-        try:
-            offset = req["page"] - 1
-            response = requests.get(
-                "https://api.search.brave.com/res/v1/web/search",
-                headers={
-                    "Accept": "application/json",
-                    "Accept-Encoding": "gzip",
-                    "x-subscription-token": BRAVE_SEARCH_API_KEY,
-                },
-                params={
-                    "q": req["query"],
-                    "count": 10,
-                    "offset": offset,
-                },
-            ).json()
-            req["result_queue"].put(response)
-        except Exception as e:
-            req["result_queue"].put({"error": str(e)})
-        time.sleep(1)  # Throttle to 1 request per second
+def search_params(query: str, page: int) -> dict:
+    return {
+        "headers": {
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+            "x-subscription-token": BRAVE_SEARCH_API_KEY,
+        },
+        "params": {
+            "q": query,
+            "count": 10,
+            "offset": page - 1,
+        },
+    }
+
+
+def format_results(response: dict, query: str, page: int) -> str:
+    # Format results as markdown
+    markdown_summary = f'Search Results (page {page}) for: "{query}"\n\n'
+    for i, result in enumerate(response.get("web", {}).get("results", []), 1):
+        markdown_summary += f"- [{result['title']}]({result['url']})..\n"
+        markdown_summary += f"{result['description']}\n\n\n"
+    return markdown_summary.strip()
+
+
+def result_urls(response: dict) -> list[str]:
+    return [result["url"] for result in response.get("web", {}).get("results", [])]
+
+
+def response_payload(response) -> dict:
+    """The JSON of a Brave response, raising on error statuses and payloads."""
+    response.raise_for_status()
+    payload = response.json()
+    if "error" in payload:
+        raise ValueError(payload["error"])
+    return payload
 
 
-# Start the worker thread
-worker_thread = threading.Thread(target=brave_worker, daemon=True)
-worker_thread.start()
+def fetch_results(query: str, page: int = 1) -> dict:
+    rate_limiter.wait()
+    return response_payload(http.get(BRAVE_SEARCH_URL, **search_params(query, page)))
 
 
-@tool(parse_docstring=True)
-def search_web(query: str, page: int = 1) -> str:
+async def afetch_results(query: str, page: int = 1) -> dict:
+    await rate_limiter.await_slot()
+    response = await http.aget(BRAVE_SEARCH_URL, **search_params(query, page))
+    return response_payload(response)
+
+
+def _search_web(query: str, page: int = 1) -> str:
     """Search the web for information.
 
     Args:
@@ -64,15 +86,148 @@ def search_web(query: str, page: int = 1) -> str:
     Returns:
         A summary of the search results.
     """
-    result_queue: queue.Queue = queue.Queue()
-    req: SearchRequest = {"query": query, "page": page, "result_queue": result_queue}
-    request_queue.put(req)
-    response = result_queue.get()
-    if isinstance(response, dict) and "error" in response:
-        return f"Error: {response['error']}"
-    # Format results as markdown
-    markdown_summary = f'Search Results (page {page}) for: "{query}"\n\n'
-    for i, result in enumerate(response["web"]["results"], 1):
+    try:
+        response = fetch_results(query, page)
+    except Exception as e:
+        return f"Error: {e}"
+    summary = format_results(response, query, page)
+    # The top results are usually read next; fetch them while the model decides
+    prefetch_resources(result_urls(response))
+    return summary
+
+
+async def _asearch_web(query: str, page: int = 1) -> str:
+    try:
+        response = await afetch_results(query, page)
+    except Exception as e:
+        return f"Error: {e}"
+    summary = format_results(response, query, page)
+    aprefetch_resources(result_urls(response))
+    return summary
+
+
+search_web = StructuredTool.from_function(
+    func=_search_web,
+    coroutine=_asearch_web,
+    name="search_web",
+    parse_docstring=True,
+)
+
+
+def result_key(url: str) -> str:
+    """URL of a result without the parts that vary between equal pages."""
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix("www.")
+    return urlunsplit(("", host, parts.path.rstrip("/"), parts.query, ""))
+
+
+def fuse_results(responses: dict[str, dict]) -> list[tuple[dict, list[str]]]:
+    """
+    Results of several queries deduplicated by URL and ranked by reciprocal
+    rank fusion, each with the queries that found it.
+    """
+    scores: dict[str, float] = {}
+    fused: dict[str, tuple[dict, list[str]]] = {}
+    for query, response in responses.items():
+        results = response.get("web", {}).get("results", [])
+        for rank, result in enumerate(results, 1):
+            key = result_key(result["url"])
+            scores[key] = scores.get(key, 0.0) + 1 / (RANK_FUSION_K + rank)
+            fused.setdefault(key, (result, []))[1].append(query)
+    ranked = sorted(fused, key=lambda key: scores[key], reverse=True)
+    return [fused[key] for key in ranked[:MAX_BATCH_RESULTS]]
+
+
+def format_fused_results(
+    queries: list[str], fused: list[tuple[dict, list[str]]], errors: dict[str, str]
+) -> str:
+    quoted = ", ".join(f'"{query}"' for query in queries)
+    markdown_summary = f"Search Results for {len(queries)} queries: {quoted}\n\n"
+    for result, found_by in fused:
         markdown_summary += f"- [{result['title']}]({result['url']})..\n"
-        markdown_summary += f"{result['description']}\n\n\n"
+        markdown_summary += f"{result['description']}\n"
+        markdown_summary += f"Found by: {', '.join(f'"{q}"' for q in found_by)}\n\n\n"
+    for query, error in errors.items():
+        markdown_summary += f'Error searching for "{query}": {error}\n'
     return markdown_summary.strip()
+
+
+def batch_queries(queries: list[str]) -> list[str]:
+    # Duplicate queries would only cost rate-limited requests
+    unique = dict.fromkeys(query.strip() for query in queries if query.strip())
+    return list(unique)[:MAX_BATCH_QUERIES]
+
+
+def split_outcomes(
+    queries: list[str], outcomes: list
+) -> tuple[dict[str, dict], dict[str, str]]:
+    """
+    Responses and errors by query, from results or raised exceptions. A payload
+    without web results counts as an error, so a batch where every search
+    failed is reported as failed.
+    """
+    responses, errors = {}, {}
+    for query, outcome in zip(queries, outcomes):
+        if isinstance(outcome, BaseException):
+            errors[query] = str(outcome)
+        elif "web" not in outcome:
+            errors[query] = f"No web results in the response: {outcome}"
+        else:
+            responses[query] = outcome
+    return responses, errors
+
+
+def _search_web_batch(queries: list[str]) -> str:
+    """Search the web for several related queries at once, such as rephrasings
+    or different aspects of one question. Results found by several queries are
+    merged and ranked first.
+
+    Args:
+        queries: The queries to search the web for, at most 5.
+
+    Returns:
+        A single ranked summary of the search results of all queries.
+    """
+    queries = batch_queries(queries)
+    if not queries:
+        return "Error: No queries to search for"
+
+    def search(query: str):
+        try:
+            return fetch_results(query)
+        except Exception as e:
+            return e
+
+    # The requests still start one rate limiter slot apart, but their
+    # latencies overlap
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        responses, errors = split_outcomes(queries, list(executor.map(search, queries)))
+    if not responses:
+        return f"Error: {errors[queries[0]]}"
+    fused = fuse_results(responses)
+    prefetch_resources([result["url"] for result, _ in fused])
+    return format_fused_results(queries, fused, errors)
+
+
+async def _asearch_web_batch(queries: list[str]) -> str:
+    queries = batch_queries(queries)
+    if not queries:
+        return "Error: No queries to search for"
+
+    outcomes = await asyncio.gather(
+        *(afetch_results(query) for query in queries), return_exceptions=True
+    )
+    responses, errors = split_outcomes(queries, outcomes)
+    if not responses:
+        return f"Error: {errors[queries[0]]}"
+    fused = fuse_results(responses)
+    aprefetch_resources([result["url"] for result, _ in fused])
+    return format_fused_results(queries, fused, errors)
+
+
+search_web_batch = StructuredTool.from_function(
+    func=_search_web_batch,
+    coroutine=_asearch_web_batch,
+    name="search_web_batch",
+    parse_docstring=True,
+)
@@ -1,22 +1,55 @@
+import asyncio
 import os
+import re
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Iterator
 
-import yt_dlp
+from config import FFMPEG_SEGMENTS, FFMPEG_SEGMENT_SECONDS
+from .frame_sampling import format_timestamp, segment_starts
+from .metrics import record_cache, subprocess_timer
+
+SHOWINFO_TIME_PATTERN = re.compile(r"Parsed_showinfo.*?pts_time:\s*([\d.]+)")
+
+
+async def run_command(
+    command: list[str], env: Optional[dict] = None
+) -> tuple[int, str]:
+    """Run an external command without blocking the event loop."""
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    _, stderr = await process.communicate()
+    return process.returncode, stderr.decode(errors="replace")
 
 
 class YouTubeVideo:
-    def __init__(self, youtube_url: str):
+    """
+    A YouTube video's metadata, captions, audio and frames in a temporary
+    directory. A lazy video only fetches its metadata and captions on entry
+    and downloads the video the first time its audio or frames are needed.
+    """
+
+    def __init__(self, youtube_url: str, lazy: bool = False):
         self.youtube_url = youtube_url
+        self.lazy = lazy
 
         self._temp_dir: Optional[str] = None
+        self._info: Optional[dict] = None
         self._video_path: Optional[str] = None
+        self._download_lock = threading.Lock()
         self._title: Optional[str] = None
         self._description: Optional[str] = None
+        self._duration: Optional[float] = None
+        self._keyframes: Optional[list[float]] = None
         self._caption: Optional[str] = None
         self._audio_path: Optional[str] = None
 
@@ -24,9 +57,10 @@ class YouTubeVideo:
         self._temp_dir = tempfile.mkdtemp()
         try:
             # Download video and get metadata
-            self._video_path, self._title, self._description = self._download_youtube(
-                self.youtube_url, self._temp_dir
+            self._video_path, info = self._download_youtube(
+                self.youtube_url, self._temp_dir, download=not self.lazy
             )
+            self._read_info(info)
 
             # Get caption content
             self._caption = self._find_caption(self._temp_dir)
@@ -37,18 +71,67 @@ class YouTubeVideo:
             self.__exit__(type(e), e, e.__traceback__)
             raise
 
+    async def __aenter__(self):
+        self._temp_dir = tempfile.mkdtemp()
+        try:
+            # yt-dlp is a blocking library, so it runs in a worker thread
+            self._video_path, info = await asyncio.to_thread(
+                self._download_youtube,
+                self.youtube_url,
+                self._temp_dir,
+                download=not self.lazy,
+            )
+            self._read_info(info)
+            self._caption = self._find_caption(self._temp_dir)
+            return self
+        except Exception as e:
+            self.__exit__(type(e), e, e.__traceback__)
+            raise
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.__exit__(exc_type, exc_val, exc_tb)
+
     def __exit__(self, _exc_type, _exc_val, _exc_tb):
         if self._temp_dir and os.path.exists(self._temp_dir):
             shutil.rmtree(self._temp_dir)
 
         # Reset state
         self._temp_dir = None
+        self._info = None
         self._video_path = None
         self._title = None
         self._description = None
+        self._duration = None
+        self._keyframes = None
         self._caption = None
         self._audio_path = None
 
+    def _read_info(self, info: dict) -> None:
+        self._info = info
+        self._title = info.get("title", "Unknown Title")
+        self._description = info.get("description", "No description available")
+        self._duration = info.get("duration")
+
+    @property
+    def downloaded(self) -> bool:
+        return self._video_path is not None
+
+    def download(self) -> str:
+        """Download the video of a lazily entered video, once. Returns its path."""
+        if not self._temp_dir:
+            raise RuntimeError(
+                "Video not available. Use this method within the 'with' statement."
+            )
+        with self._download_lock:
+            if self._video_path is None:
+                self._video_path = self._download_video(self._info, self._temp_dir)
+            return self._video_path
+
+    async def adownload(self) -> str:
+        if self._video_path is not None and self._temp_dir:
+            return self._video_path
+        return await asyncio.to_thread(self.download)
+
     @property
     def title(self) -> Optional[str]:
         return self._title
@@ -57,30 +140,55 @@ class YouTubeVideo:
     def description(self) -> Optional[str]:
         return self._description
 
+    @property
+    def duration(self) -> Optional[float]:
+        """Duration in seconds reported by YouTube, if known."""
+        return self._duration
+
     @property
     def caption(self) -> Optional[str]:
         return self._caption
 
     @property
     def audio_path(self) -> Optional[str]:
-        if not self._video_path or not self._temp_dir:
-            raise RuntimeError(
-                "Video not available. Use this method within the 'with' statement."
-            )
+        self.download()
 
         if self._audio_path and os.path.exists(self._audio_path):
+            record_cache("youtube_audio", hit=True)
             return self._audio_path
 
+        record_cache("youtube_audio", hit=False)
         self._audio_path = self._extract_audio(self._video_path, self._temp_dir)
         return self._audio_path
 
-    def generate_frames(self, fps: float) -> Iterator[tuple[str, str, int]]:
+    async def get_audio_path(self) -> Optional[str]:
+        """Async variant of `audio_path`, extracting the audio with async ffmpeg."""
+        await self.adownload()
+
+        if self._audio_path and os.path.exists(self._audio_path):
+            record_cache("youtube_audio", hit=True)
+            return self._audio_path
+
+        record_cache("youtube_audio", hit=False)
+        audio_path = os.path.join(self._temp_dir, "audio.mp3")
+        with subprocess_timer("ffmpeg", "audio"):
+            returncode, stderr = await run_command(
+                self._audio_command(self._video_path, audio_path)
+            )
+        self._audio_path = self._check_audio(returncode, stderr, audio_path)
+        return self._audio_path
+
+    def generate_frames(
+        self, fps: float, start: float = 0, end: Optional[float] = None
+    ) -> Iterator[tuple[str, str, int]]:
         """
         A generator that extracts frames from the video at a specified frame rate,
         yields them as file paths, and cleans up the frame files afterward.
 
         Args:
             fps: The number of frames to extract per second.
+            start: Start of the extracted part of the video in seconds.
+            end: End of the extracted part in seconds, the end of the video if None.
 
         Yields:
             A tuple of (frame_path, timestamp, total_frames).
@@ -88,36 +196,261 @@ class YouTubeVideo:
         Raises:
             RuntimeError: If the video is not available (i.e., not used within a 'with' statement).
         """
-        if not self._video_path or not self._temp_dir:
-            raise RuntimeError(
-                "Video not available. Use this method within the 'with' statement."
+        self.download()
+
+        frames_dir = self._frames_dir(f"fps_{fps}_from_{start}")
+        starts = [start]
+        if self._segment_end(start, end) is not None:
+            starts = self._segment_starts(self.keyframes(), fps, start, end)
+        commands = self._frames_commands(fps, frames_dir, start, end, starts)
+
+        # Parts of a long video are decoded by concurrent ffmpeg processes
+        with subprocess_timer("ffmpeg", "frames"):
+            with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+                processes = list(
+                    executor.map(
+                        lambda command: subprocess.run(
+                            command, capture_output=True, text=True, check=False
+                        ),
+                        commands,
+                    )
+                )
+
+        errors = [p.stderr for p in processes if p.returncode != 0]
+        if errors:
+            print(f"Warning: Error extracting frames with ffmpeg: {errors[0]}")
+            return
+
+        yield from self._list_frames(frames_dir, fps, start)
+
+    async def agenerate_frames(
+        self, fps: float, start: float = 0, end: Optional[float] = None
+    ) -> list[tuple[str, str, int]]:
+        """
+        Async variant of `generate_frames` that runs ffmpeg without blocking the
+        event loop and returns the extracted frames as a list.
+        """
+        await self.adownload()
+
+        frames_dir = self._frames_dir(f"fps_{fps}_from_{start}")
+        starts = [start]
+        if self._segment_end(start, end) is not None:
+            starts = self._segment_starts(await self.akeyframes(), fps, start, end)
+        commands = self._frames_commands(fps, frames_dir, start, end, starts)
+
+        with subprocess_timer("ffmpeg", "frames"):
+            results = await asyncio.gather(
+                *(run_command(command) for command in commands)
             )
 
-        frames_dir = os.path.join(
-            self._temp_dir, f"frames_fps_{str(fps).replace('.', '_')}"
-        )
+        errors = [stderr for returncode, stderr in results if returncode != 0]
+        if errors:
+            print(f"Warning: Error extracting frames with ffmpeg: {errors[0]}")
+            return []
+
+        return list(self._list_frames(frames_dir, fps, start))
+
+    def keyframes(self) -> list[float]:
+        """Times of the video's keyframes, where decoding can start."""
+        self.download()
+        if self._keyframes is None:
+            with subprocess_timer("ffmpeg", "keyframes"):
+                process = subprocess.run(
+                    self._keyframes_command(),
+                    capture_output=True,
+                    text=True,
+                    check=False,
+                )
+            self._keyframes = self._parse_keyframes(process.returncode, process.stderr)
+        return self._keyframes
+
+    async def akeyframes(self) -> list[float]:
+        await self.adownload()
+        if self._keyframes is None:
+            with subprocess_timer("ffmpeg", "keyframes"):
+                returncode, stderr = await run_command(self._keyframes_command())
+            self._keyframes = self._parse_keyframes(returncode, stderr)
+        return self._keyframes
+
+    def scene_frames(self, threshold: float) -> list[tuple[str, str, int]]:
+        """
+        Frames where the scene changes, i.e. whose ffmpeg scene score (0 to 1)
+        exceeds `threshold`, as (frame_path, timestamp, total_frames) tuples.
+        """
+        self.download()
+
+        frames_dir = self._frames_dir(f"scenes_{threshold}")
+
+        with subprocess_timer("ffmpeg", "scenes"):
+            process = subprocess.run(
+                self._scenes_command(threshold, frames_dir),
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+
+        if process.returncode != 0:
+            print(f"Warning: Error detecting scene changes: {process.stderr}")
+            return []
+
+        return self._list_scene_frames(frames_dir, process.stderr)
+
+    async def ascene_frames(self, threshold: float) -> list[tuple[str, str, int]]:
+        """Async variant of `scene_frames`."""
+        await self.adownload()
+
+        frames_dir = self._frames_dir(f"scenes_{threshold}")
+
+        with subprocess_timer("ffmpeg", "scenes"):
+            returncode, stderr = await run_command(
+                self._scenes_command(threshold, frames_dir)
+            )
+
+        if returncode != 0:
+            print(f"Warning: Error detecting scene changes: {stderr}")
+            return []
+
+        return self._list_scene_frames(frames_dir, stderr)
+
+    def _frames_dir(self, name: str) -> str:
+        frames_dir = os.path.join(self._temp_dir, f"frames_{name}".replace(".", "_"))
         os.makedirs(frames_dir, exist_ok=True)
+        return frames_dir
+
+    def _segment_end(self, start: float, end: Optional[float]) -> Optional[float]:
+        """End of an extraction long enough to split into parts, None otherwise."""
+        end = self._duration if end is None else end
+        if FFMPEG_SEGMENTS > 1 and end and end - start >= 2 * FFMPEG_SEGMENT_SECONDS:
+            return end
+        return None
+
+    def _segment_starts(
+        self, keyframes: list[float], fps: float, start: float, end: Optional[float]
+    ) -> list[float]:
+        return segment_starts(
+            keyframes,
+            start,
+            self._segment_end(start, end),
+            fps,
+            FFMPEG_SEGMENTS,
+            FFMPEG_SEGMENT_SECONDS,
+        )
 
-        ffmpeg_cmd = [
+    def _frames_commands(
+        self,
+        fps: float,
+        frames_dir: str,
+        start: float,
+        end: Optional[float],
+        starts: list[float],
+    ) -> list[list[str]]:
+        """
+        One command per part of the extraction beginning at `starts`, numbering
+        the frames of all parts as a single pass from `start` would.
+        """
+        commands = []
+        for i, part_start in enumerate(starts):
+            first_frame = round((part_start - start) * fps)
+            if i + 1 < len(starts):
+                frames = round((starts[i + 1] - part_start) * fps)
+                command = self._frames_command(
+                    fps, frames_dir, part_start, None, first_frame, frames
+                )
+            else:
+                command = self._frames_command(
+                    fps, frames_dir, part_start, end, first_frame
+                )
+            commands.append(command)
+        return commands
+
+    def _frames_command(
+        self,
+        fps: float,
+        frames_dir: str,
+        start: float,
+        end: Optional[float],
+        first_frame: int = 0,
+        max_frames: Optional[int] = None,
+    ) -> list[str]:
+        # Seeking before the input is fast and makes output timestamps relative
+        # to `start`
+        seek = ["-ss", f"{start:.3f}"] if start else []
+        limit = ["-t", f"{end - start:.3f}"] if end is not None else []
+        if max_frames is not None:
+            limit += ["-frames:v", str(max_frames)]
+        numbering = ["-start_number", str(first_frame + 1)] if first_frame else []
+        return [
             "ffmpeg",
+            *seek,
             "-i",
             self._video_path,
+            *limit,
             "-vf",
             f"fps={fps}",
+            *numbering,
             os.path.join(frames_dir, "frame_%04d.png"),
             "-y",
             "-loglevel",
             "error",
         ]
 
-        process = subprocess.run(
-            ffmpeg_cmd, capture_output=True, text=True, check=False
-        )
+    def _keyframes_command(self) -> list[str]:
+        # Decoding only the keyframes is fast, and showinfo logs their times
+        return [
+            "ffmpeg",
+            "-skip_frame",
+            "nokey",
+            "-i",
+            self._video_path,
+            "-an",
+            "-vf",
+            "showinfo",
+            "-f",
+            "null",
+            "-",
+            "-loglevel",
+            "info",
+        ]
 
-        if process.returncode != 0:
-            print(f"Warning: Error extracting frames with ffmpeg: {process.stderr}")
-            return
+    def _parse_keyframes(self, returncode: int, stderr: str) -> list[float]:
+        if returncode != 0:
+            print(f"Warning: Error finding keyframes: {stderr}")
+            return []
+        return [float(t) for t in SHOWINFO_TIME_PATTERN.findall(stderr)]
+
+    def _scenes_command(self, threshold: float, frames_dir: str) -> list[str]:
+        # showinfo logs the time of every selected frame at the info level
+        return [
+            "ffmpeg",
+            "-i",
+            self._video_path,
+            "-vf",
+            f"select='gt(scene,{threshold})',showinfo",
+            "-vsync",
+            "vfr",
+            os.path.join(frames_dir, "frame_%04d.png"),
+            "-y",
+            "-loglevel",
+            "info",
+        ]
+
+    def _list_scene_frames(
+        self, frames_dir: str, log: str
+    ) -> list[tuple[str, str, int]]:
+        times = [float(t) for t in SHOWINFO_TIME_PATTERN.findall(log)]
+        frame_files = sorted(
+            f
+            for f in os.listdir(frames_dir)
+            if f.startswith("frame_") and f.endswith(".png")
+        )
+        return [
+            (os.path.join(frames_dir, file), format_timestamp(seconds), len(times))
+            for file, seconds in zip(frame_files, times)
+        ]
 
+    def _list_frames(
+        self, frames_dir: str, fps: float, start: float = 0
+    ) -> Iterator[tuple[str, str, int]]:
         frame_files = [
             f
             for f in os.listdir(frames_dir)
@@ -132,11 +465,8 @@ class YouTubeVideo:
             try:
                 frame_num_str = file[6:-4]
                 frame_num = int(frame_num_str)
-                total_seconds = frame_num / fps
-                hours = int(total_seconds // 3600)
-                minutes = int((total_seconds % 3600) // 60)
-                seconds = total_seconds % 60
-                timestamp = f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+                # The fps filter emits its first frame at the start
+                timestamp = format_timestamp(start + (frame_num - 1) / fps)
 
                 yield frame_path, timestamp, total_number_of_frames
             except (IOError, ValueError) as e:
@@ -150,7 +480,19 @@ class YouTubeVideo:
             Optional[str]: Path to extracted audio file, None if extraction failed
         """
         audio_path = os.path.join(destination_dir, "audio.mp3")
-        audio_cmd = [
+
+        with subprocess_timer("ffmpeg", "audio"):
+            process = subprocess.run(
+                self._audio_command(video_path, audio_path),
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+
+        return self._check_audio(process.returncode, process.stderr, audio_path)
+
+    def _audio_command(self, video_path: str, audio_path: str) -> list[str]:
+        return [
             "ffmpeg",
             "-i",
             video_path,
@@ -165,10 +507,11 @@ class YouTubeVideo:
             "error",
         ]
 
-        process = subprocess.run(audio_cmd, capture_output=True, text=True, check=False)
-
-        if process.returncode != 0:
-            print(f"Warning: Error extracting audio: {process.stderr}")
+    def _check_audio(
+        self, returncode: int, stderr: str, audio_path: str
+    ) -> Optional[str]:
+        if returncode != 0:
+            print(f"Warning: Error extracting audio: {stderr}")
             return None
         elif not os.path.exists(audio_path):
             print("Warning: Audio file was not created")
@@ -176,12 +519,10 @@ class YouTubeVideo:
 
         return audio_path
 
-    def _download_youtube(self, uri: str, destination_dir: str) -> tuple[str, str, str]:
-        video_filename = "video.%(ext)s"
-
-        ydl_opts = {
+    def _ydl_options(self, destination_dir: str) -> dict:
+        return {
             "format": "best[ext=mp4]/best",
-            "outtmpl": os.path.join(destination_dir, video_filename),
+            "outtmpl": os.path.join(destination_dir, "video.%(ext)s"),
             "writeinfojson": True,
             "writesubtitles": True,
             "writeautomaticsub": True,
@@ -190,12 +531,45 @@ class YouTubeVideo:
             "no_warnings": False,
         }
 
+    def _download_youtube(
+        self, uri: str, destination_dir: str, download: bool = True
+    ) -> tuple[Optional[str], dict]:
+        """
+        Fetch the metadata and subtitles, and the video itself if `download`.
+        Returns the video path (None if not downloaded) and the metadata.
+        """
+        import yt_dlp
+
+        ydl_opts = {**self._ydl_options(destination_dir), "skip_download": not download}
+
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with subprocess_timer("yt-dlp", "extract_info"):
+                info = ydl.extract_info(uri, download=False)
+            # Writes the subtitles, and the video unless it's skipped, without
+            # extracting the info again
+            with subprocess_timer("yt-dlp", "download" if download else "subtitles"):
+                ydl.process_ie_result(info, download=True)
+
+        return (self._find_video(destination_dir) if download else None), info
+
+    def _download_video(self, info: dict, destination_dir: str) -> str:
+        """Download the video of already extracted metadata."""
+        import yt_dlp
+
+        ydl_opts = {
+            **self._ydl_options(destination_dir),
+            "writeinfojson": False,
+            "writesubtitles": False,
+            "writeautomaticsub": False,
+        }
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(uri, download=False)
-            title = info.get("title", "Unknown Title")
-            description = info.get("description", "No description available")
-            ydl.download([uri])
+            with subprocess_timer("yt-dlp", "download"):
+                ydl.process_ie_result(info, download=True)
+
+        return self._find_video(destination_dir)
 
+    def _find_video(self, destination_dir: str) -> str:
         video_path = None
         for file in os.listdir(destination_dir):
             if file.startswith("video.") and not file.endswith(
@@ -207,7 +581,7 @@ class YouTubeVideo:
         if not video_path or not os.path.exists(video_path):
             raise FileNotFoundError("Downloaded video file not found")
 
-        return video_path, title, description
+        return video_path
 
     def _find_caption(self, destination_dir: str) -> Optional[str]:
         caption_files = [
@@ -0,0 +1,181 @@
+"""
+Deterministic formatting of proposed answers into the final answer form.
+
+Handles the common answer shapes locally (plain numbers, single tokens and
+comma-separated lists) so that only free-form answers need the format_answer
+LLM call.
+"""
+
+import re
+from typing import Optional
+
+ARTICLES = ("a", "an", "the")
+
+NUMBER_WORDS = {
+    "zero": "0",
+    "one": "1",
+    "two": "2",
+    "three": "3",
+    "four": "4",
+    "five": "5",
+    "six": "6",
+    "seven": "7",
+    "eight": "8",
+    "nine": "9",
+    "ten": "10",
+    "eleven": "11",
+    "twelve": "12",
+}
+
+UNITS = {
+    "mm",
+    "cm",
+    "m",
+    "km",
+    "mi",
+    "ft",
+    "in",
+    "g",
+    "kg",
+    "mg",
+    "lb",
+    "lbs",
+    "s",
+    "sec",
+    "min",
+    "h",
+    "hr",
+    "hrs",
+    "mph",
+    "kph",
+    "usd",
+    "eur",
+    "gbp",
+}
+
+# Question wording that asks for a representation the rules below can't verify
+FORMAT_INSTRUCTION_PATTERN = re.compile(
+    r"alphabeti|\border|\bsort|abbreviat|\bcode|\bround|decimal|significant"
+    r"|thousand|million|billion|percent|%|\bunits?\b|\bformat|\bexpress",
+    re.IGNORECASE,
+)
+
+NUMBER_PATTERN = re.compile(
+    r"^(?P<currency>[$€£])?\s*(?P<number>-?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)"
+    r"\s*(?P<unit>%|[A-Za-z]+)?$"
+)
+
+# Questions whose answer is a single number, so "seven" means 7 and a comma
+# between digits groups thousands instead of separating list items
+NUMBER_QUESTION_PATTERN = re.compile(
+    r"\bhow (?:many|much)\b|\bnumber\b|\bcount\b", re.IGNORECASE
+)
+
+TOKEN_PATTERN = re.compile(r"^[A-Za-z0-9][\w'-]*$")
+
+# Commas that separate list items: all but those that could group thousands
+LIST_DELIMITER_PATTERN = re.compile(r",(?!(?<=\d,)\d{3}(?!\d))")
+
+LIST_ITEM_PATTERN = re.compile(r"^[\w'-]+(?: [\w'-]+){0,3}$")
+
+
+def tidy_answer(answer: str) -> str:
+    """Drop trailing punctuation and capitalize single-item answers."""
+    if answer and not answer[-1].isalnum():
+        answer = answer[:-1]
+
+    if answer and len(answer) > 0 and answer[0].isalpha() and "," not in answer:
+        answer = answer[0].upper() + answer[1:]
+
+    return answer
+
+
+def _normalize_number(question: str, text: str) -> Optional[str]:
+    match = NUMBER_PATTERN.match(text)
+    if not match:
+        return None
+
+    # Units are dropped, but an unknown trailing word is more likely part of a
+    # name ("3 Musketeers") than a unit, unless the question uses it too.
+    unit = match.group("unit")
+    if unit and unit != "%" and unit.lower() not in UNITS:
+        if unit.lower() not in re.findall(r"[a-z]+", question.lower()):
+            return None
+
+    # "100,200" may as well be the list "100, 200", unless something marks it as
+    # a single amount: a currency, a unit, decimals, a group no list item would
+    # start with ("1,050") or a question asking for a number
+    number = match.group("number")
+    if "," in number and not (
+        match.group("currency")
+        or unit
+        or "." in number
+        or any(group.startswith("0") for group in number.split(",")[1:])
+        or NUMBER_QUESTION_PATTERN.search(question)
+    ):
+        return None
+
+    return number.replace(",", "")
+
+
+def _normalize_token(question: str, text: str) -> Optional[str]:
+    if not TOKEN_PATTERN.match(text) or text.lower() in ARTICLES:
+        return None
+    # "One" is a word unless the question asks for a number
+    if NUMBER_QUESTION_PATTERN.search(question):
+        return NUMBER_WORDS.get(text.lower(), text)
+    return text
+
+
+def _normalize_list(question: str, text: str) -> Optional[str]:
+    items = [item.strip() for item in LIST_DELIMITER_PATTERN.split(text)]
+    if len(items) < 2:
+        return None
+
+    if items[-1].lower().startswith("and "):
+        items[-1] = items[-1][4:].strip()
+
+    normalized = []
+    for item in items:
+        number = _normalize_number(question, item)
+        if number is not None:
+            normalized.append(number)
+            continue
+        if not item or not LIST_ITEM_PATTERN.match(item):
+            return None
+        if item.split(" ", 1)[0].lower() in ARTICLES:
+            return None
+        normalized.append(item)
+
+    return ", ".join(normalized)
+
+
+def normalize_answer(question: str, proposed_answer: Optional[str]) -> Optional[str]:
+    """
+    Return the final form of `proposed_answer` when its shape is unambiguous, or
+    None when the answer should go through the format_answer model instead.
+    """
+    if proposed_answer is None:
+        return None
+
+    text = proposed_answer.strip()
+    if text.endswith((".", "!", "?")) and not text.endswith("..."):
+        text = text[:-1].rstrip()
+
+    if not text or "\n" in text or len(text) > 200:
+        return None
+    if FORMAT_INSTRUCTION_PATTERN.search(question):
+        return None
+
+    number = _normalize_number(question, text)
+    if number is not None:
+        return number
+
+    if " " not in text and "," not in text:
+        token = _normalize_token(question, text)
+        return tidy_answer(token) if token is not None else None
+
+    if "," in text:
+        return _normalize_list(question, text)
+
+    return None
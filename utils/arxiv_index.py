@@ -0,0 +1,164 @@
+"""
+Persistent cache of arXiv search results with a local full-text index.
+
+Every search result is stored in SQLite: the papers a query returned, keyed by
+the normalized query, and the metadata and abstract of every paper seen, in an
+FTS5 index. Repeated queries are answered from the query cache, and related
+queries optionally from the index once it holds enough papers matching all
+their terms.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional, TypedDict
+
+
+class ArxivPaper(TypedDict):
+    id: str
+    title: str
+    authors: list[str]
+    published: str  # ISO 8601
+    summary: str
+    pdf_url: Optional[str]
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    published TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    pdf_url TEXT
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query_key TEXT PRIMARY KEY,
+    paper_ids TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    id UNINDEXED, title, authors, summary
+);
+"""
+
+
+def query_key(query: str) -> str:
+    """
+    Normalize the spacing of a query. Case, punctuation and word order are kept:
+    field prefixes ("ti:", "au:") and operators ("AND", "ANDNOT") depend on them.
+    """
+    return " ".join(query.split())
+
+
+class ArxivIndex:
+    """SQLite-backed query cache and full-text index of arXiv papers."""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        try:
+            self._connection.executescript(FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: only exact repeat queries are cached
+            self.full_text = False
+
+    def cached_results(self, query: str) -> Optional[list[ArxivPaper]]:
+        """The papers stored for this query, or None if it was never fetched or expired."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT paper_ids, fetched_at FROM queries WHERE query_key = ?",
+                (query_key(query),),
+            ).fetchone()
+        if row is None:
+            return None
+        paper_ids, fetched_at = row
+        if self.ttl_seconds is not None and time.time() - fetched_at > self.ttl_seconds:
+            return None
+        return self._papers(json.loads(paper_ids))
+
+    def search(self, query: str, limit: int) -> list[ArxivPaper]:
+        """Papers in the index matching every term of the query, best match first."""
+        terms = TOKEN_PATTERN.findall(query.lower())
+        if not self.full_text or not terms:
+            return []
+        match = " ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id FROM papers_fts WHERE papers_fts MATCH ? "
+                "ORDER BY bm25(papers_fts, 0, 10.0, 2.0, 1.0) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return self._papers([row[0] for row in rows])
+
+    def store(self, query: str, papers: list[ArxivPaper]) -> None:
+        """Record the papers a query returned and add them to the index."""
+        with self._lock, self._connection:
+            for paper in papers:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        paper["id"],
+                        paper["title"],
+                        json.dumps(paper["authors"]),
+                        paper["published"],
+                        paper["summary"],
+                        paper["pdf_url"],
+                    ),
+                )
+                if self.full_text:
+                    self._connection.execute(
+                        "DELETE FROM papers_fts WHERE id = ?", (paper["id"],)
+                    )
+                    self._connection.execute(
+                        "INSERT INTO papers_fts VALUES (?, ?, ?, ?)",
+                        (
+                            paper["id"],
+                            paper["title"],
+                            " ".join(paper["authors"]),
+                            paper["summary"],
+                        ),
+                    )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO queries VALUES (?, ?, ?)",
+                (
+                    query_key(query),
+                    json.dumps([paper["id"] for paper in papers]),
+                    time.time(),
+                ),
+            )
+
+    def _papers(self, paper_ids: list[str]) -> list[ArxivPaper]:
+        if not paper_ids:
+            return []
+        placeholders = ", ".join("?" * len(paper_ids))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT id, title, authors, published, summary, pdf_url "
+                f"FROM papers WHERE id IN ({placeholders})",
+                paper_ids,
+            ).fetchall()
+        by_id = {
+            row[0]: ArxivPaper(
+                id=row[0],
+                title=row[1],
+                authors=json.loads(row[2]),
+                published=row[3],
+                summary=row[4],
+                pdf_url=row[5],
+            )
+            for row in rows
+        }
+        return [by_id[paper_id] for paper_id in paper_ids if paper_id in by_id]
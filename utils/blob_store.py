@@ -0,0 +1,164 @@
+"""
+Content-addressed store for large tool outputs kept out of the graph state.
+
+Tool messages whose content is large hold a reference ("blob:<sha256>:<size>")
+instead, so each step copies and traces a short string rather than whole pages.
+Blobs are files named by their digest, with recently used ones kept in memory,
+and references are resolved only when a prompt is built from the messages.
+Blobs are only needed while a question runs, so files not stored again within
+the TTL are swept from disk.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import cache
+from typing import Optional
+
+from langchain_core.messages import AnyMessage, ToolMessage
+
+from config import BLOB_MEMORY_BYTES, BLOB_MIN_BYTES, BLOB_STORE_DIR, BLOB_TTL_SECONDS
+from utils.metrics import increment, record_cache
+
+REFERENCE_PATTERN = re.compile(r"^blob:([0-9a-f]{64}):(\d+)$")
+
+
+def reference_size(content) -> Optional[int]:
+    """Size in bytes of the blob `content` refers to, None if not a reference."""
+    if not isinstance(content, str):
+        return None
+    match = REFERENCE_PATTERN.match(content)
+    return int(match.group(2)) if match else None
+
+
+class BlobStore:
+    """
+    Blobs as files under `directory`, the latest `memory_bytes` of them cached.
+    Files not stored within `ttl_seconds` are deleted by `sweep`, which `put`
+    runs at most once per TTL.
+    """
+
+    def __init__(
+        self, directory: str, memory_bytes: int, ttl_seconds: Optional[float] = None
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self._swept_at = 0.0
+        self._size = 0
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _remember(self, digest: str, text: str, size: int) -> None:
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                return
+            self._memory[digest] = text
+            self._size += size
+            while self._size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._size -= len(evicted.encode("utf-8"))
+
+    def put(self, text: str) -> str:
+        """Store `text` and return its reference."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            # Refreshes the modification time the sweep goes by
+            os.utime(path)
+            increment("agent_blob_store_total", outcome="deduplicated")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            increment("agent_blob_store_total", outcome="stored")
+        self._remember(digest, text, len(data))
+        if self.ttl_seconds is not None and (
+            time.time() - self._swept_at > self.ttl_seconds
+        ):
+            self.sweep()
+        return f"blob:{digest}:{len(data)}"
+
+    def sweep(self) -> int:
+        """Delete the blob files not stored within the TTL, returning how many."""
+        self._swept_at = time.time()
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = self._swept_at - self.ttl_seconds
+        removed = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    # Swept by another process
+                    continue
+        if removed:
+            increment("agent_blob_store_total", removed, outcome="expired")
+        return removed
+
+    def get(self, reference: str) -> str:
+        match = REFERENCE_PATTERN.match(reference)
+        if match is None:
+            raise ValueError(f"Not a blob reference: {reference}")
+        digest = match.group(1)
+        with self._lock:
+            text = self._memory.get(digest)
+            if text is not None:
+                self._memory.move_to_end(digest)
+        record_cache("blob", hit=text is not None)
+        if text is None:
+            with open(self._path(digest), "r", encoding="utf-8") as f:
+                text = f.read()
+            self._remember(digest, text, int(match.group(2)))
+        return text
+
+
+@cache
+def get_blob_store() -> BlobStore:
+    return BlobStore(BLOB_STORE_DIR, BLOB_MEMORY_BYTES, BLOB_TTL_SECONDS)
+
+
+def offload(message: ToolMessage) -> ToolMessage:
+    """`message` with its content moved to the blob store, if it's large."""
+    content = message.content
+    if not isinstance(content, str) or len(content.encode("utf-8")) < BLOB_MIN_BYTES:
+        return message
+    return message.model_copy(update={"content": get_blob_store().put(content)})
+
+
+def resolve_messages(messages: list[AnyMessage]) -> list[AnyMessage]:
+    """`messages` with the contents of tool messages that refer to blobs."""
+    resolved = []
+    for message in messages:
+        if (
+            isinstance(message, ToolMessage)
+            and reference_size(message.content) is not None
+        ):
+            message = message.model_copy(
+                update={"content": get_blob_store().get(message.content)}
+            )
+        resolved.append(message)
+    return resolved
+
+
+async def aresolve_messages(messages: list[AnyMessage]) -> list[AnyMessage]:
+    # Blobs not in memory are read from disk
+    return await asyncio.to_thread(resolve_messages, messages)
@@ -0,0 +1,95 @@
+"""
+Per-question resource budgets.
+
+A QuestionBudget is passed as a LangChain callback when a question is invoked,
+so it sees every node, tool and LLM call of the main graph and its subgraphs.
+Once a limit on wall-clock time, tokens or LLM calls is reached, the next
+callback raises BudgetExceeded to stop the run. Callbacks only run between
+steps, so async runs also wrap the question in a timeout of `max_seconds` to
+stop a step that hangs.
+"""
+
+import threading
+import time
+from typing import Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from .metrics import increment, token_usage
+
+
+class BudgetExceeded(Exception):
+    """Raised when a question runs out of time, tokens or LLM calls."""
+
+    def __init__(self, resource: str, used: float, limit: float):
+        super().__init__(f"Budget exceeded: {resource} {used:g} >= {limit:g}")
+        self.resource = resource
+        self.used = used
+        self.limit = limit
+
+
+class QuestionBudget(BaseCallbackHandler):
+    """Callback handler enforcing time, token and LLM-call limits for one question."""
+
+    raise_error = True
+
+    def __init__(
+        self,
+        max_seconds: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        max_llm_calls: Optional[int] = None,
+    ):
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.max_llm_calls = max_llm_calls
+
+        self.started_at = time.monotonic()
+        self.tokens = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def check(self) -> None:
+        """Raise BudgetExceeded if any limit has been reached."""
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            self._exceeded("seconds", self.elapsed, self.max_seconds)
+        if self.max_tokens is not None and self.tokens >= self.max_tokens:
+            self._exceeded("tokens", self.tokens, self.max_tokens)
+        if self.max_llm_calls is not None and self.llm_calls >= self.max_llm_calls:
+            self._exceeded("llm_calls", self.llm_calls, self.max_llm_calls)
+
+    def _exceeded(self, resource: str, used: float, limit: float):
+        increment("agent_budget_exceeded_total", resource=resource)
+        raise BudgetExceeded(resource, used, limit)
+
+    def timed_out(self) -> BudgetExceeded:
+        """The BudgetExceeded of a run stopped by a timeout of `max_seconds`."""
+        increment("agent_budget_exceeded_total", resource="seconds")
+        return BudgetExceeded("seconds", self.elapsed, self.max_seconds)
+
+    def _start_llm(self) -> None:
+        with self._lock:
+            self.check()
+            self.llm_calls += 1
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._start_llm()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._start_llm()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        input_tokens, output_tokens = token_usage(response)
+        with self._lock:
+            self.tokens += input_tokens + output_tokens
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, **kwargs):
+        self.check()
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        self.check()
@@ -0,0 +1,134 @@
+"""
+Local OCR of video frames with the Tesseract CLI.
+
+Frames are read concurrently, one tesseract process each, into a timestamped
+text index that can be searched with a question's keywords. The analyst uses it
+to look only at frames showing relevant text, and to answer questions about
+on-screen text without vision calls.
+"""
+
+import asyncio
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Optional
+
+from .metrics import subprocess_timer
+from .YouTubeVideo import run_command
+
+TOKEN_PATTERN = re.compile(r"\w+")
+URL_PATTERN = re.compile(r"https?://\S+")
+
+STOPWORDS = frozenset("""
+    a about after all an and any are as at be before by can did do does during
+    for from has have how in into is it its of on or shown shows that the their
+    there this to was what when where which who why with video frame screen
+    text written say says said appear appears appeared youtube
+    """.split())
+
+
+@cache
+def ocr_available() -> bool:
+    if shutil.which("tesseract") is None:
+        print("Warning: tesseract is not installed, skipping OCR of frames")
+        return False
+    return True
+
+
+# Frames are read in parallel, so each process gets a single thread
+OCR_ENV = {**os.environ, "OMP_THREAD_LIMIT": "1"}
+
+
+def _ocr_command(frame_path: str) -> list[str]:
+    # Page segmentation mode 11 finds sparse text anywhere in the image, which
+    # suits overlays and signs better than the default page layout
+    return ["tesseract", frame_path, frame_path, "--psm", "11", "-l", "eng"]
+
+
+def _read_ocr_output(frame_path: str) -> str:
+    # tesseract writes its output next to the frame, as <frame_path>.txt
+    try:
+        with open(f"{frame_path}.txt", "r", encoding="utf-8") as f:
+            return " ".join(f.read().split())
+    except OSError:
+        return ""
+
+
+def ocr_frame(frame_path: str) -> str:
+    with subprocess_timer("tesseract", "ocr"):
+        process = subprocess.run(
+            _ocr_command(frame_path),
+            capture_output=True,
+            text=True,
+            check=False,
+            env=OCR_ENV,
+        )
+    if process.returncode != 0:
+        print(f"Warning: Error running OCR on {frame_path}: {process.stderr}")
+        return ""
+    return _read_ocr_output(frame_path)
+
+
+async def aocr_frame(frame_path: str) -> str:
+    with subprocess_timer("tesseract", "ocr"):
+        returncode, stderr = await run_command(_ocr_command(frame_path), env=OCR_ENV)
+    if returncode != 0:
+        print(f"Warning: Error running OCR on {frame_path}: {stderr}")
+        return ""
+    return _read_ocr_output(frame_path)
+
+
+def keywords(question: str) -> set[str]:
+    """Words of a question worth looking for on screen."""
+    words = TOKEN_PATTERN.findall(URL_PATTERN.sub(" ", question.lower()))
+    return {w for w in words if w not in STOPWORDS and (len(w) > 2 or w.isdigit())}
+
+
+class FrameTextIndex:
+    """OCR text of frames, as (frame_path, timestamp, text) in frame order."""
+
+    def __init__(self, entries: list[tuple[str, str, str]]):
+        self.entries = [entry for entry in entries if entry[2]]
+
+    @classmethod
+    def build(cls, frames: list[tuple], workers: Optional[int] = None):
+        """Read the text of `frames`, `workers` tesseract processes at a time."""
+        paths = [frame[0] for frame in frames]
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            texts = list(executor.map(ocr_frame, paths))
+        return cls([(f[0], f[1], text) for f, text in zip(frames, texts)])
+
+    @classmethod
+    async def abuild(cls, frames: list[tuple], workers: Optional[int] = None):
+        semaphore = asyncio.Semaphore(workers or os.cpu_count())
+
+        async def read(frame_path: str) -> str:
+            async with semaphore:
+                return await aocr_frame(frame_path)
+
+        texts = await asyncio.gather(*(read(frame[0]) for frame in frames))
+        return cls([(f[0], f[1], text) for f, text in zip(frames, texts)])
+
+    def search(self, question: str) -> list[tuple[str, str, str]]:
+        """
+        Entries whose text contains the question's keywords, keeping those that
+        match at least half as many keywords as the best entry.
+        """
+        terms = keywords(question)
+        scored = [
+            (sum(term in entry[2].lower() for term in terms), entry)
+            for entry in self.entries
+        ]
+        best = max((score for score, _ in scored), default=0)
+        if best == 0:
+            return []
+        return [entry for score, entry in scored if score * 2 >= best]
+
+    def format(self, entries: Optional[list[tuple[str, str, str]]] = None) -> str:
+        return "\n".join(
+            f"[{timestamp}] {text}"
+            for _, timestamp, text in (self.entries if entries is None else entries)
+        )
@@ -0,0 +1,97 @@
+"""
+Coarse-to-fine frame sampling of videos within a frame budget.
+
+A video is first swept at a rate that spreads a fixed number of frames over its
+duration, then sampled densely only around timestamps flagged as relevant. Long
+extractions are split at keyframes into parts decoded concurrently.
+"""
+
+import math
+from typing import Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Rate of the sweep when the duration is unknown, and the highest sweep rate for
+# short videos, where the sweep frames would otherwise be nearly identical
+DEFAULT_SWEEP_FPS = 0.2
+MAX_SWEEP_FPS = 1.0
+
+
+def format_timestamp(seconds: float) -> str:
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds % 60:06.3f}"
+
+
+def timestamp_seconds(timestamp: str) -> float:
+    """Seconds of an "HH:MM:SS.mmm", "MM:SS" or plain seconds timestamp."""
+    seconds = 0.0
+    for part in timestamp.strip().split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def sweep_fps(duration: Optional[float], frames: int) -> float:
+    """Frame rate that spreads about `frames` frames over the video."""
+    if not duration:
+        return DEFAULT_SWEEP_FPS
+    return min(MAX_SWEEP_FPS, frames / duration)
+
+
+def pick_evenly(items: Sequence[T], count: int) -> list[T]:
+    """At most `count` items spread evenly over `items`, keeping their order."""
+    if count <= 0:
+        return []
+    if len(items) <= count:
+        return list(items)
+    step = len(items) / count
+    return [items[int(i * step)] for i in range(count)]
+
+
+def zoom_window(
+    center: float,
+    window: float,
+    fps: float,
+    frames_left: int,
+    duration: Optional[float] = None,
+) -> Optional[tuple[float, float, float]]:
+    """
+    (fps, start, end) of dense sampling around `center`, lowering the rate to
+    fit the frames left in the budget. None if no frames are left.
+    """
+    start = max(0.0, center - window / 2)
+    end = center + window / 2
+    if duration:
+        end = min(end, duration)
+    if frames_left <= 0 or end <= start:
+        return None
+    return min(fps, frames_left / (end - start)), start, end
+
+
+def segment_starts(
+    keyframes: Sequence[float],
+    start: float,
+    end: float,
+    fps: float,
+    segments: int,
+    min_seconds: float,
+) -> list[float]:
+    """
+    Start times of up to `segments` parts of [start, end), each about
+    `min_seconds` long or more, to decode separately. Every part starts at the
+    first frame of the `fps` grid of `start` after the keyframe nearest to an
+    even split, so that seeking to it decodes nothing of the previous part and
+    the parts together yield the same frames as a single pass.
+    """
+    segments = min(segments, int((end - start) // min_seconds))
+    if segments <= 1 or not keyframes:
+        return [start]
+    starts = [start]
+    for i in range(1, segments):
+        target = start + (end - start) * i / segments
+        keyframe = min(keyframes, key=lambda k: abs(k - target))
+        # Rounded down by a microsecond so a keyframe on the grid is its start
+        grid_start = start + math.ceil((keyframe - start) * fps - 1e-6) / fps
+        if starts[-1] < grid_start < end:
+            starts.append(grid_start)
+    return starts
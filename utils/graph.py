@@ -0,0 +1,21 @@
+"""
+Helpers for building LangGraph graphs that run both with `invoke` and natively
+on an event loop with `ainvoke`.
+"""
+
+from typing import Any, Awaitable, Callable
+
+from langgraph.utils.runnable import RunnableCallable
+
+
+def hybrid_node(
+    func: Callable[..., Any], afunc: Callable[..., Awaitable[Any]]
+) -> RunnableCallable:
+    """
+    Graph node backed by `func` under `invoke`/`stream` and by the coroutine
+    `afunc` under `ainvoke`/`astream`. Without the async implementation
+    LangGraph would run the sync function in a worker thread.
+    """
+    # trace=False like LangGraph's own function nodes; the node run is
+    # already traced by the graph.
+    return RunnableCallable(func, afunc, name=func.__name__, trace=False)
@@ -0,0 +1,178 @@
+"""
+Shared outbound HTTP clients with connection pooling, default timeouts,
+retries and optional hedging.
+
+One httpx client per process keeps connections alive per host, negotiates
+gzip (and brotli when the `brotli` package is installed) and can speak HTTP/2
+when HTTP2=1 and the `h2` package is installed. `arequest` is the asyncio
+variant, backed by one AsyncClient per event loop.
+"""
+
+import asyncio
+import importlib.util
+import threading
+import weakref
+from functools import cache
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from config import (
+    HTTP_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP2,
+)
+
+from .metrics import http_timer
+from .resilience import ahedged, aretry, hedged, retry
+
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+RETRYABLE_ERRORS = (httpx.TransportError,)
+
+HTTPError = httpx.HTTPError
+
+
+class RetryableStatus(Exception):
+    """A response status worth retrying, such as 429 or 503."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+
+
+def _client_options() -> dict:
+    return {
+        "timeout": HTTP_TIMEOUT,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        "http2": HTTP2 and importlib.util.find_spec("h2") is not None,
+        "follow_redirects": True,
+    }
+
+
+@cache
+def get_client() -> httpx.Client:
+    """Return the process-wide pooled HTTP client."""
+    return httpx.Client(**_client_options())
+
+
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**_client_options())
+            _async_clients[loop] = client
+        return client
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    timeout: Optional[float] = None,
+    retries: int = HTTP_MAX_RETRIES,
+    hedge: bool = False,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Send an HTTP request on the shared client, retrying transport errors,
+    timeouts and retryable statuses with jittered exponential backoff.
+
+    With `hedge=True` (idempotent requests only) a duplicate request is sent
+    when the first one is slower than the configured latency percentile.
+    The final response is returned even if its status is an error, so callers
+    keep using `raise_for_status()`.
+    """
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+
+    def send() -> httpx.Response:
+        with http_timer(url, client="httpx"):
+            response = get_client().request(method, url, **kwargs)
+        if response.status_code in RETRY_STATUS_CODES:
+            raise RetryableStatus(response)
+        return response
+
+    def attempt() -> httpx.Response:
+        if hedge:
+            return hedged(send, key=f"{method} {_host(url)}")
+        return send()
+
+    try:
+        return retry(
+            attempt,
+            attempts=retries + 1,
+            retry_on=RETRYABLE_ERRORS + (RetryableStatus,),
+            name=_host(url),
+        )
+    except RetryableStatus as e:
+        return e.response
+
+
+async def arequest(
+    method: str,
+    url: str,
+    *,
+    timeout: Optional[float] = None,
+    retries: int = HTTP_MAX_RETRIES,
+    hedge: bool = False,
+    **kwargs,
+) -> httpx.Response:
+    """Asyncio variant of `request`."""
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+
+    async def send() -> httpx.Response:
+        with http_timer(url, client="httpx-async"):
+            response = await get_async_client().request(method, url, **kwargs)
+        if response.status_code in RETRY_STATUS_CODES:
+            raise RetryableStatus(response)
+        return response
+
+    async def attempt() -> httpx.Response:
+        if hedge:
+            return await ahedged(send, key=f"{method} {_host(url)}")
+        return await send()
+
+    try:
+        return await aretry(
+            attempt,
+            attempts=retries + 1,
+            retry_on=RETRYABLE_ERRORS + (RetryableStatus,),
+            name=_host(url),
+        )
+    except RetryableStatus as e:
+        return e.response
+
+
+def get(url: str, **kwargs) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, retries: int = 0, **kwargs) -> httpx.Response:
+    """POST without retries unless asked for: the request may not be idempotent."""
+    return request("POST", url, retries=retries, **kwargs)
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, retries: int = 0, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, retries=retries, **kwargs)
+
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc
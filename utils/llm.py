@@ -0,0 +1,152 @@
+"""
+Process-wide registry of OpenAI clients and chat models.
+
+All sync calls share one connection-pooled httpx client, chat models are created
+once per model name, and tool-bound models are cached per (model, toolset,
+tool_choice) so nodes don't rebuild tool schemas on every invocation.
+Async calls reuse each model's own async client, so run them on one event loop
+per process (as `main.amain` does).
+"""
+
+import asyncio
+import threading
+import weakref
+from functools import cache
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import httpx
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI, DefaultHttpxClient, OpenAI
+
+from config import (
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_HEDGING,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+from .resilience import ahedged, hedged
+
+
+class HedgedChatOpenAI(ChatOpenAI):
+    """ChatOpenAI that sends a duplicate request when a call is unusually slow."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return hedged(
+            lambda: super(HedgedChatOpenAI, self)._generate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+            key=f"llm {self.model_name}",
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await ahedged(
+            lambda: super(HedgedChatOpenAI, self)._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+            key=f"llm {self.model_name}",
+        )
+
+
+@cache
+def get_http_client() -> httpx.Client:
+    """Connection pool shared by every sync OpenAI request."""
+    return DefaultHttpxClient(
+        timeout=LLM_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+
+
+_chat_models: Dict[str, ChatOpenAI] = {}
+
+# Speech-to-text models of the audio agent and of YouTube captions, named here
+# since their subgraphs are only imported when first used
+AUDIO_TRANSCRIPTION_MODEL = "gpt-4o-transcribe"
+CAPTION_TRANSCRIPTION_MODEL = "gpt-4o-mini-transcribe"
+
+
+@cache
+def chat_model(model: str) -> ChatOpenAI:
+    """
+    Return the shared chat model for `model`, with the configured timeout and
+    retry policy. The OpenAI SDK retries connection errors, 429s and 5xx with
+    jittered exponential backoff.
+    """
+    model_class = HedgedChatOpenAI if LLM_HEDGING else ChatOpenAI
+    _chat_models[model] = model_class(
+        model=model,
+        timeout=LLM_TIMEOUT,
+        max_retries=LLM_MAX_RETRIES,
+        http_client=get_http_client(),
+    )
+    return _chat_models[model]
+
+
+def model_settings() -> list[dict]:
+    """
+    Settings of every chat model created so far, sorted by model name, and the
+    transcription models.
+    """
+    return [
+        {
+            "model": model.model_name,
+            "temperature": model.temperature,
+            "max_tokens": model.max_tokens,
+            "reasoning_effort": model.reasoning_effort,
+        }
+        for _, model in sorted(_chat_models.items())
+    ] + [
+        {"model": model, "transcription": True}
+        for model in (AUDIO_TRANSCRIPTION_MODEL, CAPTION_TRANSCRIPTION_MODEL)
+    ]
+
+
+@cache
+def openai_client() -> OpenAI:
+    """Return the shared OpenAI client, e.g. for audio transcription."""
+    return OpenAI(
+        timeout=LLM_TIMEOUT,
+        max_retries=LLM_MAX_RETRIES,
+        http_client=get_http_client(),
+    )
+
+
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+def async_openai_client() -> AsyncOpenAI:
+    """Return the AsyncOpenAI client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+            _async_clients[loop] = client
+        return client
+
+
+_bound_models: Dict[
+    Tuple[int, Tuple[str, ...], Optional[str]], Tuple[Any, Runnable]
+] = {}
+_bound_models_lock = threading.Lock()
+
+
+def bind_tools(
+    model: ChatOpenAI, tools: Sequence[BaseTool], tool_choice: Optional[str] = None
+) -> Runnable:
+    """Return `model.bind_tools(tools, tool_choice=...)`, built once per toolset."""
+    key = (id(model), tuple(t.name for t in tools), tool_choice)
+    with _bound_models_lock:
+        cached = _bound_models.get(key)
+        if cached is None:
+            # Keep a reference to the model so its id can't be reused
+            cached = (model, model.bind_tools(tools, tool_choice=tool_choice))
+            _bound_models[key] = cached
+        return cached[1]
@@ -0,0 +1,292 @@
+"""
+In-process metrics for agent runs.
+
+Collects latency histograms and counters for graph nodes, tools, LLM calls and
+outbound HTTP/subprocess work, and exports them as a Prometheus text file or a
+JSON summary at the end of a run. No external service is required.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_samples: Dict[str, Dict[LabelKey, List[float]]] = {}
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """Add `value` to the counter `name` with the given labels."""
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one observation (usually seconds) in the histogram `name`."""
+    key = _label_key(labels)
+    with _lock:
+        _samples.setdefault(name, {}).setdefault(key, []).append(value)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup as a hit or a miss."""
+    increment(
+        "agent_cache_hits_total" if hit else "agent_cache_misses_total", cache=cache
+    )
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """Context manager that observes the elapsed wall-clock time in `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def http_timer(url: str, client: str = "requests"):
+    """Time an outbound HTTP request, labelled by host."""
+    return timed(
+        "agent_http_request_duration_seconds",
+        host=urlparse(url).netloc or url,
+        client=client,
+    )
+
+
+def subprocess_timer(command: str, operation: str):
+    """Time an external command such as ffmpeg or yt-dlp."""
+    return timed(
+        "agent_subprocess_duration_seconds", command=command, operation=operation
+    )
+
+
+def instrument(graph: str, node: str):
+    """Decorator that records the latency of a LangGraph node."""
+
+    def decorator(fn):
+        if iscoroutinefunction(fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed("agent_node_duration_seconds", graph=graph, node=node):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed("agent_node_duration_seconds", graph=graph, node=node):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def percentile(name: str, q: float, **labels) -> Optional[float]:
+    """Return the q-quantile (0..1) of the observations of a histogram series."""
+    with _lock:
+        values = sorted(_samples.get(name, {}).get(_label_key(labels), []))
+    return _quantile(values, q)
+
+
+def _quantile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+def reset() -> None:
+    """Drop every collected metric."""
+    with _lock:
+        _counters.clear()
+        _samples.clear()
+
+
+def summary() -> Dict[str, Any]:
+    """Return a JSON-serializable summary of every counter and histogram."""
+    with _lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        samples = {
+            name: {key: list(values) for key, values in series.items()}
+            for name, series in _samples.items()
+        }
+
+    result: Dict[str, Any] = {"counters": {}, "histograms": {}}
+    for name, series in counters.items():
+        result["counters"][name] = [
+            {"labels": dict(key), "value": value} for key, value in series.items()
+        ]
+    for name, series in samples.items():
+        result["histograms"][name] = []
+        for key, values in series.items():
+            ordered = sorted(values)
+            result["histograms"][name].append(
+                {
+                    "labels": dict(key),
+                    "count": len(ordered),
+                    "sum": sum(ordered),
+                    "p50": _quantile(ordered, 0.5),
+                    "p95": _quantile(ordered, 0.95),
+                    "max": ordered[-1],
+                }
+            )
+    return result
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = [f'{k}="{_escape(v)}"' for k, v in pairs]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    with _lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        samples = {
+            name: {key: list(values) for key, values in series.items()}
+            for name, series in _samples.items()
+        }
+
+    lines: List[str] = []
+    for name in sorted(counters):
+        lines.append(f"# TYPE {name} counter")
+        for key, value in counters[name].items():
+            lines.append(f"{name}{_format_labels(key)} {value}")
+    for name in sorted(samples):
+        lines.append(f"# TYPE {name} histogram")
+        for key, values in samples[name].items():
+            for bucket in DEFAULT_BUCKETS:
+                count = sum(1 for v in values if v <= bucket)
+                labels = _format_labels(key, ("le", str(bucket)))
+                lines.append(f"{name}_bucket{labels} {count}")
+            labels = _format_labels(key, ("le", "+Inf"))
+            lines.append(f"{name}_bucket{labels} {len(values)}")
+            lines.append(f"{name}_sum{_format_labels(key)} {sum(values)}")
+            lines.append(f"{name}_count{_format_labels(key)} {len(values)}")
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(path: str) -> None:
+    """Write the metrics to `path`: JSON for `.json` files, Prometheus text otherwise."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            json.dump(summary(), f, indent=2)
+        else:
+            f.write(to_prometheus())
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that records LLM and tool latency and token usage."""
+
+    def __init__(self):
+        self._starts: Dict[UUID, Tuple[float, str]] = {}
+        self._starts_lock = threading.Lock()
+
+    def _start(self, run_id: UUID, label: str) -> None:
+        with self._starts_lock:
+            self._starts[run_id] = (time.perf_counter(), label)
+
+    def _stop(self, run_id: UUID) -> Optional[Tuple[float, str]]:
+        with self._starts_lock:
+            started = self._starts.pop(run_id, None)
+        if started is None:
+            return None
+        return time.perf_counter() - started[0], started[1]
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs
+    ):
+        self._start(run_id, _model_name(serialized, metadata))
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs
+    ):
+        self._start(run_id, _model_name(serialized, metadata))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is None:
+            return
+        elapsed, model = stopped
+        observe("agent_llm_duration_seconds", elapsed, model=model)
+        increment("agent_llm_calls_total", model=model)
+        input_tokens, output_tokens = token_usage(response)
+        increment("agent_llm_tokens_total", input_tokens, model=model, kind="input")
+        increment("agent_llm_tokens_total", output_tokens, model=model, kind="output")
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is not None:
+            increment("agent_llm_errors_total", model=stopped[1])
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        self._start(run_id, (serialized or {}).get("name", "unknown"))
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is not None:
+            observe("agent_tool_duration_seconds", stopped[0], tool=stopped[1])
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is not None:
+            increment("agent_tool_errors_total", tool=stopped[1])
+
+
+def _model_name(serialized: Optional[dict], metadata: Optional[dict]) -> str:
+    if metadata and metadata.get("ls_model_name"):
+        return metadata["ls_model_name"]
+    kwargs = (serialized or {}).get("kwargs", {})
+    return kwargs.get("model_name") or kwargs.get("model") or "unknown"
+
+
+def token_usage(response: LLMResult) -> Tuple[int, int]:
+    """Return the (input, output) token counts reported for an LLM response."""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not input_tokens and not output_tokens and response.llm_output:
+        usage = response.llm_output.get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
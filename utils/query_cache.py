@@ -0,0 +1,151 @@
+"""
+Persistent cache of answers to queries about documents.
+
+Answers are stored in SQLite per document key (a hash of the document's content
+and of how it is queried) and normalized query. A query is answered from the
+cache when the same normalized query was asked about the same content, or a
+near-duplicate one: the most similar earlier query by TF-IDF cosine similarity,
+if it reaches the threshold and mentions the same numbers and names. Queries
+differing only in a year ("1977" and "1978") are otherwise nearly identical.
+Answers older than the TTL are neither used nor kept.
+"""
+
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.?!])\s+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    document_key TEXT NOT NULL,
+    query_key TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    query TEXT,
+    PRIMARY KEY (document_key, query_key)
+);
+"""
+
+
+def query_key(query: str) -> str:
+    """Normalize a query so case, punctuation and spacing don't matter."""
+    return " ".join(TOKEN_PATTERN.findall(query.lower()))
+
+
+def key_terms(query: str) -> set[str]:
+    """
+    Numbers, years and names in `query`, lowercased: the words with a digit, and
+    the capitalized ones that don't start a sentence.
+    """
+    terms = set()
+    for sentence in SENTENCE_PATTERN.split(query.strip()):
+        for i, word in enumerate(TOKEN_PATTERN.findall(sentence)):
+            if any(c.isdigit() for c in word) or (i > 0 and word[0].isupper()):
+                terms.add(word.lower())
+    return terms
+
+
+def tfidf_similarities(query: str, others: list[str]) -> list[float]:
+    """
+    Cosine similarity of the TF-IDF vectors of `query` and each of `others`,
+    with smoothed inverse document frequencies over all of them.
+    """
+    documents = [key.split() for key in [query, *others]]
+    frequencies = Counter(term for terms in documents for term in set(terms))
+
+    def vector(terms: list[str]) -> dict[str, float]:
+        weights = {
+            term: count * (math.log((1 + len(documents)) / (1 + frequencies[term])) + 1)
+            for term, count in Counter(terms).items()
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {term: w / norm for term, w in weights.items()}
+
+    query_vector = vector(documents[0])
+    return [
+        sum(w * query_vector.get(term, 0.0) for term, w in vector(terms).items())
+        for terms in documents[1:]
+    ]
+
+
+class QueryCache:
+    """
+    SQLite-backed answers by document and query. `threshold` is the lowest
+    similarity of a near-duplicate query, 1 for exact matches only. With
+    `bypass` set every lookup misses, so stored answers are refreshed.
+    """
+
+    def __init__(
+        self, path: str, threshold: float, ttl_seconds: Optional[float] = None
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.bypass = False
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        columns = [
+            row[1] for row in self._connection.execute("PRAGMA table_info(answers)")
+        ]
+        if "query" not in columns:
+            # Caches from before queries were kept; their rows match exactly only
+            self._connection.execute("ALTER TABLE answers ADD COLUMN query TEXT")
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM answers WHERE created_at < ?", (self._cutoff(),)
+            )
+
+    def _cutoff(self) -> float:
+        """Creation time of the oldest answer still valid."""
+        if self.ttl_seconds is None:
+            return float("-inf")
+        return time.time() - self.ttl_seconds
+
+    def lookup(self, document_key: str, query: str) -> tuple[Optional[str], str]:
+        """
+        The cached answer, if any, and how it matched: "exact", "similar",
+        "miss" or "bypassed".
+        """
+        if self.bypass:
+            return None, "bypassed"
+        key = query_key(query)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT query_key, answer, query FROM answers "
+                "WHERE document_key = ? AND created_at >= ?",
+                (document_key, self._cutoff()),
+            ).fetchall()
+        answers = {row_key: answer for row_key, answer, _ in rows}
+        if key in answers:
+            return answers[key], "exact"
+        if not key or self.threshold >= 1:
+            return None, "miss"
+        # An answer about another year, amount or name is wrong however similar
+        # the rest of the query is
+        terms = key_terms(query)
+        keys = [
+            row_key
+            for row_key, _, row_query in rows
+            if row_query is not None and key_terms(row_query) == terms
+        ]
+        if not keys:
+            return None, "miss"
+        similarity, best = max(zip(tfidf_similarities(key, keys), keys))
+        if similarity >= self.threshold:
+            return answers[best], "similar"
+        return None, "miss"
+
+    def store(self, document_key: str, query: str, answer: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+                (document_key, query_key(query), answer, time.time(), query),
+            )
@@ -0,0 +1,203 @@
+"""
+Retries with jittered exponential backoff, hedged requests and rate limiting.
+
+`retry` re-runs a call on transient failures. `hedged` starts a duplicate of a
+slow call once it has taken longer than a latency percentile of earlier calls
+with the same key, and returns whichever finishes first. `RateLimiter` spaces
+out calls to an API shared by threads and coroutines.
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, Type, TypeVar
+
+from config import HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES
+
+from .metrics import increment
+
+T = TypeVar("T")
+
+_latencies: Dict[str, Deque[float]] = {}
+_latencies_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff for the given 0-based retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+def retry(
+    fn: Callable[[], T],
+    *,
+    attempts: int,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    name: str = "call",
+) -> T:
+    """
+    Call `fn` up to `attempts` times, sleeping with jittered exponential backoff
+    between attempts that raise one of `retry_on`. The last error is re-raised.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+            increment("agent_retries_total", target=name)
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+    raise ValueError("attempts must be at least 1")
+
+
+async def aretry(
+    fn: Callable[[], Awaitable[T]],
+    *,
+    attempts: int,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    name: str = "call",
+) -> T:
+    """Asyncio variant of `retry`."""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+            increment("agent_retries_total", target=name)
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+    raise ValueError("attempts must be at least 1")
+
+
+def record_latency(key: str, seconds: float) -> None:
+    with _latencies_lock:
+        _latencies.setdefault(key, deque(maxlen=200)).append(seconds)
+
+
+def hedge_delay(key: str, percentile: float = HEDGE_PERCENTILE) -> Optional[float]:
+    """
+    Seconds to wait before hedging a call with this key, or None when hedging is
+    disabled or there are not enough earlier latencies to pick a threshold.
+    """
+    if percentile <= 0:
+        return None
+    with _latencies_lock:
+        samples = sorted(_latencies.get(key, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+
+def hedged(fn: Callable[[], T], *, key: str, delay: Optional[float] = None) -> T:
+    """
+    Run `fn`, and if it has not finished after `delay` seconds (by default the
+    configured latency percentile for `key`) start a second identical call.
+    The first successful result wins; only use this for idempotent calls.
+    """
+    if delay is None:
+        delay = hedge_delay(key)
+
+    start = time.perf_counter()
+    if delay is None:
+        result = fn()
+        record_latency(key, time.perf_counter() - start)
+        return result
+
+    futures = [_submit(fn)]
+    done, _ = wait(futures, timeout=delay)
+    if not done:
+        increment("agent_hedged_requests_total", key=key)
+        futures.append(_submit(fn))
+
+    error: Optional[BaseException] = None
+    remaining = set(futures)
+    while remaining:
+        done, remaining = wait(remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                record_latency(key, time.perf_counter() - start)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _submit(fn: Callable[[], T]) -> Future:
+    # Each attempt runs in a copy of the caller's context so tracing and
+    # callback context variables follow it into the worker thread.
+    return _hedge_executor.submit(contextvars.copy_context().run, fn)
+
+
+async def ahedged(
+    fn: Callable[[], Awaitable[T]], *, key: str, delay: Optional[float] = None
+) -> T:
+    """Asyncio variant of `hedged`."""
+    if delay is None:
+        delay = hedge_delay(key)
+
+    start = time.perf_counter()
+    if delay is None:
+        result = await fn()
+        record_latency(key, time.perf_counter() - start)
+        return result
+
+    tasks = [asyncio.ensure_future(fn())]
+    done, _ = await asyncio.wait(tasks, timeout=delay)
+    if not done:
+        increment("agent_hedged_requests_total", key=key)
+        tasks.append(asyncio.ensure_future(fn()))
+
+    error: Optional[BaseException] = None
+    remaining = set(tasks)
+    try:
+        while remaining:
+            done, remaining = await asyncio.wait(
+                remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    record_latency(key, time.perf_counter() - start)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in remaining:
+            task.cancel()
+
+
+class RateLimiter:
+    """
+    Spaces calls at least `interval` seconds apart across threads and event
+    loops. Each caller reserves the next free slot and then sleeps until it,
+    so waiting coroutines don't hold a thread.
+    """
+
+    def __init__(self, interval: float, name: str = "call"):
+        self.interval = interval
+        self.name = name
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserve the next slot and return how many seconds until it starts."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            increment("agent_rate_limited_total", target=self.name)
+        return delay
+
+    def wait(self) -> None:
+        time.sleep(self.reserve())
+
+    async def await_slot(self) -> None:
+        await asyncio.sleep(self.reserve())
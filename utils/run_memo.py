@@ -0,0 +1,85 @@
+"""
+Memo of answers across runs.
+
+An answer is keyed by a hash of everything it depends on besides the code: the
+question text, the attachment's content, the prompt files and the chat model
+settings. Questions whose key is unchanged reuse their previous answer instead
+of running the agent again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from functools import cache
+from typing import Optional
+
+PROMPTS_DIR = "prompts"
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@cache
+def prompts_digest(prompts_dir: str = PROMPTS_DIR) -> str:
+    """Digest of the names and contents of every prompt file."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(prompts_dir)):
+        digest.update(name.encode())
+        digest.update(file_digest(os.path.join(prompts_dir, name)).encode())
+    return digest.hexdigest()
+
+
+def question_key(question: dict, model_settings: list[dict]) -> str:
+    file_path = question.get("file_path")
+    inputs = {
+        "question": question["question"],
+        "attachment": (
+            file_digest(file_path) if file_path and os.path.isfile(file_path) else None
+        ),
+        "prompts": prompts_digest(),
+        "models": model_settings,
+    }
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class RunMemo:
+    """Answers per question key, persisted as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry["answer"] if entry else None
+
+    def put(self, key: str, task_id: str, answer: str) -> None:
+        with self._lock:
+            # Only the latest inputs of a question are worth keeping
+            self._entries = {
+                k: entry
+                for k, entry in self._entries.items()
+                if entry["task_id"] != task_id
+            }
+            self._entries[key] = {"task_id": task_id, "answer": answer}
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,28 @@
+"""
+Lazily constructed tracing and graph-export helpers.
+"""
+
+from functools import cache
+
+from config import LANGFUSE_SECRET_KEY, LANGFUSE_PUBLIC_KEY, LANGFUSE_HOST
+
+
+@cache
+def get_langfuse_handler():
+    """Return the process-wide Langfuse callback handler, created on first use."""
+    from langfuse.callback import CallbackHandler
+
+    return CallbackHandler(
+        secret_key=LANGFUSE_SECRET_KEY,
+        public_key=LANGFUSE_PUBLIC_KEY,
+        host=LANGFUSE_HOST,
+    )
+
+
+def save_mermaid(graph, path: str) -> None:
+    """Write a compiled graph as a mermaid diagram wrapped in a markdown fence."""
+    graph_mermaid = graph.get_graph().draw_mermaid()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("```mermaid\n")
+        f.write(graph_mermaid)
+        f.write("```")
@@ -0,0 +1,176 @@
+"""
+SQLite work queue of task_ids for sharded runs.
+
+A coordinator fills the queue and workers, as separate processes or on machines
+sharing the directory, claim one task at a time and record its answer. A claim
+is a lease: a task whose worker died is claimed again once the lease expires,
+and a task whose worker failed is queued again, up to `max_attempts` times.
+
+Each fill of the queue is a run with its own id, written with the tasks. A
+worker tells the run it should answer from one that was already finished when
+it started by that id, and an empty run is finished as soon as it's queued.
+
+The rollback journal is used instead of WAL, since WAL needs shared memory that
+network filesystems don't provide.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    worker TEXT,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    answer TEXT,
+    error TEXT,
+    cut_short INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT NOT NULL,
+    queued_at REAL NOT NULL
+);
+"""
+
+
+class WorkQueue:
+    def __init__(self, path: str, lease_seconds: float = 1200, max_attempts: int = 3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Transactions are managed explicitly so a claim can take the write lock
+        # before it reads
+        self._connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self._connection.executescript(SCHEMA)
+        columns = [
+            row[1] for row in self._connection.execute("PRAGMA table_info(tasks)")
+        ]
+        if "cut_short" not in columns:
+            self._connection.execute(
+                "ALTER TABLE tasks ADD COLUMN cut_short INTEGER NOT NULL DEFAULT 0"
+            )
+
+    def _transaction(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute(sql, params).fetchall()
+                self._connection.execute("COMMIT")
+                return rows
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def reset(self, task_ids: list[str]) -> str:
+        """
+        Replace the queue's contents with a new run of `task_ids`, all pending.
+        Returns the id of the run.
+        """
+        run_id = uuid.uuid4().hex
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM tasks")
+                self._connection.executemany(
+                    "INSERT INTO tasks (task_id, status) VALUES (?, ?)",
+                    [(task_id, PENDING) for task_id in task_ids],
+                )
+                self._connection.execute("DELETE FROM runs")
+                self._connection.execute(
+                    "INSERT INTO runs VALUES (?, ?)", (run_id, time.time())
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return run_id
+
+    def claim(self, worker: str) -> Optional[str]:
+        """
+        Claim a pending task, or one whose lease expired, for `worker`.
+        Returns its task_id, or None if there is nothing to claim right now.
+        """
+        now = time.time()
+        # A task whose lease expired on its last attempt is given up
+        self._transaction(
+            "UPDATE tasks SET status = ?, error = 'lease expired' "
+            "WHERE status = ? AND claimed_at < ? AND attempts >= ?",
+            (FAILED, CLAIMED, now - self.lease_seconds, self.max_attempts),
+        )
+        rows = self._transaction(
+            "UPDATE tasks SET status = ?, worker = ?, claimed_at = ?, "
+            "attempts = attempts + 1 "
+            "WHERE task_id = ("
+            "  SELECT task_id FROM tasks"
+            "  WHERE status = ? OR (status = ? AND claimed_at < ?)"
+            "  ORDER BY attempts, rowid LIMIT 1"
+            ") RETURNING task_id",
+            (CLAIMED, worker, now, PENDING, CLAIMED, now - self.lease_seconds),
+        )
+        return rows[0][0] if rows else None
+
+    def complete(self, task_id: str, answer: str, cut_short: bool = False) -> None:
+        """
+        Record the answer of a task, `cut_short` if it is the best answer of a
+        run that hit its budget.
+        """
+        # The first answer wins if an expired lease let two workers run a task
+        self._transaction(
+            "UPDATE tasks SET status = ?, answer = ?, error = NULL, cut_short = ? "
+            "WHERE task_id = ? AND status != ?",
+            (DONE, answer, cut_short, task_id, DONE),
+        )
+
+    def fail(self, task_id: str, error: str) -> None:
+        """Queue a claimed task again, or give it up after its last attempt."""
+        self._transaction(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "worker = NULL, claimed_at = NULL, error = ? "
+            "WHERE task_id = ? AND status = ?",
+            (self.max_attempts, FAILED, PENDING, error, task_id, CLAIMED),
+        )
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+            ).fetchall()
+        return {PENDING: 0, CLAIMED: 0, DONE: 0, FAILED: 0, **dict(rows)}
+
+    def finished_run(self) -> Optional[str]:
+        """The id of the current run if all its tasks are done or failed."""
+        with self._lock:
+            # One read transaction, so the run and its tasks are consistent
+            self._connection.execute("BEGIN")
+            try:
+                run = self._connection.execute("SELECT run_id FROM runs").fetchone()
+                unfinished = self._connection.execute(
+                    "SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)",
+                    (PENDING, CLAIMED),
+                ).fetchone()[0]
+            finally:
+                self._connection.execute("COMMIT")
+        return run[0] if run and not unfinished else None
+
+    def answers(self, cut_short: bool = True) -> dict[str, str]:
+        """Answers of the done tasks, with those of runs cut short if `cut_short`."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT task_id, answer FROM tasks WHERE status = ? AND cut_short <= ?",
+                (DONE, cut_short),
+            ).fetchall()
+        return dict(rows)
@@ -1,2 +1,12 @@
-from .extract_text import extract_text_with_trafilatura, extract_text_with_html2text
-from .fetch_html import fetch_html_with_patchright, fetch_html_with_trafilatura
+from .extract_text import (
+    extract_text,
+    extract_text_with_trafilatura,
+    extract_text_with_html2text,
+)
+from .fetch_html import (
+    fetch_html_with_patchright,
+    fetch_html_with_trafilatura,
+    afetch_html_with_patchright,
+    close_browser_pool,
+)
+from .tiered_fetch import fetch_page, afetch_page
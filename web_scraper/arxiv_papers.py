@@ -0,0 +1,324 @@
+"""
+arXiv-aware fetching of paper text.
+
+abs, pdf, html and e-print URLs of a paper are normalized to its canonical id
+and version, and the lightest available rendition is converted to text: the
+HTML rendition, then the LaTeX source, and only then the PDF. Converted text
+is stored per id and version, so reading the same paper again costs nothing.
+"""
+
+import asyncio
+import gzip
+import io
+import os
+import re
+import sqlite3
+import tarfile
+import threading
+import time
+from functools import cache
+from typing import Callable, Optional
+
+import httpx
+from arxiv import Client, Search
+
+from config import ARXIV_PAPERS_PATH, ARXIV_CACHE_TTL_SECONDS
+from utils import http
+from utils.metrics import record_cache
+from .extract_text import extract_text_with_html2text, pdf_to_markdown
+
+# New-style (2401.01234) and old-style (hep-th/9901001, math.GT/0309136) ids
+ARXIV_URL_PATTERN = re.compile(
+    r"^https?://(?:www\.|export\.)?arxiv\.org/(?:abs|pdf|html|e-print|format)/"
+    r"(?P<id>\d{4}\.\d{4,5}|[a-z-]+(?:\.[A-Z]{2})?/\d{7})"
+    r"(?:v(?P<version>\d+))?(?:\.pdf)?/?(?:[?#].*)?$",
+    re.IGNORECASE,
+)
+
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    paper_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    text TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (paper_id, version)
+);
+CREATE TABLE IF NOT EXISTS latest (
+    paper_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    resolved_at REAL NOT NULL
+);
+"""
+
+
+def parse_arxiv_url(url: str) -> Optional[tuple[str, Optional[int]]]:
+    """Return (id, version) of an arXiv paper URL, or None for other URLs."""
+    match = ARXIV_URL_PATTERN.match(url.strip())
+    if not match:
+        return None
+    version = match.group("version")
+    return match.group("id"), int(version) if version else None
+
+
+class PaperStore:
+    """
+    SQLite store of converted paper text per (id, version). A version's text
+    never changes; the latest version of an unversioned id is re-resolved
+    after `latest_ttl_seconds`.
+    """
+
+    def __init__(self, path: str, latest_ttl_seconds: Optional[float] = None):
+        self.latest_ttl_seconds = latest_ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def get(self, paper_id: str, version: int) -> Optional[tuple[str, str]]:
+        """The stored (text, source) of a paper version, if any."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT text, source FROM texts WHERE paper_id = ? AND version = ?",
+                (paper_id, version),
+            ).fetchone()
+
+    def put(self, paper_id: str, version: int, source: str, text: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO texts VALUES (?, ?, ?, ?, ?)",
+                (paper_id, version, source, text, time.time()),
+            )
+
+    def latest_version(self, paper_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT version, resolved_at FROM latest WHERE paper_id = ?",
+                (paper_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        version, resolved_at = row
+        if (
+            self.latest_ttl_seconds is not None
+            and time.time() - resolved_at > self.latest_ttl_seconds
+        ):
+            return None
+        return version
+
+    def set_latest_version(self, paper_id: str, version: int) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO latest VALUES (?, ?, ?)",
+                (paper_id, version, time.time()),
+            )
+
+
+# One client, so version lookups share its pacing of API requests
+client = Client()
+
+
+@cache
+def get_paper_store() -> PaperStore:
+    os.makedirs(os.path.dirname(ARXIV_PAPERS_PATH), exist_ok=True)
+    return PaperStore(ARXIV_PAPERS_PATH, latest_ttl_seconds=ARXIV_CACHE_TTL_SECONDS)
+
+
+def resolve_latest_version(paper_id: str) -> Optional[int]:
+    """Ask the arXiv API for the latest version of a paper."""
+    try:
+        result = next(client.results(Search(id_list=[paper_id])), None)
+    except Exception as e:
+        print(f"Warning: Could not resolve the arXiv version of {paper_id}: {e}")
+        return None
+    if result is None:
+        return None
+    parsed = parse_arxiv_url(result.entry_id)
+    return parsed[1] if parsed else None
+
+
+def html_to_text(response: httpx.Response) -> Optional[str]:
+    if "html" not in response.headers.get("content-type", ""):
+        return None
+    return extract_text_with_html2text(response.text)
+
+
+def source_to_text(response: httpx.Response) -> Optional[str]:
+    """
+    LaTeX of an e-print: the main .tex file of a source tarball with its
+    \\input and \\include files inlined, or a single gzipped .tex file.
+    PDF-only submissions have no source and return None.
+    """
+    content = response.content
+    if len(content) > MAX_SOURCE_BYTES or content.startswith(b"%PDF"):
+        return None
+
+    try:
+        with tarfile.open(fileobj=io.BytesIO(content), mode="r:*") as tar:
+            files = {
+                member.name: tar.extractfile(member).read().decode(errors="replace")
+                for member in tar.getmembers()
+                if member.isfile() and member.name.endswith(".tex")
+            }
+    except tarfile.TarError:
+        try:
+            text = gzip.decompress(content).decode(errors="replace")
+        except (OSError, EOFError):
+            text = content.decode(errors="replace")
+        files = {"main.tex": text}
+
+    main = next(
+        (name for name, text in files.items() if "\\documentclass" in text), None
+    )
+    if main is None:
+        return None
+    return strip_latex_comments(inline_inputs(files[main], files))
+
+
+def inline_inputs(text: str, files: dict[str, str], depth: int = 0) -> str:
+    if depth > 5:
+        return text
+
+    def replace(match: re.Match) -> str:
+        name = match.group(1).strip()
+        included = files.get(name) or files.get(f"{name}.tex")
+        if included is None:
+            return match.group(0)
+        return inline_inputs(included, files, depth + 1)
+
+    return re.sub(r"\\(?:input|include)\{([^}]+)\}", replace, text)
+
+
+def strip_latex_comments(text: str) -> str:
+    lines = (re.sub(r"(?<!\\)%.*$", "", line) for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def pdf_to_text(response: httpx.Response) -> Optional[str]:
+    text = str(pdf_to_markdown(response.content)).strip()
+    # Oversized PDFs come back as a message in place of their text
+    if not text or text == "File too large":
+        return None
+    return text
+
+
+# (source, URL template, converter), lightest rendition first
+RENDITIONS: list[tuple[str, str, Callable[[httpx.Response], Optional[str]]]] = [
+    ("html", "https://arxiv.org/html/{ref}", html_to_text),
+    ("source", "https://arxiv.org/e-print/{ref}", source_to_text),
+    ("pdf", "https://arxiv.org/pdf/{ref}", pdf_to_text),
+]
+
+
+def paper_ref(paper_id: str, version: Optional[int]) -> str:
+    return f"{paper_id}v{version}" if version else paper_id
+
+
+def fetch_rendition(paper_id: str, version: Optional[int]) -> Optional[tuple[str, str]]:
+    """Fetch and convert the lightest available rendition as (text, source)."""
+    for source, url, convert in RENDITIONS:
+        try:
+            response = http.get(url.format(ref=paper_ref(paper_id, version)))
+        except http.HTTPError as e:
+            print(f"Warning: Could not fetch the {source} of {paper_id}: {e}")
+            continue
+        if response.status_code == 200:
+            text = convert(response)
+            if text:
+                return text, source
+    return None
+
+
+async def afetch_rendition(
+    paper_id: str, version: Optional[int]
+) -> Optional[tuple[str, str]]:
+    for source, url, convert in RENDITIONS:
+        try:
+            response = await http.aget(url.format(ref=paper_ref(paper_id, version)))
+        except http.HTTPError as e:
+            print(f"Warning: Could not fetch the {source} of {paper_id}: {e}")
+            continue
+        if response.status_code == 200:
+            # Conversions are CPU-bound, keep them off the event loop
+            text = await asyncio.to_thread(convert, response)
+            if text:
+                return text, source
+    return None
+
+
+def _lookup(
+    store: PaperStore, paper_id: str, version: Optional[int]
+) -> tuple[Optional[int], Optional[str]]:
+    if version is None:
+        version = store.latest_version(paper_id)
+    if version is None:
+        return None, None
+    stored = store.get(paper_id, version)
+    record_cache("arxiv_paper", hit=stored is not None)
+    return version, stored[0] if stored else None
+
+
+def _save(
+    store: PaperStore,
+    paper_id: str,
+    version: Optional[int],
+    rendition: Optional[tuple[str, str]],
+) -> Optional[str]:
+    if rendition is None:
+        return None
+    text, source = rendition
+    # Without a known version the text can't be attributed, so it isn't stored
+    if version is not None:
+        store.put(paper_id, version, source, text)
+    return text
+
+
+def paper_text(url: str, store: Optional[PaperStore] = None) -> Optional[str]:
+    """
+    Text of the arXiv paper at `url`, from the store or the lightest rendition.
+    Returns None if `url` is not an arXiv paper or no rendition could be read.
+    """
+    parsed = parse_arxiv_url(url)
+    if parsed is None:
+        return None
+    paper_id, requested_version = parsed
+    store = store or get_paper_store()
+
+    version, text = _lookup(store, paper_id, requested_version)
+    if text is not None:
+        return text
+
+    if version is None:
+        version = resolve_latest_version(paper_id)
+        if version is not None:
+            store.set_latest_version(paper_id, version)
+            version, text = _lookup(store, paper_id, version)
+            if text is not None:
+                return text
+
+    return _save(store, paper_id, version, fetch_rendition(paper_id, version))
+
+
+async def apaper_text(url: str, store: Optional[PaperStore] = None) -> Optional[str]:
+    """Asyncio variant of `paper_text`."""
+    parsed = parse_arxiv_url(url)
+    if parsed is None:
+        return None
+    paper_id, requested_version = parsed
+    store = store or get_paper_store()
+
+    version, text = _lookup(store, paper_id, requested_version)
+    if text is not None:
+        return text
+
+    if version is None:
+        version = await asyncio.to_thread(resolve_latest_version, paper_id)
+        if version is not None:
+            store.set_latest_version(paper_id, version)
+            version, text = _lookup(store, paper_id, version)
+            if text is not None:
+                return text
+
+    return _save(store, paper_id, version, await afetch_rendition(paper_id, version))
@@ -1,12 +1,84 @@
-from trafilatura import extract
+import os
+import tempfile
+
+from typing import Optional
+
 import html2text
 
+from config import (
+    EXTRACTION_STRATEGY,
+    EXTRACTION_MIN_CHARS,
+    EXTRACTION_INCLUDE_TABLES,
+)
+from utils.metrics import increment
+
 
-def extract_text_with_trafilatura(html: str) -> str:
-    text = extract(html, include_links=True)
+def extract_text_with_trafilatura(
+    html: str, include_tables: bool = True
+) -> Optional[str]:
+    from trafilatura import extract
+
+    text = extract(
+        html,
+        include_links=True,
+        include_tables=include_tables,
+        output_format="markdown",
+    )
     return text
 
 
 def extract_text_with_html2text(html: str) -> str:
     text = html2text.html2text(html)
     return text
+
+
+def extract_text(
+    html: str,
+    strategy: str = EXTRACTION_STRATEGY,
+    min_chars: int = EXTRACTION_MIN_CHARS,
+    include_tables: bool = EXTRACTION_INCLUDE_TABLES,
+) -> str:
+    """
+    Markdown text of a web page.
+
+    With the "main_content" strategy only the main content is kept, without
+    navigation, sidebars and footers. If that looks too short (under
+    `min_chars`), e.g. on pages trafilatura can't segment, the full page is
+    converted instead, as with the "full_page" strategy.
+    """
+    if strategy not in ("main_content", "full_page"):
+        raise ValueError(f"Unknown extraction strategy: {strategy}")
+
+    if strategy == "main_content":
+        text = extract_text_with_trafilatura(html, include_tables=include_tables)
+        if text and len(text) >= min_chars:
+            increment("agent_extraction_total", outcome="main_content")
+            return text
+
+    increment(
+        "agent_extraction_total",
+        outcome="full_page" if strategy == "full_page" else "fallback",
+    )
+    return extract_text_with_html2text(html)
+
+
+def pdf_to_markdown(content: bytes) -> str:
+    from markitdown import MarkItDown
+
+    if len(content) > 10 * 1024 * 1024:
+        return "File too large"
+
+    md = MarkItDown()
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+        temp_file.write(content)
+        temp_path = temp_file.name
+
+    result = md.convert(temp_path)
+
+    try:
+        os.unlink(temp_path)
+    except:
+        pass
+
+    return result
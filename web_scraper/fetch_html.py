@@ -1,5 +1,9 @@
-from trafilatura import fetch_url
-from patchright.sync_api import sync_playwright, Error as PatchrightError
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+
+from config import BROWSER_MAX_PAGES
 
 
 class TimeoutError(Exception):
@@ -7,6 +11,8 @@ class TimeoutError(Exception):
 
 
 def fetch_html_with_patchright(url: str) -> str:
+    from patchright.sync_api import sync_playwright, Error as PatchrightError
+
     with sync_playwright() as p:
         try:
             browser = p.chromium.launch()
@@ -19,6 +25,82 @@ def fetch_html_with_patchright(url: str) -> str:
     return html
 
 
+class BrowserPool:
+    """
+    One headless browser per event loop, launched on first use, serving at
+    most `max_pages` concurrent pages in isolated contexts.
+    """
+
+    def __init__(self, max_pages: int):
+        self._pages = asyncio.Semaphore(max_pages)
+        self._launch_lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+
+    async def _get_browser(self):
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                from patchright.async_api import async_playwright
+
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch()
+            return self._browser
+
+    @asynccontextmanager
+    async def page(self):
+        async with self._pages:
+            browser = await self._get_browser()
+            context = await browser.new_context()
+            try:
+                yield await context.new_page()
+            finally:
+                await context.close()
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._playwright = None
+
+
+_browser_pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_browser_pools_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the browser pool of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _browser_pools_lock:
+        pool = _browser_pools.get(loop)
+        if pool is None:
+            pool = BrowserPool(BROWSER_MAX_PAGES)
+            _browser_pools[loop] = pool
+        return pool
+
+
+async def close_browser_pool():
+    """Close the browser of the running event loop, if one was launched."""
+    with _browser_pools_lock:
+        pool = _browser_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+async def afetch_html_with_patchright(url: str) -> str:
+    from patchright.async_api import Error as PatchrightError
+
+    async with get_browser_pool().page() as page:
+        try:
+            await page.goto(url)
+        except PatchrightError as e:
+            raise TimeoutError(f"Timeout error")
+        return await page.content()
+
+
 def fetch_html_with_trafilatura(url: str) -> str:
+    from trafilatura import fetch_url
+
     html = fetch_url(url)
     return html
@@ -0,0 +1,168 @@
+"""
+Speculative background prefetching of documents into a byte-budgeted cache.
+
+After a web search the agent usually reads one of the top results next, so
+their text can be fetched and extracted while the model decides. Lookups find
+finished documents in an LRU cache and wait for prefetches still in flight
+rather than fetching the same URL twice.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cache
+from typing import Awaitable, Callable, Iterable, Optional, Union
+
+from config import PREFETCH_CACHE_BYTES, PREFETCH_CONCURRENCY
+from utils.metrics import increment, record_cache
+
+
+class DocumentCache:
+    """LRU cache of extracted documents bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._documents: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._documents.get(url)
+            if entry is None:
+                return None
+            self._documents.move_to_end(url)
+            return entry[0]
+
+    def put(self, url: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if url in self._documents:
+                self.size -= self._documents.pop(url)[1]
+            self._documents[url] = (text, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._documents.popitem(last=False)
+                self.size -= evicted_size
+                increment("agent_prefetch_total", outcome="evicted")
+
+
+class Prefetcher:
+    """
+    Runs prefetches of URLs in the background and serves their results.
+
+    Sync callers prefetch on a thread pool of `concurrency` workers; async
+    callers prefetch as tasks on their event loop, `concurrency` at a time.
+    """
+
+    def __init__(self, cache: DocumentCache, concurrency: int):
+        self.cache = cache
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="prefetch"
+        )
+        self._semaphores: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._pending: dict[str, Union[Future, asyncio.Task]] = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, url: str) -> bool:
+        """Whether `url` still needs a prefetch; the caller registers it next."""
+        return url not in self._pending and self.cache.get(url) is None
+
+    def _done(self, url: str, text: Optional[str]) -> None:
+        with self._lock:
+            self._pending.pop(url, None)
+        if text is not None:
+            self.cache.put(url, text)
+            increment("agent_prefetch_total", outcome="completed")
+
+    def prefetch(self, urls: Iterable[str], fetch: Callable[[str], Optional[str]]):
+        """Start fetching `urls` on the thread pool, skipping known ones."""
+        for url in urls:
+            with self._lock:
+                if not self._claim(url):
+                    continue
+                self._pending[url] = self._executor.submit(self._run, url, fetch)
+            increment("agent_prefetch_total", outcome="scheduled")
+
+    def _run(self, url: str, fetch: Callable[[str], Optional[str]]) -> Optional[str]:
+        text = None
+        try:
+            text = fetch(url)
+            return text
+        except Exception:
+            increment("agent_prefetch_total", outcome="failed")
+            return None
+        finally:
+            self._done(url, text)
+
+    def aprefetch(
+        self, urls: Iterable[str], fetch: Callable[[str], Awaitable[Optional[str]]]
+    ):
+        """Start fetching `urls` as tasks on the running event loop."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.setdefault(
+            loop, asyncio.Semaphore(self.concurrency)
+        )
+        for url in urls:
+            with self._lock:
+                if not self._claim(url):
+                    continue
+                self._pending[url] = loop.create_task(self._arun(url, fetch, semaphore))
+            increment("agent_prefetch_total", outcome="scheduled")
+
+    async def _arun(
+        self,
+        url: str,
+        fetch: Callable[[str], Awaitable[Optional[str]]],
+        semaphore: asyncio.Semaphore,
+    ) -> Optional[str]:
+        text = None
+        try:
+            async with semaphore:
+                text = await fetch(url)
+            return text
+        except Exception:
+            increment("agent_prefetch_total", outcome="failed")
+            return None
+        finally:
+            self._done(url, text)
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        The prefetched text of `url`, waiting for a prefetch in flight on the
+        thread pool, or None on a miss.
+        """
+        text = self.cache.get(url)
+        if text is None:
+            with self._lock:
+                pending = self._pending.get(url)
+            if isinstance(pending, Future):
+                text = pending.result()
+        record_cache("prefetch", hit=text is not None)
+        return text
+
+    async def aget(self, url: str) -> Optional[str]:
+        """Asyncio variant of `get`, also waiting for prefetch tasks."""
+        text = self.cache.get(url)
+        if text is None:
+            with self._lock:
+                pending = self._pending.get(url)
+            if isinstance(pending, Future):
+                text = await asyncio.wrap_future(pending)
+            elif (
+                isinstance(pending, asyncio.Task)
+                and pending.get_loop() is asyncio.get_running_loop()
+            ):
+                # Shielded so a cancelled lookup doesn't cancel the prefetch
+                text = await asyncio.shield(pending)
+        record_cache("prefetch", hit=text is not None)
+        return text
+
+
+@cache
+def get_prefetcher() -> Prefetcher:
+    return Prefetcher(DocumentCache(PREFETCH_CACHE_BYTES), PREFETCH_CONCURRENCY)
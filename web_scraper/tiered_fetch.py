@@ -0,0 +1,267 @@
+"""
+Tiered page fetching: a plain HTTP GET first, the headless browser only when
+the static response is a JavaScript shell, a bot wall or has no content.
+
+Domains whose static responses were JavaScript shells or bot walls several
+times in a row are recorded in a JSON file, so later fetches from them skip the
+static attempt. Errors and non-HTML responses say nothing about the domain and
+aren't counted, and a browser fetch that found no more than the static response
+resets the domain. Records expire so a domain is re-probed occasionally.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from functools import cache
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from config import (
+    FETCH_TIER_BROWSER_AFTER,
+    FETCH_TIERS_PATH,
+    FETCH_TIER_TTL_SECONDS,
+    STATIC_FETCH_TIMEOUT,
+    STATIC_MIN_TEXT_CHARS,
+)
+from utils import http
+from utils.metrics import http_timer, increment
+from utils.resilience import aretry, retry
+from .fetch_html import (
+    TimeoutError,
+    afetch_html_with_patchright,
+    fetch_html_with_patchright,
+)
+
+STATIC = "static"
+BROWSER = "browser"
+
+# Reasons a static response fails that the browser is likely to fix
+BROWSER_REASONS = ("js_shell", "bot_wall")
+
+# Some sites serve bot walls to clients that don't look like a browser
+STATIC_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+BOT_WALL_PATTERN = re.compile(
+    r"just a moment\.\.\.|cf-chl-|challenge-platform|captcha|verify you are human"
+    r"|are you a robot|access denied|unusual traffic|enable javascript and cookies",
+    re.IGNORECASE,
+)
+JS_REQUIRED_PATTERN = re.compile(
+    r"<noscript[^>]*>[^<]*(?:enable|requires?|turn on) javascript"
+    r"|<div id=\"(?:root|app|__next|__nuxt)\">\s*</div>",
+    re.IGNORECASE,
+)
+INVISIBLE_PATTERN = re.compile(
+    r"<(script|style|noscript|template|svg)\b.*?</\1>", re.IGNORECASE | re.DOTALL
+)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def visible_text_length(html: str) -> int:
+    """Rough number of visible characters of a page."""
+    text = TAG_PATTERN.sub(" ", INVISIBLE_PATTERN.sub(" ", html))
+    return len(" ".join(text.split()))
+
+
+def needs_browser(response: httpx.Response) -> Optional[str]:
+    """
+    Why the static response can't be used (a reason to escalate to the
+    browser), or None if it's a usable page.
+    """
+    content_type = response.headers.get("content-type", "")
+    if "html" not in content_type and not content_type.startswith("text/"):
+        return "non_html"
+
+    html = response.text
+    if BOT_WALL_PATTERN.search(html[:20000]) and (
+        response.status_code in (403, 429, 503)
+        or visible_text_length(html) < STATIC_MIN_TEXT_CHARS * 4
+    ):
+        return "bot_wall"
+    # A missing page looks the same in the browser
+    if response.status_code in (404, 410):
+        return None
+    if response.status_code >= 400:
+        return f"status_{response.status_code}"
+
+    text_length = visible_text_length(html)
+    if text_length < STATIC_MIN_TEXT_CHARS:
+        return "js_shell" if JS_REQUIRED_PATTERN.search(html) else "empty"
+    return None
+
+
+class DomainTiers:
+    """Per-domain record of the fetch tier that worked, persisted as JSON."""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._tiers: dict[str, dict] = {}
+        self._browser_reasons: dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._tiers = json.load(f)
+
+    def get(self, domain: str) -> Optional[str]:
+        with self._lock:
+            record = self._tiers.get(domain)
+        if record is None:
+            return None
+        if (
+            self.ttl_seconds is not None
+            and time.time() - record["updated_at"] > self.ttl_seconds
+        ):
+            return None
+        return record["tier"]
+
+    def needed_browser(self, domain: str, reason: str, times: int) -> None:
+        """
+        Count a static response of `domain` that failed for `reason`, one of
+        BROWSER_REASONS, and record the browser tier once that happened `times`
+        times in a row.
+        """
+        with self._lock:
+            count = self._browser_reasons.get(domain, 0) + 1
+            self._browser_reasons[domain] = count
+        if count >= times:
+            self.set(domain, BROWSER, reason)
+
+    def set(self, domain: str, tier: str, reason: Optional[str] = None) -> None:
+        with self._lock:
+            self._browser_reasons.pop(domain, None)
+            # Only changes are written, so a record expires FETCH_TIER_TTL after
+            # the domain last switched tiers
+            if self._tiers.get(domain, {}).get("tier") == tier:
+                return
+            self._tiers[domain] = {
+                "tier": tier,
+                "reason": reason,
+                "updated_at": time.time(),
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._tiers, f, indent=2)
+            os.replace(temp_path, self.path)
+
+
+@cache
+def get_domain_tiers() -> DomainTiers:
+    return DomainTiers(FETCH_TIERS_PATH, ttl_seconds=FETCH_TIER_TTL_SECONDS)
+
+
+def _domain(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def _static_html(url: str) -> tuple[Optional[str], Optional[str]]:
+    """
+    HTML of the static response, if it is HTML, and the reason it can't be used
+    or None if it can.
+    """
+    try:
+        response = http.get(
+            url, headers=STATIC_HEADERS, timeout=STATIC_FETCH_TIMEOUT, retries=1
+        )
+    except http.HTTPError as e:
+        return None, type(e).__name__
+    reason = needs_browser(response)
+    return (None if reason == "non_html" else response.text), reason
+
+
+async def _astatic_html(url: str) -> tuple[Optional[str], Optional[str]]:
+    try:
+        response = await http.aget(
+            url, headers=STATIC_HEADERS, timeout=STATIC_FETCH_TIMEOUT, retries=1
+        )
+    except http.HTTPError as e:
+        return None, type(e).__name__
+    reason = needs_browser(response)
+    return (None if reason == "non_html" else response.text), reason
+
+
+def _static_outcome(domain: str, tiers: DomainTiers, reason: Optional[str]) -> bool:
+    """Record the outcome of a static fetch; whether its response can be used."""
+    if reason is None:
+        tiers.set(domain, STATIC)
+        increment("agent_fetch_tier_total", tier=STATIC, reason="ok")
+        return True
+    if reason in BROWSER_REASONS:
+        tiers.needed_browser(domain, reason, FETCH_TIER_BROWSER_AFTER)
+    increment("agent_fetch_tier_total", tier=BROWSER, reason=reason)
+    return False
+
+
+def _browser_outcome(
+    domain: str, tiers: DomainTiers, static_html: Optional[str], html: str
+) -> None:
+    if static_html is None:
+        return
+    # A page the browser renders no fuller than the static response didn't
+    # need it, so the failures of the domain so far don't count
+    gain = visible_text_length(html) - visible_text_length(static_html)
+    if gain <= STATIC_MIN_TEXT_CHARS:
+        tiers.set(domain, STATIC)
+        increment("agent_fetch_tier_resets_total")
+
+
+def fetch_page(url: str) -> str:
+    """
+    HTML of a web page, from a static GET when that yields a real page and
+    from the headless browser otherwise. Raises TimeoutError if the browser
+    can't load the page either.
+    """
+    tiers = get_domain_tiers()
+    domain = _domain(url)
+    static_html = None
+    if tiers.get(domain) == BROWSER:
+        increment("agent_fetch_tier_total", tier=BROWSER, reason="recorded")
+    else:
+        static_html, reason = _static_html(url)
+        if _static_outcome(domain, tiers, reason):
+            return static_html
+
+    with http_timer(url, client="patchright"):
+        html = retry(
+            lambda: fetch_html_with_patchright(url),
+            attempts=2,
+            retry_on=(TimeoutError,),
+            name="patchright",
+        )
+    _browser_outcome(domain, tiers, static_html, html)
+    return html
+
+
+async def afetch_page(url: str) -> str:
+    """Asyncio variant of `fetch_page`, using the shared browser pool."""
+    tiers = get_domain_tiers()
+    domain = _domain(url)
+    static_html = None
+    if tiers.get(domain) == BROWSER:
+        increment("agent_fetch_tier_total", tier=BROWSER, reason="recorded")
+    else:
+        static_html, reason = await _astatic_html(url)
+        if _static_outcome(domain, tiers, reason):
+            return static_html
+
+    with http_timer(url, client="patchright-async"):
+        html = await aretry(
+            lambda: afetch_html_with_patchright(url),
+            attempts=2,
+            retry_on=(TimeoutError,),
+            name="patchright",
+        )
+    _browser_outcome(domain, tiers, static_html, html)
+    return html